@@ -44,6 +44,9 @@ CREATE UNIQUE INDEX one_active_assignment
 ON WRISTBAND_ASSIGNMENT (wristband_id)
 WHERE end_date IS NULL;
 
+CREATE INDEX idx_assignment_wristband_end
+ON WRISTBAND_ASSIGNMENT (wristband_id, end_date);
+
 /* ===============================
    VITAL_MEASUREMENT  (🔥 اصلاح‌شده)
 ================================ */
@@ -98,3 +101,12 @@ CREATE TABLE ALERT (
     FOREIGN KEY (assignment_id)
         REFERENCES WRISTBAND_ASSIGNMENT(assignment_id)
 );
+
+CREATE INDEX idx_alert_assignment_time
+ON ALERT(assignment_id, generated_at);
+
+CREATE INDEX idx_alert_status_severity
+ON ALERT(status, severity);
+
+CREATE INDEX idx_alert_generated_id
+ON ALERT(generated_at, alert_id);
@@ -0,0 +1,165 @@
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+
+class AssignmentResolver:
+    """
+    Local wristband -> active assignment cache.
+
+    wristband_id -> {"assignment_id", "patient_id", "threshold_profile"}
+
+    - warm() loads every active assignment from Data Storage in one call
+    - apply_change() applies assignment change events (MQTT)
+    - Snapshot and change events carry Data Storage's assignment version;
+      warm() keeps the entries of changes newer than its snapshot (applied
+      while the request was in flight)
+    - Entries expire after ttl_seconds and are refetched one by one;
+      unassigned wristbands are cached for negative_ttl_seconds
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        ttl_seconds: float = 300.0,
+        negative_ttl_seconds: float = 30.0,
+        timeout: float = 1.5,
+    ) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.timeout = timeout
+
+        # wristband_id -> (expires_at, entry or None)
+        self._entries: Dict[int, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+        # wristband_id -> version of the last change event applied
+        self._versions: Dict[int, int] = {}
+        self._snapshot_version = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._failures = 0
+        self._changes = 0
+        self._stale_skipped = 0
+
+    # ----------------------------
+    # Data Storage
+    # ----------------------------
+    def _fetch_one(self, wristband_id: int) -> Optional[Dict[str, Any]]:
+        resp = requests.get(
+            f"{self.base_url}/api/v1/assignments/by-wristband/{wristband_id}",
+            timeout=self.timeout,
+        )
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return _entry(resp.json())
+
+    def _fetch_all(self) -> Tuple[int, list]:
+        resp = requests.get(f"{self.base_url}/api/v1/assignments/profiles", timeout=5)
+        resp.raise_for_status()
+        data = resp.json()
+        return int(data.get("version") or 0), data["items"]
+
+    def warm(self) -> int:
+        """
+        Replace the cache with the bulk snapshot, keeping the change events
+        newer than it. Returns the entry count.
+        """
+        version, items = self._fetch_all()
+
+        expires_at = time.monotonic() + self.ttl_seconds
+        entries = {
+            int(item["wristband_id"]): (expires_at, _entry(item))
+            for item in items
+        }
+        with self._lock:
+            if version < self._snapshot_version:
+                # Data Storage restarted: its version counter started over
+                self._versions.clear()
+
+            # Changes applied while the snapshot was in flight win
+            newer = {wid: v for wid, v in self._versions.items() if v > version}
+            for wid in newer:
+                entries.pop(wid, None)
+                if wid in self._entries:
+                    entries[wid] = self._entries[wid]
+            self._stale_skipped += len(newer)
+
+            self._entries = entries
+            self._versions = newer
+            self._snapshot_version = version
+
+        print(f"[ALERT] assignment cache warmed ({len(entries)} active, version {version})")
+        return len(entries)
+
+    # ----------------------------
+    # Lookup
+    # ----------------------------
+    def resolve(self, wristband_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Active assignment of a wristband, None if it has none.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(wristband_id)
+            if cached is not None and cached[0] > now:
+                self._hits += 1
+                return cached[1]
+            self._misses += 1
+
+        try:
+            entry = self._fetch_one(wristband_id)
+        except Exception as e:
+            print(f"[ALERT][WARN] assignment lookup failed for wristband {wristband_id}: {e}")
+            with self._lock:
+                self._failures += 1
+            # Keep serving the expired entry rather than nothing
+            return cached[1] if cached is not None else None
+
+        ttl = self.ttl_seconds if entry is not None else self.negative_ttl_seconds
+        with self._lock:
+            self._entries[wristband_id] = (now + ttl, entry)
+        return entry
+
+    # ----------------------------
+    # Invalidation
+    # ----------------------------
+    def apply_change(self, event: Dict[str, Any]) -> None:
+        """
+        Single-wristband assignment change event from Data Storage.
+        """
+        wristband_id = event["wristband_id"]
+        now = time.monotonic()
+        with self._lock:
+            self._changes += 1
+            if event.get("version") is not None:
+                self._versions[int(wristband_id)] = int(event["version"])
+            if event.get("active"):
+                self._entries[int(wristband_id)] = (now + self.ttl_seconds, _entry(event))
+            else:
+                self._entries[int(wristband_id)] = (now + self.negative_ttl_seconds, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "failures": self._failures,
+                "changes": self._changes,
+                "snapshot_version": self._snapshot_version,
+                "stale_skipped": self._stale_skipped,
+            }
+
+
+def _entry(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "assignment_id": data.get("assignment_id"),
+        "patient_id": data.get("patient_id"),
+        "threshold_profile": data.get("threshold_profile"),
+    }
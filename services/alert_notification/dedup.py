@@ -0,0 +1,227 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+SEVERITY_RANK = {"NORMAL": 0, "WARNING": 1, "CRITICAL": 2}
+
+CREATED = "created"   # first occurrence: new alert row
+UPDATED = "updated"   # repeat occurrences folded into the open alert
+
+
+class _Episode:
+    """
+    One open alert: consecutive occurrences of the same
+    (wristband, alert_type, metric, severity) without a gap longer than
+    the cooldown.
+    """
+
+    __slots__ = ("key", "first_seen_at", "last_seen", "last_seen_at", "last_event",
+                 "last_value", "occurrence_count", "pending", "last_published")
+
+    def __init__(self, key: Tuple, now: float) -> None:
+        self.key = key
+        self.first_seen_at = datetime.utcnow().isoformat()
+        self.last_seen = now
+        self.last_seen_at = self.first_seen_at
+        self.last_event: Dict[str, Any] = {}
+        self.last_value = None
+        self.occurrence_count = 0
+        self.pending = 0        # occurrences not yet published
+        self.last_published = now
+
+
+class AlertDeduplicator:
+    """
+    Suppression stage between risk events and final alerts.
+
+    - Keyed on (wristband_id, alert_type, metric, severity); alert_type
+      keeps windowed-rule alerts apart from plain threshold breaches
+    - First occurrence -> CREATED alert
+    - Repeats within cooldown_seconds of the previous occurrence are
+      counted; at most one UPDATED message per update_interval_seconds
+      carries them (flush_due() publishes leftovers)
+    - A higher severity for the same (wristband, metric) is published at
+      once (escalation); a lower one while the higher alert is open is
+      only counted (downgraded): it neither keeps the higher alert open
+      nor replaces its values
+    - Quiet for cooldown_seconds -> the episode ends, the next occurrence
+      creates a new alert
+    - Beyond max_keys the least recently seen episode is evicted; its
+      unpublished occurrences are handed to the next flush_due()
+    """
+
+    def __init__(
+        self,
+        cooldown_seconds: float = 300.0,
+        update_interval_seconds: float = 60.0,
+        max_keys: int = 50_000,
+    ) -> None:
+        self.cooldown_seconds = cooldown_seconds
+        self.update_interval_seconds = update_interval_seconds
+        self.max_keys = max(1, int(max_keys))
+
+        self._episodes: "OrderedDict[Tuple, _Episode]" = OrderedDict()
+        # (last risk event, UPDATED fields) of evicted episodes
+        self._evicted: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+
+        self._created = 0
+        self._escalated = 0
+        self._updates = 0
+        self._suppressed = 0
+        self._downgraded = 0
+        self._evictions = 0
+
+    # ----------------------------
+    # Risk event in
+    # ----------------------------
+    def process(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Returns dedup fields for the alert to publish now, or None if the
+        occurrence was only counted.
+        """
+        now = time.monotonic()
+        wristband_id = event.get("wristband_id")
+        alert_type = event.get("alert_type")
+        metric = event.get("vital")
+        severity = str(event.get("severity", "")).upper()
+
+        with self._lock:
+            self._expire(now)
+
+            # A higher-severity alert on the same metric is still open
+            for higher, rank in SEVERITY_RANK.items():
+                if rank <= SEVERITY_RANK.get(severity, 0):
+                    continue
+                if (wristband_id, alert_type, metric, higher) in self._episodes:
+                    self._downgraded += 1
+                    return None
+
+            key = (wristband_id, alert_type, metric, severity)
+            episode = self._episodes.get(key)
+            if episode is not None:
+                return self._repeat(episode, event, now)
+
+            escalated_from = None
+            for lower, rank in SEVERITY_RANK.items():
+                if 0 < rank < SEVERITY_RANK.get(severity, 0) and \
+                        (wristband_id, alert_type, metric, lower) in self._episodes:
+                    escalated_from = lower
+
+            episode = self._episodes[key] = _Episode(key, now)
+            while len(self._episodes) > self.max_keys:
+                self._evict(now)
+
+            self._record(episode, event, now)
+            episode.pending = 0
+            self._created += 1
+            if escalated_from:
+                self._escalated += 1
+            return self._fields(episode, CREATED, 1, escalated_from)
+
+    def _repeat(self, episode: _Episode, event: Dict[str, Any], now: float) -> Optional[Dict[str, Any]]:
+        self._record(episode, event, now)
+        self._episodes.move_to_end(episode.key)
+
+        if now - episode.last_published < self.update_interval_seconds:
+            self._suppressed += 1
+            return None
+        return self._publish_update(episode, now)
+
+    def _record(self, episode: _Episode, event: Dict[str, Any], now: float) -> None:
+        episode.last_seen = now
+        episode.last_seen_at = datetime.utcnow().isoformat()
+        episode.last_event = event
+        episode.last_value = event.get("value")
+        episode.occurrence_count += 1
+        episode.pending += 1
+
+    def _publish_update(self, episode: _Episode, now: float) -> Dict[str, Any]:
+        occurrences, episode.pending = episode.pending, 0
+        episode.last_published = now
+        self._updates += 1
+        return self._fields(episode, UPDATED, occurrences)
+
+    @staticmethod
+    def _fields(
+        episode: _Episode,
+        action: str,
+        occurrences: int,
+        escalated_from: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        wristband_id, alert_type, metric, severity = episode.key
+        fields = {
+            "event": action,
+            "dedup_key": f"{wristband_id}:{alert_type}:{metric}:{severity}",
+            "severity": severity,
+            "occurrences": occurrences,
+            "occurrence_count": episode.occurrence_count,
+            "first_seen_at": episode.first_seen_at,
+            "last_seen_at": episode.last_seen_at,
+            "last_value": episode.last_value,
+        }
+        if escalated_from:
+            fields["escalated_from"] = escalated_from
+        return fields
+
+    # ----------------------------
+    # Background flush
+    # ----------------------------
+    def flush_due(self) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        (last risk event, UPDATED fields) for episodes with unpublished
+        occurrences whose update interval elapsed (or that went quiet),
+        plus those of episodes evicted since the last call.
+        """
+        now = time.monotonic()
+        with self._lock:
+            due, self._evicted = self._evicted, []
+            due += [
+                (episode.last_event, self._publish_update(episode, now))
+                for episode in self._episodes.values()
+                if episode.pending and (
+                    now - episode.last_published >= self.update_interval_seconds
+                    or now - episode.last_seen >= self.cooldown_seconds
+                )
+            ]
+            self._expire(now)
+        return due
+
+    def _evict(self, now: float) -> None:
+        _, episode = self._episodes.popitem(last=False)
+        self._evictions += 1
+        if episode.pending:
+            self._evicted.append((episode.last_event, self._publish_update(episode, now)))
+
+    def _expire(self, now: float) -> None:
+        """
+        Episodes are kept in last-seen order: walk from the oldest and stop
+        at the first one still inside its cooldown. Episodes with
+        unpublished occurrences wait for flush_due().
+        """
+        expired = []
+        for key, episode in self._episodes.items():
+            if now - episode.last_seen < self.cooldown_seconds:
+                break
+            if not episode.pending:
+                expired.append(key)
+        for key in expired:
+            del self._episodes[key]
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "open_episodes": len(self._episodes),
+                "created": self._created,
+                "escalated": self._escalated,
+                "updates": self._updates,
+                "suppressed": self._suppressed,
+                "downgraded": self._downgraded,
+                "evictions": self._evictions,
+            }
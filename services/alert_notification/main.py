@@ -1,9 +1,14 @@
-import json
+import os
+import threading
 import requests
 import paho.mqtt.client as mqtt
 from datetime import datetime
 import time
 
+from dedup import AlertDeduplicator, UPDATED
+from assignment_resolver import AssignmentResolver
+from shared.codec import ASSIGNMENT_CHANGE, RISK_EVENT, CodecError, decode, dumps
+
 # ----------------------------------
 # Health Catalog endpoints
 # ----------------------------------
@@ -13,6 +18,29 @@ MQTT_TOPICS_ENDPOINT = "/config/mqtt/topics"
 ALERTS_ENDPOINT = "/config/alerts"
 ENVIRONMENTS_ENDPOINT = "/config/environments"
 
+# ----------------------------------
+# Data Storage API
+# ----------------------------------
+DATA_STORAGE_BASE = os.getenv("DATA_STORAGE_URL", "http://data-storage:8003")
+
+# Assignment cache: change events usually update it first,
+# the TTL is the safety net. Unassigned wristbands are cached shorter.
+ASSIGNMENT_CACHE_TTL_SECONDS = float(os.getenv("ASSIGNMENT_CACHE_TTL_SECONDS", "300"))
+ASSIGNMENT_CACHE_NEGATIVE_TTL_SECONDS = float(
+    os.getenv("ASSIGNMENT_CACHE_NEGATIVE_TTL_SECONDS", "30")
+)
+
+
+# ----------------------------------
+# Deduplication / suppression
+# ----------------------------------
+# A repeat of an open alert within the cooldown only bumps its counter
+ALERT_COOLDOWN_SECONDS = float(os.getenv("ALERT_COOLDOWN_SECONDS", "300"))
+# At most one update message per open alert in this interval
+ALERT_UPDATE_INTERVAL_SECONDS = float(os.getenv("ALERT_UPDATE_INTERVAL_SECONDS", "60"))
+ALERT_DEDUP_MAX_KEYS = int(os.getenv("ALERT_DEDUP_MAX_KEYS", "50000"))
+ALERT_FLUSH_INTERVAL_SECONDS = float(os.getenv("ALERT_FLUSH_INTERVAL_SECONDS", "5"))
+
 
 # ----------------------------------
 # Global configs (loaded at startup)
@@ -21,6 +49,18 @@ MQTT_TOPICS = {}
 ALERT_CONFIG = {}
 ENV_CONFIG = {}
 
+DEDUP = AlertDeduplicator(
+    cooldown_seconds=ALERT_COOLDOWN_SECONDS,
+    update_interval_seconds=ALERT_UPDATE_INTERVAL_SECONDS,
+    max_keys=ALERT_DEDUP_MAX_KEYS,
+)
+
+ASSIGNMENTS = AssignmentResolver(
+    DATA_STORAGE_BASE,
+    ttl_seconds=ASSIGNMENT_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=ASSIGNMENT_CACHE_NEGATIVE_TTL_SECONDS,
+)
+
 
 # ----------------------------------
 # Helpers
@@ -66,6 +106,17 @@ def build_descriptions(event: dict):
 
     metric_label = metric.replace("_", " ").title()
 
+    # Windowed rules (persistence / trend / anomaly) explain themselves
+    reason = event.get("reason")
+    if reason:
+        short_description = f"{metric_label} {reason}"
+        full_description = (
+            f"The {metric_label.lower()} recorded from wristband "
+            f"WB-{wristband_id} (latest value {value}) is {reason}, "
+            f"which raised a {severity} {event.get('alert_type')} alert."
+        )
+        return short_description, full_description
+
     short_description = f"{metric_label} above {severity} threshold"
 
     full_description = (
@@ -77,6 +128,14 @@ def build_descriptions(event: dict):
     return short_description, full_description
 
 
+def warm_assignments():
+    try:
+        ASSIGNMENTS.warm()
+    except Exception as e:
+        # Lookups fall back to one request per wristband
+        print(f"[ALERT] assignment cache warm-up failed: {e}")
+
+
 # ----------------------------------
 # MQTT callbacks
 # ----------------------------------
@@ -88,24 +147,73 @@ def on_connect(client, userdata, flags, rc):
 
     print(f"[ALERT] Subscribed to {risk_topic}")
 
+    changes_topic = assignment_changes_pattern()
+    client.subscribe(changes_topic, qos=1)
+
+    print(f"[ALERT] Subscribed to {changes_topic}")
+
+
+def assignment_changes_pattern() -> str:
+    return (
+        MQTT_TOPICS["mqtt_topics"].get("assignment_changes", {}).get("subscribe_pattern")
+        or "health/assignments/+"
+    )
+
 
 def on_message(client, userdata, msg):
+    if mqtt.topic_matches_sub(assignment_changes_pattern(), msg.topic):
+        on_assignment_change(msg)
+        return
+
     print(f"[ALERT] Risk event received on {msg.topic}")
 
     try:
-        event = json.loads(msg.payload.decode())
-    except json.JSONDecodeError:
-        print("[ALERT] Invalid JSON payload")
+        event = decode(msg.payload, RISK_EVENT)
+    except CodecError as e:
+        print(f"[ALERT] Invalid risk event payload: {e}")
         return
 
+    dedup = DEDUP.process(event)
+    if dedup is None:
+        print(f"[ALERT] Suppressed repeat of open alert (wristband {event.get('wristband_id')})")
+        return
+
+    publish_alert(client, event, dedup)
+
+
+def on_assignment_change(msg):
+    try:
+        event = decode(msg.payload, ASSIGNMENT_CHANGE)
+    except CodecError as e:
+        print(f"[ALERT] Invalid assignment change payload: {e}")
+        return
+
+    if event.get("wristband_id") is None:
+        # Whole index reloaded in Data Storage: fetch a new snapshot
+        threading.Thread(target=warm_assignments, daemon=True).start()
+        return
+
+    ASSIGNMENTS.apply_change(event)
+
+
+def publish_alert(client, event: dict, dedup: dict):
     # Build UI-friendly descriptions
-    short_desc, full_desc = build_descriptions(event)
+    short_desc, full_desc = build_descriptions({**event, "severity": dedup["severity"]})
+
+    # Resolved here so Storage and the dashboard need no lookup
+    wristband_id = event.get("wristband_id")
+    assignment = ASSIGNMENTS.resolve(wristband_id) if wristband_id is not None else None
+    if assignment is None:
+        print(f"[ALERT][WARN] No active assignment for wristband {wristband_id}")
+        assignment = {}
 
     # Final alert payload (UI + Storage ready)
     alert = {
-        "assignment_id": event.get("wristband_id"),  # DB will resolve mapping
+        "assignment_id": assignment.get("assignment_id"),
+        "patient_id": assignment.get("patient_id"),
+        "wristband_id": wristband_id,
         "alert_type": event.get("alert_type"),
-        "severity": event.get("severity"),
+        "severity": dedup["severity"],
         "status": ALERT_CONFIG["lifecycle"]["initial_status"],
 
         "metric": event.get("vital"),
@@ -115,14 +223,37 @@ def on_message(client, userdata, msg):
         "full_description": full_desc,
 
         "threshold_profile": event.get("threshold_profile"),
-        "generated_at": datetime.utcnow().isoformat()
+        "generated_at": datetime.utcnow().isoformat(),
+
+        # created = new alert, updated = more occurrences of the open one
+        **dedup,
     }
 
     alert_topic = MQTT_TOPICS["mqtt_topics"]["alerts"]["topic"]
 
-    client.publish(alert_topic, json.dumps(alert), qos=1)
+    client.publish(alert_topic, dumps(alert), qos=1)
 
-    print(f"[ALERT] Final alert published: {alert}")
+    if dedup["event"] == UPDATED:
+        print(
+            f"[ALERT] Open alert updated {dedup['dedup_key']} "
+            f"(+{dedup['occurrences']}, total {dedup['occurrence_count']})"
+        )
+    else:
+        print(f"[ALERT] Final alert published: {alert}")
+
+
+def flush_updates_forever(client):
+    """
+    Publish counters of open alerts that were suppressed in the last
+    update interval.
+    """
+    while True:
+        time.sleep(ALERT_FLUSH_INTERVAL_SECONDS)
+        try:
+            for event, dedup in DEDUP.flush_due():
+                publish_alert(client, event, dedup)
+        except Exception as e:
+            print(f"[ALERT][WARN] dedup flush failed: {e}")
 
 
 # ----------------------------------
@@ -153,6 +284,15 @@ def main():
     print(f"[ALERT] Connecting to MQTT {mqtt_conf['host']}:{mqtt_conf['port']}")
     client.connect(mqtt_conf["host"], mqtt_conf["port"])
 
+    warm_assignments()
+
+    threading.Thread(
+        target=flush_updates_forever,
+        args=(client,),
+        name="alert-dedup-flush",
+        daemon=True,
+    ).start()
+
     client.loop_forever()
 
 
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, Depends, status
+import json
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 
 from app.models.schemas import AlertAckRequest
 from app.services.storage import Storage
 from app.services.container import get_storage
+from app.services.alert_stream import (
+    ALERT_STREAM_HEARTBEAT_SECONDS,
+    alert_event_stream,
+)
 from app.services.alerts_service import (
     list_alerts_ui,
     acknowledge_alert_ui,
@@ -10,20 +19,108 @@ from app.services.alerts_service import (
 
 router = APIRouter()
 
+# Page size when a cursor is given without a limit
+ALERTS_PAGE_SIZE = 100
+
 
 @router.get(
     "/",
-    summary="Get all alerts",
-    description="Return all alerts for the Alerts page. Filtering is handled in the UI.",
+    summary="Get alerts",
+    description=(
+        "Return alerts for the Alerts page, newest first. Filtering is done "
+        "server-side. Without limit and cursor every matching alert is "
+        "returned; with limit, the cursor for the next page is returned in "
+        "the X-Next-Cursor response header."
+    ),
 )
-def get_alerts(db: Storage = Depends(get_storage)):
+async def get_alerts(
+    response: Response,
+    status_: Optional[List[str]] = Query(None, alias="status"),
+    severity: Optional[List[str]] = Query(None),
+    patient_id: Optional[int] = Query(None),
+    metric: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    db: Storage = Depends(get_storage),
+):
     """
-    Get all alerts for the Alerts page.
+    Get alerts (all, or one page when limit / cursor is given) for the
+    Alerts page.
 
     این endpoint فقط دیتا را برمی‌گرداند
     و هیچ تغییری در وضعیت هشدارها ایجاد نمی‌کند.
     """
-    return list_alerts_ui(db)
+    if limit is None and cursor:
+        limit = ALERTS_PAGE_SIZE
+    try:
+        page = await list_alerts_ui(
+            db,
+            status=status_,
+            severity=severity,
+            patient_id=patient_id,
+            metric=metric,
+            since=since.isoformat() if since else None,
+            until=until.isoformat() if until else None,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The body stays a plain list (UI contract); pagination goes in a header
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+
+    return page["items"]
+
+
+@router.get(
+    "/stream",
+    summary="Live alert stream (SSE)",
+    description=(
+        "Server-Sent Events stream of new alerts with sequence numbers. "
+        "Reconnects resume from Last-Event-ID (or ?since=) using a bounded "
+        "in-memory buffer; a 'reset' event means the client must refetch."
+    ),
+)
+async def stream_alerts(
+    since: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    if since is None and last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    sub, replay = alert_event_stream.subscribe(since)
+
+    async def events():
+        try:
+            for event in replay:
+                yield _sse(event)
+            while True:
+                try:
+                    event = await sub.get(timeout=ALERT_STREAM_HEARTBEAT_SECONDS)
+                except ConnectionResetError:
+                    # Too slow: EventSource reconnects with Last-Event-ID
+                    return
+                yield _sse(event) if event else ": keep-alive\n\n"
+        finally:
+            alert_event_stream.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _sse(event: dict) -> str:
+    return (
+        f"id: {event['seq']}\n"
+        f"event: {event['type']}\n"
+        f"data: {json.dumps(event, default=str)}\n\n"
+    )
 
 
 @router.post(
@@ -32,7 +129,7 @@ def get_alerts(db: Storage = Depends(get_storage)):
     summary="Acknowledge an alert",
     description="Mark an alert as acknowledged and optionally attach a clinical note.",
 )
-def acknowledge_alert(
+async def acknowledge_alert(
     alert_id: int,
     payload: AlertAckRequest | None = None,
     db: Storage = Depends(get_storage),
@@ -49,7 +146,7 @@ def acknowledge_alert(
     reviewed_by = payload.reviewed_by if payload else None
     clinical_note = payload.clinical_note if payload else None
 
-    acknowledge_alert_ui(
+    await acknowledge_alert_ui(
         storage=db,
         alert_id=alert_id,
         reviewed_by=reviewed_by,
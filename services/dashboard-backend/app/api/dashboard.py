@@ -16,7 +16,7 @@ router = APIRouter()
     summary="Get dashboard overview",
     description="Aggregated metrics and recent alerts for the main dashboard overview page.",
 )
-def dashboard_overview(db: Storage = Depends(get_storage)):
+async def dashboard_overview(db: Storage = Depends(get_storage)):
     """
     Dashboard Overview API endpoint.
 
@@ -26,6 +26,6 @@ def dashboard_overview(db: Storage = Depends(get_storage)):
     - Does NOT expose database schema details
     - Uses dependency injection for storage access
     """
-    return get_dashboard_overview(db)
+    return await get_dashboard_overview(db)
 
 
@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+
+from app.services.alert_stream import alert_event_stream
+from app.services.patient_vital_stream import patient_vital_stream
+from app.services.response_cache import response_cache
+
+router = APIRouter()
+
+
+@router.get(
+    "/",
+    summary="Get backend metrics",
+    description=(
+        "Response cache hit/miss/eviction counters, live vital stream "
+        "fan-out (subscribers, lag, drops) and alert stream state."
+    ),
+)
+async def get_metrics():
+    return {
+        "response_cache": response_cache.stats(),
+        "vital_stream": patient_vital_stream.stats(),
+        "alert_stream": alert_event_stream.stats(),
+    }
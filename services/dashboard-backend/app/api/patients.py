@@ -18,11 +18,11 @@ router = APIRouter()
         "latest vitals, and risk status computed from latest active alert."
     ),
 )
-def get_patients(db: Storage = Depends(get_storage)):
+async def get_patients(db: Storage = Depends(get_storage)):
     """
     Get patients overview for Patients page.
     """
-    return get_patients_overview(db)
+    return await get_patients_overview(db)
 
 
 @router.get(
@@ -31,11 +31,11 @@ def get_patients(db: Storage = Depends(get_storage)):
     description="Return all alerts related to a specific patient.",
 )
 
-def patient_alerts(
+async def patient_alerts(
     patient_id: int,
     db: Storage = Depends(get_storage),
 ):
-    return get_patient_alerts(db, patient_id)
+    return await get_patient_alerts(db, patient_id)
 
 
 @router.post(
@@ -44,7 +44,7 @@ def patient_alerts(
     summary="Create a new patient",
     description="Create a new patient record in the system.",
 )
-def create_patient_api(
+async def create_patient_api(
     payload: PatientCreateRequest,
     db: Storage = Depends(get_storage),
 ):
@@ -52,7 +52,7 @@ def create_patient_api(
     Create patient (and optional wristband assignment).
     Assignment is handled inside Data Storage Service.
     """
-    return create_patient(db, payload.dict())
+    return await create_patient(db, payload.dict())
 
 
 @router.get(
@@ -60,11 +60,11 @@ def create_patient_api(
     summary="Get patient details",
     description="Return detailed information for a single patient.",
 )
-def get_patient(
+async def get_patient(
     patient_id: int,
     db: Storage = Depends(get_storage),
 ):
     try:
-        return get_patient_detail(db, patient_id)
+        return await get_patient_detail(db, patient_id)
     except ValueError:
         raise HTTPException(status_code=404, detail="Patient not found")
\ No newline at end of file
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, Query
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 from app.services.container import get_storage
 from app.services.storage import Storage
 from app.services.vitals_service import (
     get_latest_vitals_ui,
     get_vitals_history_ui,
+    get_vitals_range_ui,
 )
 
 router = APIRouter()
@@ -14,23 +18,54 @@ router = APIRouter()
     "/latest",
     summary="Get latest vitals for all active patients",
 )
-def get_latest_vitals(
+async def get_latest_vitals(
     db: Storage = Depends(get_storage),
 ):
-    return get_latest_vitals_ui(db)
+    return await get_latest_vitals_ui(db)
 
 
 @router.get(
     "/{patient_id}/history",
     summary="Get vitals history for a patient",
 )
-def get_vitals_history(
+async def get_vitals_history(
     patient_id: int,
     limit: int = Query(50, ge=1, le=500),
     db: Storage = Depends(get_storage),
 ):
-    return get_vitals_history_ui(
+    return await get_vitals_history_ui(
         storage=db,
         patient_id=patient_id,
         limit=limit,
     )
+
+
+@router.get(
+    "/{patient_id}/range",
+    summary="Get downsampled vitals for a time range",
+    description=(
+        "Return vitals for a patient in [start, end) downsampled by Data Storage: "
+        "min/max/avg per bucket (method=bucket) or LTTB points (method=lttb)."
+    ),
+)
+async def get_vitals_range(
+    patient_id: int,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    resolution: Optional[str] = Query(None, description="e.g. 30s, 1m, 5m, 1h"),
+    method: Literal["bucket", "lttb"] = Query("bucket"),
+    points: int = Query(500, ge=3, le=5000),
+    db: Storage = Depends(get_storage),
+):
+    try:
+        return await get_vitals_range_ui(
+            storage=db,
+            patient_id=patient_id,
+            start=start.isoformat() if start else None,
+            end=end.isoformat() if end else None,
+            resolution=resolution,
+            method=method,
+            points=points,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
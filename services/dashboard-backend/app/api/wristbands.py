@@ -20,7 +20,7 @@ router = APIRouter()
     summary="Create a new wristband",
     description="Register a new wristband device in the system.",
 )
-def create_wristband_api(
+async def create_wristband_api(
     payload: WristbandCreateRequest,
     db: Storage = Depends(get_storage),
 ):
@@ -31,7 +31,7 @@ def create_wristband_api(
     - داخل جدول WRISTBAND ذخیره می‌کند
     """
     try:
-        return create_wristband(db, payload.wristband_id)
+        return await create_wristband(db, payload.wristband_id)
     except sqlite3.IntegrityError:
         # Duplicate wristband_id (primary key)
         raise HTTPException(
@@ -44,8 +44,8 @@ def create_wristband_api(
     summary="Get all wristbands",
     description="Return all wristbands registered in the system.",
 )
-def get_wristbands(db: Storage = Depends(get_storage)):
-    return list_wristbands(db)
+async def get_wristbands(db: Storage = Depends(get_storage)):
+    return await list_wristbands(db)
 
 
 # @router.get(
@@ -59,12 +59,12 @@ def get_wristbands(db: Storage = Depends(get_storage)):
 
 
 @router.post("/{wristband_id}/unassign")
-def unassign_wristband_api(
+async def unassign_wristband_api(
     wristband_id: int,
     db: Storage = Depends(get_storage),
 ):
     try:
-        unassign_wristband(db, wristband_id)
+        await unassign_wristband(db, wristband_id)
         return {"status": "ok"}
     except ValueError:
         raise HTTPException(
@@ -1,16 +1,250 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from app.services.patient_vital_stream import patient_vital_stream
+import asyncio
+import json
+import os
+import time
+from typing import Optional
+
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect, status
+from app.services.alert_stream import (
+    ALERT_STREAM_HEARTBEAT_SECONDS,
+    alert_event_stream,
+)
+from app.services.patient_vital_stream import (
+    COALESCE,
+    POLICIES,
+    VITAL_STREAM_MUX_QUEUE_SIZE,
+    patient_vital_stream,
+)
+from app.services.vital_frames import (
+    ENCODING_JSON,
+    MODE_DELTA,
+    MODE_RAW,
+    delta_frame,
+    encode,
+    negotiate_encoding,
+    snapshot_frame,
+)
+
+# Ward (multiplexed) stream defaults
+VITAL_MUX_DEFAULT_FPS = float(os.getenv("VITAL_MUX_DEFAULT_FPS", "4"))
+VITAL_MUX_MAX_BATCH = int(os.getenv("VITAL_MUX_MAX_BATCH", "500"))
 
 router = APIRouter()
 
 @router.websocket("/patients/{patient_id}/vitals")
-async def patient_vitals_ws(websocket: WebSocket, patient_id: int):
+async def patient_vitals_ws(
+    websocket: WebSocket,
+    patient_id: int,
+    policy: Optional[str] = Query(None, description="drop_oldest | coalesce | disconnect"),
+    mode: str = Query(MODE_RAW, description="raw | delta"),
+    encoding: str = Query(ENCODING_JSON, description="json | msgpack (delta mode)"),
+):
+    """
+    Live vitals of one patient.
+
+    mode=raw (default): every MQTT event as JSON, as before.
+    mode=delta: a JSON "hello" frame with the negotiated encoding, then a
+        snapshot (latest values + recent window) and afterwards only the
+        changed fields with a monotonic version. encoding=msgpack sends
+        binary frames when msgpack is available.
+    """
+    if (policy is not None and policy not in POLICIES) or mode not in (MODE_RAW, MODE_DELTA):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
     await websocket.accept()
-    print(f"[WS] connected: patient {patient_id}")
+    print(f"[WS] connected: patient {patient_id} (mode={mode})")
 
     try:
-        async for event in patient_vital_stream.subscribe(patient_id):
-            await websocket.send_json(event)
+        if mode == MODE_DELTA:
+            ended = await _stream_deltas(websocket, patient_id, policy, encoding)
+        else:
+            ended = True
+            async for event in patient_vital_stream.subscribe(patient_id, policy=policy):
+                await websocket.send_json(event)
+
+        if ended:
+            # Stream ended: subscriber was too slow (policy=disconnect)
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
 
     except WebSocketDisconnect:
         print(f"[WS] disconnected: patient {patient_id}")
+
+
+async def _stream_deltas(websocket: WebSocket, patient_id: int, policy, encoding) -> bool:
+    encoding = negotiate_encoding(encoding)
+    await websocket.send_json({"type": "hello", "mode": MODE_DELTA, "encoding": encoding})
+
+    async def send(frame: dict) -> None:
+        data = encode(frame, encoding)
+        if isinstance(data, bytes):
+            await websocket.send_bytes(data)
+        else:
+            await websocket.send_text(data)
+
+    # Snapshot and registration happen without an await in between,
+    # so no update can fall between them
+    sub = patient_vital_stream.open(policy=policy or COALESCE)
+    snapshot = patient_vital_stream.snapshot(patient_id)
+    patient_vital_stream.add(sub, patient_id, send_last=False)
+
+    try:
+        await send(snapshot_frame(patient_id, snapshot))
+        version, state = snapshot["version"], snapshot["data"]
+
+        while await sub.wait():
+            for event in sub.drain():
+                if event["version"] <= version:
+                    continue
+                frame, state = delta_frame(state, event.get("data") or {}, version, event["version"])
+                if frame is not None:
+                    await send(frame)
+                    # Unchanged updates are not sent: the next delta's base
+                    # must stay the last version the client actually has
+                    version = event["version"]
+        return True
+    finally:
+        patient_vital_stream.close(sub)
+
+
+@router.websocket("/vitals")
+async def ward_vitals_ws(
+    websocket: WebSocket,
+    max_fps: float = Query(VITAL_MUX_DEFAULT_FPS, gt=0, le=60),
+    policy: str = Query(COALESCE, description="drop_oldest | coalesce | disconnect"),
+):
+    """
+    Multiplexed vitals for many patients over one socket.
+
+    Client -> server (JSON):
+        {"action": "subscribe",   "patient_ids": [1, 2, 3]}
+        {"action": "subscribe",   "all": true}      # every active patient
+        {"action": "unsubscribe", "patient_ids": [2]}
+        {"action": "unsubscribe", "all": true}
+
+    Server -> client (at most max_fps frames per second):
+        {"type": "vital_batch", "events": [{"type": "vital_update", ...}, ...]}
+        {"type": "subscribed", "patient_ids": [...], "all": bool}
+        {"type": "error", "detail": "..."}
+    """
+    if policy not in POLICIES:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    sub = patient_vital_stream.open(policy=policy, maxsize=VITAL_STREAM_MUX_QUEUE_SIZE)
+    print(f"[WS] ward stream connected (max_fps={max_fps})")
+
+    async def receive_commands():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+            try:
+                command = json.loads(message.get("text") or message.get("bytes") or "")
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Command must be valid JSON"})
+                continue
+            try:
+                _apply_command(sub, command)
+            except (TypeError, ValueError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            await websocket.send_json({
+                "type": "subscribed",
+                "patient_ids": sorted(sub.patient_ids),
+                "all": sub.all_patients,
+            })
+
+    async def send_batches():
+        interval = 1.0 / max_fps
+        while await sub.wait():
+            started = time.monotonic()
+            events = sub.drain(VITAL_MUX_MAX_BATCH)
+            await websocket.send_json({"type": "vital_batch", "events": events})
+            # Frame-rate cap: events arriving meanwhile go into the next batch
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    receiver = asyncio.create_task(receive_commands())
+    sender = asyncio.create_task(send_batches())
+    try:
+        done, _ = await asyncio.wait(
+            {receiver, sender}, return_when=asyncio.FIRST_COMPLETED
+        )
+        # Retrieve the task errors; a client disconnect is a normal close
+        errors = [t.exception() for t in done]
+        for error in errors:
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                print(f"[WS] ward stream failed: {error!r}")
+        if sender in done and not any(errors):
+            # Stream ended: subscriber was too slow (policy=disconnect)
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+    finally:
+        receiver.cancel()
+        sender.cancel()
+        patient_vital_stream.close(sub)
+        print("[WS] ward stream disconnected")
+
+
+def _apply_command(sub, message: dict) -> None:
+    if not isinstance(message, dict):
+        raise ValueError("Command must be a JSON object")
+
+    action = message.get("action")
+    if action not in ("subscribe", "unsubscribe"):
+        raise ValueError(f"Unknown action: {action!r}")
+
+    patient_ids = [int(p) for p in message.get("patient_ids") or []]
+
+    if action == "subscribe":
+        if message.get("all"):
+            patient_vital_stream.add_all(sub)
+        for patient_id in patient_ids:
+            patient_vital_stream.add(sub, patient_id)
+    else:
+        if message.get("all"):
+            patient_vital_stream.remove_all(sub)
+            for patient_id in list(sub.patient_ids):
+                patient_vital_stream.remove(sub, patient_id)
+        for patient_id in patient_ids:
+            patient_vital_stream.remove(sub, patient_id)
+
+
+@router.websocket("/alerts")
+async def alerts_ws(
+    websocket: WebSocket,
+    since: Optional[int] = Query(None, ge=0),
+):
+    """
+    Live alerts with sequence numbers.
+
+    - {"type": "alert_created" | "alert_updated", "alert": {...}}: the
+      alert as saved, same fields as the /alerts rows plus patient_id
+      (alert_updated = repeat merged into that alert_id)
+    - since=<seq>: replay buffered events after seq first
+    - {"type": "reset"}: events were missed, refetch /alerts
+    - {"type": "ping"}: keep-alive when idle
+    """
+    await websocket.accept()
+    sub, replay = alert_event_stream.subscribe(since)
+    print(f"[WS] alert stream connected (since={since})")
+
+    try:
+        for event in replay:
+            await websocket.send_json(event)
+
+        while True:
+            try:
+                event = await sub.get(timeout=ALERT_STREAM_HEARTBEAT_SECONDS)
+            except ConnectionResetError:
+                # Too slow: client reconnects with ?since=<last seq>
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                break
+            await websocket.send_json(
+                event or {"type": "ping", "latest_seq": sub.last_seq}
+            )
+
+    except WebSocketDisconnect:
+        print("[WS] alert stream disconnected")
+    finally:
+        alert_event_stream.unsubscribe(sub)
@@ -1,11 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import patients, vitals, alerts, dashboard, wristbands
+from app.api import patients, vitals, alerts, dashboard, wristbands, metrics
 from app.mqtt.alert_subscriber import AlertMQTTSubscriber
 from app.config.load_health_catalog import load_health_catalog_config
 from app.mqtt.vital_subscriber import VitalMQTTSubscriber
 from app.api import ws # Ensure WebSocket routes are registered
+from app.services.container import get_storage
 
 
 
@@ -32,6 +33,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # --------------------------------------------------
@@ -43,6 +45,7 @@ app.include_router(alerts.router, prefix="/alerts", tags=["alerts"])
 app.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
 app.include_router(wristbands.router, prefix="/wristbands", tags=["wristbands"])
 app.include_router(ws.router, prefix="/ws", tags=["websockets"])
+app.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
 
 
 # --------------------------------------------------
@@ -66,6 +69,15 @@ def startup_event():
     print("[DASHBOARD] MQTT vital subscriber started")
 
 
+# --------------------------------------------------
+# Shutdown: release pooled Data Storage connections
+# --------------------------------------------------
+@app.on_event("shutdown")
+async def shutdown_event():
+    await get_storage().aclose()
+    print("[DASHBOARD] storage client closed")
+
+
 # --------------------------------------------------
 # Health check
 # --------------------------------------------------
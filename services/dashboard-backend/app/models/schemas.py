@@ -97,6 +97,9 @@ class AlertListItem(BaseModel):
     generated_at: datetime
     metric: str
     value: Optional[Union[int, float, str]] = None
+    occurrence_count: int = 1
+    last_value: Optional[Union[int, float]] = None
+    last_seen_at: Optional[datetime] = None
 
 
 # ======================================================
@@ -1,19 +1,22 @@
-import json
 import threading
 import os
 
 import paho.mqtt.client as mqtt
 
+from shared.codec import PERSISTED_ALERT, CodecError, decode
 from app.services.alert_stream import alert_event_stream
+from app.services.alerts_service import build_live_alert_item
+from app.services.response_cache import invalidate_for_alert
 
 
 class AlertMQTTSubscriber:
     """
-    Dashboard Backend MQTT subscriber for FINAL alerts.
+    Dashboard Backend MQTT subscriber for persisted alerts.
 
     Responsibilities:
-    - Subscribe to final alert topics
-    - Notify UI layer that new alert data is available
+    - Subscribe to the alert rows Data Storage publishes once saved
+      (alert_id, patient and occurrence_count are known by then)
+    - Push the full alert to the UI stream (WebSocket / SSE)
     - NO persistence
     - NO business logic
 
@@ -35,8 +38,11 @@ class AlertMQTTSubscriber:
         # --------------------------------------------------
         mqtt_topics = config["mqtt_topics"]
 
-        # Use strict topic (no wildcard) for dashboard
-        self.alerts_topic = mqtt_topics["alerts"]["topic"]
+        # Saved alert rows (not the raw alerts: those have no alert_id yet)
+        self.alerts_topic = (
+            mqtt_topics.get("persisted_alerts", {}).get("topic")
+            or "health/persisted_alerts"
+        )
 
         # --------------------------------------------------
         # MQTT client
@@ -61,16 +67,28 @@ class AlertMQTTSubscriber:
         print(f"[DASHBOARD-MQTT] alert received on {msg.topic}")
 
         # Dashboard Backend does NOT own alert data
-        # It only notifies UI that new alert data is available
+        # It forwards the saved alert to the UI so it can patch its state
         try:
-            json.loads(msg.payload.decode())
-        except json.JSONDecodeError:
-            print("[DASHBOARD-MQTT] invalid JSON payload, ignored ❌")
+            message = decode(msg.payload, PERSISTED_ALERT)
+        except CodecError as e:
+            print(f"[DASHBOARD-MQTT] invalid payload ({e}), ignored ❌")
+            return
+
+        alert = message["alert"]
+        if alert.get("alert_id") is None:
+            print("[DASHBOARD-MQTT] persisted alert without alert_id, ignored ❌")
             return
 
+        # Cached dashboard/patient responses are now stale
+        invalidate_for_alert(alert.get("patient_id"))
+
+        # Repeats merged into an open alert update it (UI patches the row)
+        event_type = "alert_updated" if message["event"] == "updated" else "alert_created"
+
         alert_event_stream.publish(
             {
-                "type": "alert_created"
+                "type": event_type,
+                "alert": build_live_alert_item(alert),
             }
         )
 
@@ -1,12 +1,17 @@
-import json
 import threading
 import os
 import asyncio
 
 import paho.mqtt.client as mqtt
 
+from shared.codec import VITALS, CodecError, decode
 from app.services.assignment_cache import get_patient_id_for_wristband
 from app.services.patient_vital_stream import patient_vital_stream
+from app.services.response_cache import invalidate_for_vital
+
+
+# Must match Data Storage's dashboard low-battery threshold
+LOW_BATTERY_THRESHOLD = 30
 
 
 class VitalMQTTSubscriber:
@@ -25,6 +30,9 @@ class VitalMQTTSubscriber:
 
         self._client = mqtt.Client(client_id="dashboard-backend-vitals")
 
+        # wristband_id -> last known "battery is low" state
+        self._low_battery: dict = {}
+
         #  event loop اصلی FastAPI
         self.loop = asyncio.get_event_loop()
 
@@ -43,16 +51,13 @@ class VitalMQTTSubscriber:
         print(f"[VITAL-MQTT] message received on {msg.topic}")
 
         try:
-            payload = json.loads(msg.payload.decode())
-        except json.JSONDecodeError:
-            print("[VITAL-MQTT] invalid JSON payload ❌")
+            payload = decode(msg.payload, VITALS)
+        except CodecError as e:
+            print(f"[VITAL-MQTT] invalid payload ({e}) ❌")
             return
 
-        wristband_id = payload.get("wristband_id")
-        if wristband_id is None:
-            print("[VITAL-MQTT] wristband_id missing")
-            return
-        
+        wristband_id = payload["wristband_id"]
+
         print("[VITAL-MQTT] payload:", payload)
 
         patient_id = get_patient_id_for_wristband(int(wristband_id))
@@ -68,18 +73,32 @@ class VitalMQTTSubscriber:
             print(f"[VITAL-MQTT] no patient for wristband {wristband_id}")
             return
 
+        # Cached patient responses are now stale; the dashboard only if
+        # the device crossed the low-battery threshold
+        invalidate_for_vital(patient_id, self._low_battery_changed(payload))
+
         event = {
             "type": "vital_update",
             "patient_id": patient_id,
             "data": payload
         }
 
-        #  thread-safe async publish
-        asyncio.run_coroutine_threadsafe(
-            patient_vital_stream.publish(patient_id, event),
-            self.loop
+        #  thread-safe, non-blocking publish on the FastAPI loop
+        self.loop.call_soon_threadsafe(
+            patient_vital_stream.publish, patient_id, event
         )
 
+    def _low_battery_changed(self, payload: dict) -> bool:
+        battery = payload.get("battery_level")
+        if battery is None:
+            return False
+
+        wristband_id = int(payload["wristband_id"])
+        low = battery < LOW_BATTERY_THRESHOLD
+        changed = self._low_battery.get(wristband_id) != low
+        self._low_battery[wristband_id] = low
+        return changed
+
     # ----------------------------------
     # Runner
     # ----------------------------------
@@ -1,57 +1,155 @@
-from typing import Set, Dict, Any
+import asyncio
+import os
 import threading
-import queue
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+# Recent events kept for resume (?since= / Last-Event-ID)
+ALERT_STREAM_BUFFER_SIZE = int(os.getenv("ALERT_STREAM_BUFFER_SIZE", "1000"))
+
+# Pending events per subscriber before it is dropped (it can resume)
+ALERT_STREAM_QUEUE_SIZE = int(os.getenv("ALERT_STREAM_QUEUE_SIZE", "256"))
+
+# Idle connections get a keep-alive frame this often
+ALERT_STREAM_HEARTBEAT_SECONDS = float(os.getenv("ALERT_STREAM_HEARTBEAT_SECONDS", "15"))
+
+
+class AlertSubscription:
+    """
+    One async consumer (WebSocket / SSE) of the alert stream.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int) -> None:
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.last_seq = 0
+        self.closed = False
+
+    def _offer(self, event: Dict[str, Any]) -> None:
+        """
+        Runs on the subscriber's event loop.
+        """
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too slow: stop here, the client resumes from its last seq
+            self.closed = True
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Next event with a seq greater than the last one returned, or None
+        on timeout. Raises ConnectionResetError once the subscriber was
+        dropped for being too slow and its queue is drained.
+        """
+        while True:
+            if self.closed and self.queue.empty():
+                raise ConnectionResetError("alert subscriber too slow")
+            try:
+                event = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            if event["seq"] > self.last_seq:
+                self.last_seq = event["seq"]
+                return event
 
 
 class AlertEventStream:
     """
     In-memory fan-out stream for alert events.
 
-    - MQTT subscriber publishes events
-    - WebSocket/SSE clients subscribe
+    - MQTT subscriber publishes events (from its own thread)
+    - WebSocket/SSE clients subscribe (async)
+    - Every event gets a sequence number; the last ALERT_STREAM_BUFFER_SIZE
+      events are kept so clients can resume after a reconnect
     - No persistence
     - No business logic
     """
 
-    def __init__(self):
-        self._subscribers: Set[queue.Queue] = set()
+    def __init__(
+        self,
+        buffer_size: int = ALERT_STREAM_BUFFER_SIZE,
+        queue_size: int = ALERT_STREAM_QUEUE_SIZE,
+    ):
+        self.queue_size = queue_size
+        self._subscribers: Set[AlertSubscription] = set()
+        self._buffer: deque = deque(maxlen=buffer_size)
+        self._seq = 0
         self._lock = threading.Lock()
 
     # ----------------------------
     # Subscription management
     # ----------------------------
-    def subscribe(self) -> queue.Queue:
+    def subscribe(self, since: Optional[int] = None) -> Tuple[AlertSubscription, List[Dict[str, Any]]]:
         """
-        Register a new subscriber and return its queue.
+        Register a new subscriber (call from the event loop).
+
+        Returns (subscription, replay): replay holds the buffered events
+        with seq > since. If events after `since` are no longer buffered,
+        replay starts with a {"type": "reset"} event so the client
+        refetches its state.
         """
-        q: queue.Queue = queue.Queue()
+        sub = AlertSubscription(asyncio.get_running_loop(), self.queue_size)
+
         with self._lock:
-            self._subscribers.add(q)
-        return q
+            self._subscribers.add(sub)
+            sub.last_seq = self._seq if since is None else since
+
+            replay: List[Dict[str, Any]] = []
+            if since is not None:
+                oldest = self._buffer[0]["seq"] if self._buffer else self._seq + 1
+                if since < oldest - 1 or since > self._seq:
+                    replay.append({"seq": since, "type": "reset", "latest_seq": self._seq})
+                replay.extend(e for e in self._buffer if e["seq"] > since)
 
-    def unsubscribe(self, q: queue.Queue) -> None:
+        if replay:
+            sub.last_seq = max(sub.last_seq, replay[-1]["seq"])
+        return sub, replay
+
+    def unsubscribe(self, sub: AlertSubscription) -> None:
         """
-        Remove a subscriber queue.
+        Remove a subscriber.
         """
         with self._lock:
-            self._subscribers.discard(q)
+            self._subscribers.discard(sub)
+        sub.closed = True
 
     # ----------------------------
     # Publish
     # ----------------------------
-    def publish(self, event: Dict[str, Any]) -> None:
+    def publish(self, event: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Publish an event to all subscribers.
+        Publish an event to all subscribers (thread-safe, non-blocking).
+        Returns the event with its sequence number.
         """
         with self._lock:
+            self._seq += 1
+            event = {"seq": self._seq, **event}
+            self._buffer.append(event)
             subscribers = list(self._subscribers)
 
-        for q in subscribers:
+        for sub in subscribers:
             try:
-                q.put_nowait(event)
-            except Exception:
-                # If queue is full or broken, ignore
-                pass
+                sub.loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:
+                # Subscriber's loop is closed
+                self.unsubscribe(sub)
+
+        return event
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "latest_seq": self._seq,
+                "buffered": len(self._buffer),
+                "oldest_buffered_seq": self._buffer[0]["seq"] if self._buffer else None,
+            }
 
 
 # Singleton instance
@@ -59,20 +59,42 @@ def build_alert_item(alert: Dict) -> Dict:
         "generated_at": alert.get("generated_at"),
         "metric": metric,
         "value": value,
+        "occurrence_count": alert.get("occurrence_count") or 1,
+        "last_value": alert.get("last_value"),
+        "last_seen_at": alert.get("last_seen_at"),
     }
 
 
-def list_alerts_ui(storage: Storage) -> List[Dict]:
+def build_live_alert_item(alert: Dict) -> Dict:
     """
-    Return all alerts for the Alerts page (UI handles filtering/search).
+    UI-ready item for the live alert stream.
 
-    خروجی لیست هشدارها برای UI (فیلتر در UI انجام می‌شود).
+    `alert` is the row Data Storage saved (persisted_alerts topic), so the
+    item has the same shape as the /alerts rows (alert_id, patient_name,
+    occurrence_count) and the UI can patch or acknowledge it directly.
     """
-    rows = storage.list_alerts()
-    return [build_alert_item(r) for r in rows]
+    return {
+        **build_alert_item(alert),
+        "patient_id": alert.get("patient_id"),
+    }
+
+
+async def list_alerts_ui(storage: Storage, **filters) -> Dict:
+    """
+    Return UI-ready alerts for the Alerts page (all, or one page when
+    limit / cursor is given).
+
+    Filtering and keyset pagination are done by Data Storage.
+    Returns {"items": [...], "next_cursor": str | None}.
+    """
+    page = await storage.list_alerts(**filters)
+    return {
+        "items": [build_alert_item(r) for r in page["items"]],
+        "next_cursor": page.get("next_cursor"),
+    }
 
 
-def acknowledge_alert_ui(
+async def acknowledge_alert_ui(
     storage: Storage,
     alert_id: int,
     reviewed_by: str | None = None,
@@ -83,7 +105,7 @@ def acknowledge_alert_ui(
 
     این تابع lifecycle هشدار را به ACKNOWLEDGED تغییر می‌دهد.
     """
-    storage.acknowledge_alert(
+    await storage.acknowledge_alert(
         alert_id=alert_id,
         reviewed_by=reviewed_by,
         clinical_note=clinical_note,
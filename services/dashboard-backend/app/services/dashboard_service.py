@@ -2,7 +2,7 @@ from app.services.storage import Storage
 from app.models.schemas import DashboardOverviewResponse
 
 
-def get_dashboard_overview(storage: Storage) -> DashboardOverviewResponse:
+async def get_dashboard_overview(storage: Storage) -> DashboardOverviewResponse:
     """
     Return aggregated dashboard overview data.
 
@@ -11,5 +11,5 @@ def get_dashboard_overview(storage: Storage) -> DashboardOverviewResponse:
     - All aggregation is done in Data Storage Service
     - This function is just orchestration
     """
-    return storage.get_dashboard_overview()
+    return await storage.get_dashboard_overview()
 
@@ -1,38 +1,326 @@
 import asyncio
-from typing import Dict, List
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Set
+
+
+# Overflow policies for a subscriber whose queue is full
+DROP_OLDEST = "drop_oldest"   # discard the oldest pending event
+COALESCE = "coalesce"         # keep only the latest event per patient
+DISCONNECT = "disconnect"     # close the subscriber (client must reconnect)
+
+POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+VITAL_STREAM_QUEUE_SIZE = int(os.getenv("VITAL_STREAM_QUEUE_SIZE", "64"))
+VITAL_STREAM_POLICY = os.getenv("VITAL_STREAM_POLICY", DROP_OLDEST)
+
+# Recent payloads kept per patient for snapshot frames
+VITAL_STREAM_WINDOW = int(os.getenv("VITAL_STREAM_WINDOW", "120"))
+
+# Multiplexed (ward) subscribers watch many patients at once
+VITAL_STREAM_MUX_QUEUE_SIZE = int(os.getenv("VITAL_STREAM_MUX_QUEUE_SIZE", "1024"))
+
+
+class VitalSubscription:
+    """
+    One consumer (e.g. a WebSocket) of the vital stream.
+
+    - Bounded: at most `maxsize` pending events
+    - offer() never blocks; on overflow the policy decides what happens
+    - Lives on the event loop thread (no locking needed)
+    """
+
+    def __init__(self, policy: str = VITAL_STREAM_POLICY, maxsize: int = VITAL_STREAM_QUEUE_SIZE):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy!r}")
+
+        self.policy = policy
+        self.maxsize = max(1, maxsize)
+        self.patient_ids: Set[int] = set()
+        self.all_patients = False
+        self.closed = False
+        self.released = False  # counters folded into the stream totals
+
+        # (enqueued_at, event) in arrival order
+        self._pending: deque = deque()
+        # patient_id -> (enqueued_at, event), used by COALESCE
+        self._latest: "OrderedDict[int, tuple]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+
+        # Counters
+        self.delivered = 0
+        self.dropped = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    # ----------------------------
+    # Producer side (publish)
+    # ----------------------------
+    def offer(self, patient_id: int, event: dict) -> bool:
+        """
+        Enqueue without blocking.
+        Returns False if the subscriber was closed by the DISCONNECT policy.
+        """
+        if self.closed:
+            return False
+
+        item = (time.monotonic(), event)
+
+        if self.policy == COALESCE:
+            if patient_id in self._latest:
+                self.dropped += 1
+                # Keep the original enqueue time so lag stays honest
+                item = (self._latest[patient_id][0], event)
+            self._latest[patient_id] = item
+            while len(self._latest) > self.maxsize:
+                self._latest.popitem(last=False)
+                self.dropped += 1
+
+        elif len(self._pending) >= self.maxsize:
+            if self.policy == DISCONNECT:
+                self.dropped += len(self._pending)
+                self._pending.clear()
+                self.close()
+                return False
+            self._pending.popleft()
+            self.dropped += 1
+            self._pending.append(item)
+
+        else:
+            self._pending.append(item)
+
+        self._wakeup.set()
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+        self._wakeup.set()
+
+    # ----------------------------
+    # Consumer side
+    # ----------------------------
+    def depth(self) -> int:
+        return len(self._pending) + len(self._latest)
+
+    def lag_ms(self) -> float:
+        """
+        Age of the oldest pending event.
+        """
+        oldest = None
+        if self._pending:
+            oldest = self._pending[0][0]
+        if self._latest:
+            first = min(t for t, _ in self._latest.values())
+            oldest = first if oldest is None else min(oldest, first)
+        return 0.0 if oldest is None else (time.monotonic() - oldest) * 1000.0
+
+    async def wait(self) -> bool:
+        """
+        Wait until something is pending. Returns False once closed.
+        """
+        while not self.depth():
+            if self.closed:
+                return False
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        return True
+
+    def drain(self, max_items: Optional[int] = None) -> List[dict]:
+        """
+        Take up to max_items pending events (all if None), oldest first.
+        """
+        items = list(self._pending)
+        self._pending.clear()
+        items.extend(self._latest.values())
+        self._latest.clear()
+        items.sort(key=lambda i: i[0])
+
+        if max_items is not None and len(items) > max_items:
+            # Put the rest back (they are newer)
+            self._pending.extend(items[max_items:])
+            items = items[:max_items]
+
+        now = time.monotonic()
+        for enqueued_at, _ in items:
+            lag = (now - enqueued_at) * 1000.0
+            self.last_lag_ms = lag
+            self.max_lag_ms = max(self.max_lag_ms, lag)
+        self.delivered += len(items)
+
+        return [event for _, event in items]
+
+    def stats(self) -> dict:
+        return {
+            "patient_ids": sorted(self.patient_ids)[:50],
+            "all_patients": self.all_patients,
+            "policy": self.policy,
+            "queue_depth": self.depth(),
+            "maxsize": self.maxsize,
+            "lag_ms": round(self.lag_ms(), 1),
+            "last_lag_ms": round(self.last_lag_ms, 1),
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "closed": self.closed,
+        }
 
 
 class PatientVitalStream:
+    """
+    In-memory fan-out of live vitals per patient.
+
+    - publish() is synchronous and never blocks: each subscriber has its
+      own bounded queue, so a slow client only affects itself
+    - Must be called on the event loop thread (MQTT thread uses
+      loop.call_soon_threadsafe)
+    """
+
     def __init__(self):
-        self._subscribers: Dict[int, List[asyncio.Queue]] = {}
+        self._subscribers: Dict[int, Set[VitalSubscription]] = {}
+        # Subscribers of every patient ("all active"), incl. future ones
+        self._all_subscribers: Set[VitalSubscription] = set()
         self._last_event: Dict[int, dict] = {}  # 🔑 cache آخرین دیتا
+        # patient_id -> monotonic version / recent payloads
+        self._version: Dict[int, int] = {}
+        self._recent: Dict[int, deque] = {}
+
+        self._published = 0
+        self._disconnected = 0
+        self._dropped_closed = 0  # drops of subscribers that are gone
 
     # -------------------------------
-    async def subscribe(self, patient_id: int):
-        queue: asyncio.Queue = asyncio.Queue()
-        self._subscribers.setdefault(patient_id, []).append(queue)
+    # Subscription management
+    # -------------------------------
+    def open(
+        self,
+        policy: Optional[str] = None,
+        maxsize: Optional[int] = None,
+    ) -> VitalSubscription:
+        return VitalSubscription(
+            policy=policy or VITAL_STREAM_POLICY,
+            maxsize=maxsize or VITAL_STREAM_QUEUE_SIZE,
+        )
+
+    def add(self, sub: VitalSubscription, patient_id: int, send_last: bool = True) -> None:
+        if patient_id in sub.patient_ids:
+            return
+        sub.patient_ids.add(patient_id)
+        self._subscribers.setdefault(patient_id, set()).add(sub)
+
+        # New subscribers immediately get the latest known value
+        if send_last and patient_id in self._last_event:
+            sub.offer(patient_id, self._last_event[patient_id])
 
-        
-        if patient_id in self._last_event:
-            await queue.put(self._last_event[patient_id])
+    def remove(self, sub: VitalSubscription, patient_id: int) -> None:
+        sub.patient_ids.discard(patient_id)
+        subs = self._subscribers.get(patient_id)
+        if subs is None:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self._subscribers[patient_id]
 
+    def add_all(self, sub: VitalSubscription) -> None:
+        if sub.all_patients:
+            return
+        sub.all_patients = True
+        self._all_subscribers.add(sub)
+
+        for patient_id, event in list(self._last_event.items()):
+            if patient_id not in sub.patient_ids:
+                sub.offer(patient_id, event)
+
+    def remove_all(self, sub: VitalSubscription) -> None:
+        sub.all_patients = False
+        self._all_subscribers.discard(sub)
+
+    def close(self, sub: VitalSubscription) -> None:
+        """
+        Unsubscribe everything and fold the drop count into the totals.
+        Idempotent: publish() and the subscriber's own cleanup both call it.
+        """
+        for patient_id in list(sub.patient_ids):
+            self.remove(sub, patient_id)
+        self.remove_all(sub)
+        if sub.released:
+            return
+        sub.released = True
+        self._dropped_closed += sub.dropped
+        sub.close()
+
+    async def subscribe(
+        self,
+        patient_id: int,
+        policy: Optional[str] = None,
+        maxsize: Optional[int] = None,
+    ):
+        """
+        Single-patient event iterator. Ends when the subscriber is
+        disconnected by the DISCONNECT policy.
+        """
+        sub = self.open(policy, maxsize)
+        self.add(sub, patient_id)
         try:
-            while True:
-                event = await queue.get()
-                yield event
+            while await sub.wait():
+                for event in sub.drain():
+                    yield event
         finally:
-            self._subscribers[patient_id].remove(queue)
-            if not self._subscribers[patient_id]:
-                del self._subscribers[patient_id]
+            self.close(sub)
 
     # -------------------------------
-    async def publish(self, patient_id: int, event: dict):
-       
+    # Publish
+    # -------------------------------
+    def publish(self, patient_id: int, event: dict) -> None:
+        version = self._version.get(patient_id, 0) + 1
+        self._version[patient_id] = version
+        event = {**event, "version": version}
+
         self._last_event[patient_id] = event
+        self._recent.setdefault(
+            patient_id, deque(maxlen=VITAL_STREAM_WINDOW)
+        ).append(event.get("data") or {})
+        self._published += 1
 
-        queues = self._subscribers.get(patient_id, [])
-        for q in queues:
-            await q.put(event)
+        targets = self._subscribers.get(patient_id, set())
+        if self._all_subscribers:
+            targets = targets | self._all_subscribers
+
+        for sub in list(targets):
+            if not sub.offer(patient_id, event):
+                self._disconnected += 1
+                print(f"[WS] slow subscriber disconnected (patient {patient_id})")
+                self.close(sub)
+
+    def snapshot(self, patient_id: int) -> dict:
+        """
+        Current state of a patient: latest payload, its version and the
+        recent window (oldest first).
+        """
+        last = self._last_event.get(patient_id) or {}
+        return {
+            "version": self._version.get(patient_id, 0),
+            "data": last.get("data"),
+            "window": list(self._recent.get(patient_id, ())),
+        }
+
+    # -------------------------------
+    # Metrics
+    # -------------------------------
+    def stats(self, top: int = 20) -> dict:
+        subs = {s for group in self._subscribers.values() for s in group}
+        subs |= self._all_subscribers
+        ordered = sorted(subs, key=lambda s: s.lag_ms(), reverse=True)
+        return {
+            "subscribers": len(subs),
+            "patients_watched": len(self._subscribers),
+            "published": self._published,
+            "delivered": sum(s.delivered for s in subs),
+            "dropped": self._dropped_closed + sum(s.dropped for s in subs),
+            "disconnected": self._disconnected,
+            "max_lag_ms": round(max((s.lag_ms() for s in subs), default=0.0), 1),
+            "slowest": [s.stats() for s in ordered[:top]],
+        }
 
 
 patient_vital_stream = PatientVitalStream()
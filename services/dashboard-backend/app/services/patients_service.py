@@ -16,12 +16,12 @@ RISK_CRITICAL = "CRITICAL"
 # Patients overview
 # --------------------------------------------------
 
-def get_patients_overview(storage: Storage) -> Dict:
+async def get_patients_overview(storage: Storage) -> Dict:
     """
     Build UI-ready patients list for Patients page.
     """
 
-    rows = storage.get_patients()
+    rows = await storage.get_patients()
 
     items: List[Dict] = []
 
@@ -73,11 +73,11 @@ def get_patients_overview(storage: Storage) -> Dict:
 # Patient alerts
 # --------------------------------------------------
 
-def get_patient_alerts(storage: Storage, patient_id: int) -> Dict:
+async def get_patient_alerts(storage: Storage, patient_id: int) -> Dict:
     """
     Build UI-ready alerts list for a single patient.
     """
-    rows = storage.get_patient_alerts(patient_id)
+    rows = await storage.get_patient_alerts(patient_id)
     items: List[Dict] = []
 
     for row in rows:
@@ -111,21 +111,21 @@ def get_patient_alerts(storage: Storage, patient_id: int) -> Dict:
 # Create / Update
 # --------------------------------------------------
 
-def create_patient(storage: Storage, payload: dict) -> dict:
+async def create_patient(storage: Storage, payload: dict) -> dict:
     """
     Create patient (and optional wristband assignment).
 
     Assignment is handled inside Data Storage Service.
     """
-    return storage.create_patient(payload)
+    return await storage.create_patient(payload)
 
 
 
-def get_patient_detail(storage: Storage, patient_id: int) -> dict:
+async def get_patient_detail(storage: Storage, patient_id: int) -> dict:
     """
     Build UI-ready patient detail response.
     """
-    row = storage.get_patient_overview(patient_id)
+    row = await storage.get_patient_overview(patient_id)
 
     if row is None:
         raise ValueError("Patient not found")
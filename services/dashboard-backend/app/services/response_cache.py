@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+
+# Safety net: entries expire even if no MQTT event invalidates them
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+
+# MQTT events reach us before Data Storage has committed them (it writes in
+# batches). Entries loaded within this window after an invalidation expire
+# at the end of the window instead of living for the full TTL.
+RESPONSE_CACHE_WRITE_LAG_SECONDS = float(
+    os.getenv("RESPONSE_CACHE_WRITE_LAG_SECONDS", "1.0")
+)
+
+# Namespaces (first element of every cache key)
+PATIENTS = "patients"
+PATIENT_OVERVIEW = "patient_overview"
+PATIENT_ALERTS = "patient_alerts"
+DASHBOARD_OVERVIEW = "dashboard_overview"
+WRISTBANDS = "wristbands"
+
+
+class ResponseCache:
+    """
+    In-memory TTL + LRU cache for Data Storage responses.
+
+    Keys are tuples whose first element is a namespace, e.g.
+        (PATIENTS,)  (PATIENT_OVERVIEW, 3)  (PATIENT_ALERTS, 3)
+
+    - Read by the async request handlers
+    - Invalidated by the MQTT subscriber threads (hence the lock)
+    - Values are returned as stored; callers must not mutate them
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        write_lag_seconds: float = RESPONSE_CACHE_WRITE_LAG_SECONDS,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.write_lag_seconds = write_lag_seconds
+
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        # key or namespace -> monotonic time until which new entries are short-lived
+        self._dirty_until: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    # ----------------------------
+    # Read / write
+    # ----------------------------
+    def get(self, key: Tuple) -> Optional[Any]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def set(self, key: Tuple, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        now = time.monotonic()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+
+        with self._lock:
+            dirty_until = max(
+                self._dirty_until.get(key, 0.0),
+                self._dirty_until.get(key[0], 0.0),
+            )
+            if dirty_until > now:
+                expires_at = min(expires_at, dirty_until)
+
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    # ----------------------------
+    # Invalidation
+    # ----------------------------
+    def invalidate(self, key: Tuple) -> None:
+        with self._lock:
+            self._mark_dirty(key)
+            if self._entries.pop(key, None) is not None:
+                self._invalidations += 1
+
+    def invalidate_namespace(self, namespace: str) -> None:
+        with self._lock:
+            self._mark_dirty(namespace)
+            for key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[key]
+                self._invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def _mark_dirty(self, key: Hashable) -> None:
+        now = time.monotonic()
+        self._dirty_until[key] = now + self.write_lag_seconds
+
+        # Keep the dirty map from growing without bound
+        if len(self._dirty_until) > self.max_entries:
+            self._dirty_until = {
+                k: t for k, t in self._dirty_until.items() if t > now
+            }
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
+
+
+# ----------------------------
+# Event-driven invalidation
+# ----------------------------
+def invalidate_for_alert(patient_id: Optional[int]) -> None:
+    """
+    A new alert changes the dashboard counters, the patients list
+    (risk status) and the patient's overview / alerts.
+    """
+    response_cache.invalidate((DASHBOARD_OVERVIEW,))
+    response_cache.invalidate((PATIENTS,))
+    if patient_id is None:
+        response_cache.invalidate_namespace(PATIENT_OVERVIEW)
+        response_cache.invalidate_namespace(PATIENT_ALERTS)
+    else:
+        response_cache.invalidate((PATIENT_OVERVIEW, patient_id))
+        response_cache.invalidate((PATIENT_ALERTS, patient_id))
+
+
+def invalidate_for_vital(patient_id: Optional[int], low_battery_changed: bool) -> None:
+    """
+    A new vital changes the patients list (latest vitals) and the
+    patient's overview; the dashboard only when the low-battery state
+    of the device changed.
+    """
+    response_cache.invalidate((PATIENTS,))
+    if patient_id is None:
+        response_cache.invalidate_namespace(PATIENT_OVERVIEW)
+    else:
+        response_cache.invalidate((PATIENT_OVERVIEW, patient_id))
+    if low_battery_changed:
+        response_cache.invalidate((DASHBOARD_OVERVIEW,))
+
+
+# Singleton instance
+response_cache = ResponseCache()
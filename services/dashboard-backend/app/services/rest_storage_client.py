@@ -1,8 +1,18 @@
+import asyncio
 import os
-import requests
 from typing import List, Dict, Optional
 
+import httpx
+
 from app.services.storage import Storage
+from app.services.response_cache import (
+    DASHBOARD_OVERVIEW,
+    PATIENT_ALERTS,
+    PATIENT_OVERVIEW,
+    PATIENTS,
+    WRISTBANDS,
+    response_cache,
+)
 
 
 DATA_STORAGE_BASE_URL = os.getenv(
@@ -10,80 +20,185 @@ DATA_STORAGE_BASE_URL = os.getenv(
     "http://data-storage:8003/api/v1"
 )
 
+# Connection pool (keep-alive connections are reused across requests)
+STORAGE_MAX_CONNECTIONS = int(os.getenv("STORAGE_MAX_CONNECTIONS", "50"))
+STORAGE_MAX_KEEPALIVE = int(os.getenv("STORAGE_MAX_KEEPALIVE", "20"))
+STORAGE_KEEPALIVE_EXPIRY = float(os.getenv("STORAGE_KEEPALIVE_EXPIRY", "30"))
+
+# Upper bound on in-flight requests to Data Storage
+STORAGE_MAX_CONCURRENCY = int(os.getenv("STORAGE_MAX_CONCURRENCY", "32"))
+
+# Per-endpoint timeouts (seconds)
+CONNECT_TIMEOUT = 2.0
+DEFAULT_TIMEOUT = 5.0
+SLOW_TIMEOUT = 10.0  # latest vitals / range queries
+
 
 class RESTStorageClient(Storage):
     """
     Storage implementation backed by Data Storage Service (REST).
+
+    - One shared httpx.AsyncClient (keep-alive connection pool)
+    - Bounded concurrency (semaphore) so a burst of dashboard requests
+      queues here instead of flooding Data Storage
+    - Created lazily on first use (needs a running event loop);
+      aclose() on application shutdown
+    - Read-mostly endpoints go through response_cache (invalidated by
+      MQTT events and by the mutations below)
     """
 
+    def __init__(self, base_url: str = DATA_STORAGE_BASE_URL) -> None:
+        self.base_url = base_url
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    # ----------------------------
+    # Connection management
+    # ----------------------------
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=STORAGE_MAX_CONNECTIONS,
+                    max_keepalive_connections=STORAGE_MAX_KEEPALIVE,
+                    keepalive_expiry=STORAGE_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT),
+            )
+            self._semaphore = asyncio.Semaphore(STORAGE_MAX_CONCURRENCY)
+        return self._client
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        timeout: float = DEFAULT_TIMEOUT,
+        **kwargs,
+    ) -> httpx.Response:
+        client = self._get_client()
+        async with self._semaphore:
+            return await client.request(
+                method,
+                path,
+                timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+                **kwargs,
+            )
+
+    async def _cached(self, key, load):
+        value = response_cache.get(key)
+        if value is None:
+            value = await load()
+            if value is not None:
+                response_cache.set(key, value)
+        return value
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     # ----------------------------
     # Patients
     # ----------------------------
-    def get_patients(self) -> List[Dict]:
-        resp = requests.get(f"{DATA_STORAGE_BASE_URL}/patients/overview", timeout=5)
-        resp.raise_for_status()
-        return resp.json()["items"]
+    async def get_patients(self) -> List[Dict]:
+        async def load():
+            resp = await self._request("GET", "/patients/overview")
+            resp.raise_for_status()
+            return resp.json()["items"]
 
-    def get_patient_overview(self, patient_id: int) -> Optional[Dict]:
-        resp = requests.get(
-            f"{DATA_STORAGE_BASE_URL}/patients/{patient_id}/overview",
-            timeout=5,
-        )
-        if resp.status_code == 404:
-            return None
-        resp.raise_for_status()
-        return resp.json()
+        return await self._cached((PATIENTS,), load)
 
-    def get_patient_alerts(self, patient_id: int) -> List[Dict]:
-        resp = requests.get(
-            f"{DATA_STORAGE_BASE_URL}/patients/{patient_id}/alerts",
-            timeout=5,
-        )
-        resp.raise_for_status()
-        return resp.json()["items"]
+    async def get_patient_overview(self, patient_id: int) -> Optional[Dict]:
+        async def load():
+            resp = await self._request("GET", f"/patients/{patient_id}/overview")
+            if resp.status_code == 404:
+                return None
+            resp.raise_for_status()
+            return resp.json()
 
-    def create_patient(self, data: dict) -> Dict:
-        resp = requests.post(
-            f"{DATA_STORAGE_BASE_URL}/patients",
-            json=data,
-            timeout=5,
-        )
+        return await self._cached((PATIENT_OVERVIEW, patient_id), load)
+
+    async def get_patient_alerts(self, patient_id: int) -> List[Dict]:
+        async def load():
+            resp = await self._request("GET", f"/patients/{patient_id}/alerts")
+            resp.raise_for_status()
+            return resp.json()["items"]
+
+        return await self._cached((PATIENT_ALERTS, patient_id), load)
+
+    async def create_patient(self, data: dict) -> Dict:
+        resp = await self._request("POST", "/patients", json=data)
         resp.raise_for_status()
+
+        response_cache.invalidate((PATIENTS,))
+        response_cache.invalidate((DASHBOARD_OVERVIEW,))
+        response_cache.invalidate((WRISTBANDS,))
         return resp.json()
 
     # ----------------------------
     # Vitals
     # ----------------------------
-    def get_latest_vitals(self) -> list[dict]:
-        resp = requests.get(
-            f"{DATA_STORAGE_BASE_URL}/vitals/latest",
-            timeout=10
-        )
+    async def get_latest_vitals(self) -> list[dict]:
+        resp = await self._request("GET", "/vitals/latest", timeout=SLOW_TIMEOUT)
         resp.raise_for_status()
         return resp.json()["items"]
 
-    def get_vitals_history(
+    async def get_vitals_history(
         self,
         patient_id: int,
         limit: int = 50,
     ) -> list[dict]:
-        resp = requests.get(
-            f"{DATA_STORAGE_BASE_URL}/vitals/history/{patient_id}",
+        resp = await self._request(
+            "GET",
+            f"/vitals/history/{patient_id}",
             params={"limit": limit},
-            timeout=5
         )
         resp.raise_for_status()
         return resp.json()["items"]
 
+    async def get_vitals_range(self, patient_id: int, **params) -> dict:
+        """
+        params: start, end, resolution, method, points (None values are not sent).
+        """
+        resp = await self._request(
+            "GET",
+            f"/vitals/range/{patient_id}",
+            params={k: v for k, v in params.items() if v is not None},
+            timeout=SLOW_TIMEOUT,
+        )
+        if resp.status_code == 400:
+            raise ValueError(resp.json().get("detail", "Invalid range query"))
+        resp.raise_for_status()
+        return resp.json()
+
     # ----------------------------
     # Alerts
-    # ----------------------------   
-    def list_alerts(self) -> list[dict]:
-        resp = requests.get(f"{DATA_STORAGE_BASE_URL}/alerts", timeout=5)
+    # ----------------------------
+    async def list_alerts(self, **filters) -> dict:
+        """
+        filters: status, severity, patient_id, metric, since, until,
+        cursor, limit (None values are not sent; no limit and no cursor
+        returns every matching alert).
+        Returns {"items": [...], "next_cursor": str | None}.
+        """
+        params = {k: v for k, v in filters.items() if v is not None}
+        resp = await self._request(
+            "GET",
+            "/alerts/",
+            params=params,
+            timeout=DEFAULT_TIMEOUT if "limit" in params else SLOW_TIMEOUT,
+        )
+        if resp.status_code == 400:
+            raise ValueError(resp.json().get("detail", "Invalid alert filter"))
         resp.raise_for_status()
-        return resp.json()["items"]
+        body = resp.json()
+        return {
+            "items": body["items"],
+            "next_cursor": body.get("next_cursor"),
+        }
 
-    def acknowledge_alert(
+    async def acknowledge_alert(
         self,
         alert_id: int,
         reviewed_by: Optional[str] = None,
@@ -95,69 +210,79 @@ class RESTStorageClient(Storage):
             reviewed_by = Dr
         if clinical_note is None:
             clinical_note = note
-        resp = requests.post(
-            f"{DATA_STORAGE_BASE_URL}/alerts/{alert_id}/acknowledge",
+        resp = await self._request(
+            "POST",
+            f"/alerts/{alert_id}/acknowledge",
             json={
                 "reviewed_by": reviewed_by,
                 "clinical_note": clinical_note,
             },
-            timeout=5,
         )
-        resp.raise_for_status()   
-    
+        resp.raise_for_status()
+
+        # Patient of the alert is unknown here
+        response_cache.invalidate((DASHBOARD_OVERVIEW,))
+        response_cache.invalidate((PATIENTS,))
+        response_cache.invalidate_namespace(PATIENT_OVERVIEW)
+        response_cache.invalidate_namespace(PATIENT_ALERTS)
+
     # ----------------------------
     # Dashboard overview
-    # ----------------------------     
-    def get_dashboard_overview(self) -> dict:
-        resp = requests.get(
-            f"{DATA_STORAGE_BASE_URL}/dashboard/overview",
-            timeout=5
-        )
-        resp.raise_for_status()
-        return resp.json()
-    
+    # ----------------------------
+    async def get_dashboard_overview(self) -> dict:
+        async def load():
+            resp = await self._request("GET", "/dashboard/overview")
+            resp.raise_for_status()
+            return resp.json()
+
+        return await self._cached((DASHBOARD_OVERVIEW,), load)
+
     # ----------------------------
     # wristbands
-    # ----------------------------     
-    def list_wristbands(self):
-        resp = requests.get(f"{DATA_STORAGE_BASE_URL}/wristbands", timeout=5)
-        resp.raise_for_status()
-        return resp.json()["items"]
+    # ----------------------------
+    async def list_wristbands(self):
+        async def load():
+            resp = await self._request("GET", "/wristbands")
+            resp.raise_for_status()
+            return resp.json()["items"]
+
+        return await self._cached((WRISTBANDS,), load)
 
-    # def get_available_wristbands(self):
-    #     resp = requests.get(
-    #         f"{DATA_STORAGE_BASE_URL}/wristbands/available",
-    #         timeout=5
-    #     )
+    # async def get_available_wristbands(self):
+    #     resp = await self._request("GET", "/wristbands/available")
     #     resp.raise_for_status()
     #     return resp.json()["items"]
 
-    def create_wristband(self, wristband_id: int):
-        resp = requests.post(
-            f"{DATA_STORAGE_BASE_URL}/wristbands",
+    async def create_wristband(self, wristband_id: int):
+        resp = await self._request(
+            "POST",
+            "/wristbands",
             json={"wristband_id": wristband_id},
-            timeout=5
         )
         resp.raise_for_status()
+
+        response_cache.invalidate((WRISTBANDS,))
         return resp.json()
 
-    def unassign_wristband(self, wristband_id: int) -> None:
-        resp = requests.post(
-            f"{DATA_STORAGE_BASE_URL}/{wristband_id}/unassign",
-            timeout=5,
-        )
+    async def unassign_wristband(self, wristband_id: int) -> None:
+        resp = await self._request("POST", f"/{wristband_id}/unassign")
 
         if resp.status_code == 404:
             raise ValueError("Wristband not assigned")
 
         resp.raise_for_status()
 
+        response_cache.invalidate((WRISTBANDS,))
+        response_cache.invalidate((PATIENTS,))
+        response_cache.invalidate((DASHBOARD_OVERVIEW,))
+        response_cache.invalidate_namespace(PATIENT_OVERVIEW)
+
     # ----------------------------
     # Unused (for now)
     # ----------------------------
-    def count_low_battery_devices(self, threshold: int) -> int:
+    async def count_low_battery_devices(self, threshold: int) -> int:
         raise NotImplementedError
 
 
-    def assign_wristband(self, patient_id: int, wristband_id: int) -> None:
+    async def assign_wristband(self, patient_id: int, wristband_id: int) -> None:
         raise NotImplementedError
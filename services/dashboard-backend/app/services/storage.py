@@ -8,7 +8,8 @@ class Storage(ABC):
     """
     Abstract storage interface.
 
-    All methods return raw dictionaries coming from the database layer.
+    All methods are coroutines and return raw dictionaries coming from
+    the database layer.
     Joins required to ensure medical correctness (assignment context)
     MUST be handled here or in the concrete storage implementation.
 
@@ -19,18 +20,22 @@ class Storage(ABC):
     # ==================================================
 
     
-    def list_alerts(self) -> List[Dict]:
+    async def list_alerts(self, **filters) -> Dict:
         """
-        Return all alerts enriched with:
+        Return alerts (newest first; one page when limit / cursor is
+        given) enriched with:
         - patient name
         - wristband id (device)
         - assignment context
 
+        filters: status, severity, patient_id, metric, since, until,
+        cursor, limit.
+        Returns {"items": [...], "next_cursor": str | None}.
         """
         pass
 
     
-    def acknowledge_alert(
+    async def acknowledge_alert(
         self,
         alert_id: int,
         reviewed_by: Optional[str] = None,
@@ -47,7 +52,7 @@ class Storage(ABC):
     # ==================================================
 
     
-    def get_patients(self) -> List[Dict]:
+    async def get_patients(self) -> List[Dict]:
         """
         Return all patients with their active device assignment (if any).
 
@@ -59,7 +64,7 @@ class Storage(ABC):
     # ==================================================
 
     @abstractmethod
-    def get_latest_vitals(self) -> List[Dict]:
+    async def get_latest_vitals(self) -> List[Dict]:
         """
         Return the latest vital measurement for each ACTIVE assignment.
 
@@ -71,7 +76,7 @@ class Storage(ABC):
         pass
 
     @abstractmethod
-    def get_vitals_history(
+    async def get_vitals_history(
         self,
         patient_id: int,
         limit: int = 50
@@ -84,8 +89,17 @@ class Storage(ABC):
         """
         pass
 
+    async def get_vitals_range(self, patient_id: int, **params) -> Dict:
+        """
+        Return downsampled vitals for a patient in a time range.
+
+        params: start, end, resolution (e.g. "5m"), method ("bucket" | "lttb"),
+        points (max buckets / points per metric).
+        """
+        raise NotImplementedError
+
     @abstractmethod
-    def count_low_battery_devices(self, threshold: int) -> int:
+    async def count_low_battery_devices(self, threshold: int) -> int:
         """
         Count active assignments whose latest battery level
         is below the given threshold.
@@ -93,21 +107,21 @@ class Storage(ABC):
         """
         pass
 
-    def get_patient_alerts(self, patient_id: int) -> list[dict]:
+    async def get_patient_alerts(self, patient_id: int) -> list[dict]:
         """
         Return all alerts for a given patient.
         """
         raise NotImplementedError
     
     
-    def create_patient(self, data: dict) -> dict:
+    async def create_patient(self, data: dict) -> dict:
         """
         Create a new patient and return the created record.
         """
         raise NotImplementedError
     
     
-    def assign_wristband(
+    async def assign_wristband(
         self,
         patient_id: int,
         wristband_id: int,
@@ -118,21 +132,21 @@ class Storage(ABC):
         raise NotImplementedError
 
     
-    def create_wristband(self, wristband_id: int) -> Dict:
+    async def create_wristband(self, wristband_id: int) -> Dict:
         """
         Create a new wristband in DB.
         """
         raise NotImplementedError
 
     
-    def get_patient_overview(self, patient_id: int) -> dict | None:
+    async def get_patient_overview(self, patient_id: int) -> dict | None:
         """
         Return overview data for a single patient.
         """
         raise NotImplementedError
 
     
-    def list_wristbands(self) -> list[dict]:
+    async def list_wristbands(self) -> list[dict]:
         """
         Return all wristbands.
         """
@@ -0,0 +1,102 @@
+import json
+from typing import Dict, List, Optional, Tuple, Union
+
+try:  # optional compact binary encoding
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the image
+    msgpack = None
+
+
+# Stream modes (negotiated per WebSocket connection)
+MODE_RAW = "raw"       # full event on every update (original behaviour)
+MODE_DELTA = "delta"   # snapshot first, then changed fields only
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+
+PROTOCOL_VERSION = 1
+
+# Fields that identify the device, not the measurement (sent in the snapshot only)
+_STATIC_FIELDS = ("wristband_id",)
+
+_MISSING = object()
+
+
+def negotiate_encoding(requested: Optional[str]) -> str:
+    """
+    msgpack only if asked for and installed; JSON otherwise.
+    """
+    if requested == ENCODING_MSGPACK and msgpack is not None:
+        return ENCODING_MSGPACK
+    return ENCODING_JSON
+
+
+def encode(frame: Dict, encoding: str) -> Union[str, bytes]:
+    """
+    JSON -> text frame, msgpack -> binary frame.
+    """
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb(frame, use_bin_type=True, default=str)
+    return json.dumps(frame, separators=(",", ":"), default=str)
+
+
+def snapshot_frame(patient_id: int, snapshot: Dict) -> Dict:
+    """
+    {"type": "snapshot", "patient_id", "version", "data",
+     "window": {"fields": [...], "rows": [[...], ...]}}
+
+    The window is sent as rows of values under one field list instead of
+    repeating every key per sample.
+    """
+    window = snapshot["window"]
+    fields: List[str] = []
+    for row in window:
+        for key in row:
+            if key not in fields and key not in _STATIC_FIELDS:
+                fields.append(key)
+
+    return {
+        "type": "snapshot",
+        "protocol": PROTOCOL_VERSION,
+        "patient_id": patient_id,
+        "version": snapshot["version"],
+        "data": snapshot["data"],
+        "window": {
+            "fields": fields,
+            "rows": [[row.get(f) for f in fields] for row in window],
+        },
+    }
+
+
+def delta_frame(
+    previous: Optional[Dict],
+    current: Dict,
+    base_version: int,
+    version: int,
+) -> Tuple[Optional[Dict], Dict]:
+    """
+    Changed fields of `current` compared to what the client already has.
+
+    Returns (frame or None if nothing changed, new client state).
+    {"type": "delta", "base": <client version>, "version": <new>,
+     "changed": {...}, "removed": [...]}
+    """
+    previous = previous or {}
+    changed = {
+        k: v for k, v in current.items()
+        if k not in _STATIC_FIELDS and previous.get(k, _MISSING) != v
+    }
+    removed = [k for k in previous if k not in current]
+
+    if not changed and not removed:
+        return None, current
+
+    frame = {
+        "type": "delta",
+        "base": base_version,
+        "version": version,
+        "changed": changed,
+    }
+    if removed:
+        frame["removed"] = removed
+    return frame, current
@@ -2,12 +2,12 @@ from typing import List, Dict
 from app.services.storage import Storage
 
 
-def get_latest_vitals_ui(storage: Storage) -> List[Dict]:
+async def get_latest_vitals_ui(storage: Storage) -> List[Dict]:
     """
     Return latest vitals for all active patients (UI contract).
     """
 
-    rows = storage.get_latest_vitals()   # ← این الان لیسته
+    rows = await storage.get_latest_vitals()   # ← این الان لیسته
 
     items: List[Dict] = []
 
@@ -27,7 +27,7 @@ def get_latest_vitals_ui(storage: Storage) -> List[Dict]:
     return items
 
 
-def get_vitals_history_ui(
+async def get_vitals_history_ui(
     storage: Storage,
     patient_id: int,
     limit: int = 50,
@@ -36,7 +36,7 @@ def get_vitals_history_ui(
     Return vitals history for a patient (UI-ready).
     """
 
-    rows = storage.get_vitals_history(patient_id, limit)
+    rows = await storage.get_vitals_history(patient_id, limit)
 
     items: List[Dict] = []
 
@@ -51,3 +51,15 @@ def get_vitals_history_ui(
         })
 
     return items
+
+
+async def get_vitals_range_ui(
+    storage: Storage,
+    patient_id: int,
+    **params,
+) -> Dict:
+    """
+    Return downsampled vitals for charts (bucket min/max/avg or LTTB).
+    Downsampling is done by Data Storage; this is pass-through.
+    """
+    return await storage.get_vitals_range(patient_id, **params)
@@ -1,18 +1,18 @@
 from app.services.storage import Storage
 
 
-def create_wristband(storage: Storage, wristband_id: int) -> dict:
+async def create_wristband(storage: Storage, wristband_id: int) -> dict:
     """
     Create wristband (business layer).
     """
-    return storage.create_wristband(wristband_id)
+    return await storage.create_wristband(wristband_id)
 
 
-def list_wristbands(storage: Storage) -> dict:
+async def list_wristbands(storage: Storage) -> dict:
     """
     Return all wristbands (UI-ready).
     """
-    return {"items": storage.list_wristbands()}
+    return {"items": await storage.list_wristbands()}
 
 
 # def list_available_wristbands(storage: Storage) -> dict:
@@ -22,5 +22,5 @@ def list_wristbands(storage: Storage) -> dict:
 #     return {"items": storage.list_available_wristbands()}
 
 
-def unassign_wristband(storage: Storage, wristband_id: int) -> None:
-    storage.unassign_wristband(wristband_id)
+async def unassign_wristband(storage: Storage, wristband_id: int) -> None:
+    await storage.unassign_wristband(wristband_id)
@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
@@ -8,6 +9,9 @@ from api.schemas import AlertAckRequest
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 storage = LocalStorage()
 
+# Page size when a cursor is given without a limit
+ALERTS_PAGE_SIZE = 100
+
 @router.get("/history")
 def get_alerts_history(
     assignment_id: int = Query(...),
@@ -37,6 +41,9 @@ def get_alerts_history(
                 "description": a.description,
                 "full_description": a.full_description,
                 "threshold_profile": a.threshold_profile,
+                "occurrence_count": a.occurrence_count,
+                "last_value": a.last_value,
+                "last_seen_at": a.last_seen_at.isoformat() if a.last_seen_at else None,
             }
             for a in rows
         ]
@@ -44,9 +51,38 @@ def get_alerts_history(
         session.close()
 
 @router.get("/")
-def list_alerts():
-    items = storage.list_alerts()
-    return {"items": items}
+def list_alerts(
+    status_: Optional[List[str]] = Query(None, alias="status"),
+    severity: Optional[List[str]] = Query(None),
+    patient_id: Optional[int] = Query(None),
+    metric: Optional[str] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+):
+    """
+    Filtered alert listing, newest first: {"items", "next_cursor"}.
+
+    - Without limit and cursor every matching alert is returned
+    - With limit, keyset-paginated on (generated_at, alert_id); pass
+      next_cursor back as ?cursor=
+    """
+    if limit is None and cursor:
+        limit = ALERTS_PAGE_SIZE
+    try:
+        return storage.list_alerts(
+            status=status_,
+            severity=severity,
+            patient_id=patient_id,
+            metric=metric,
+            since=since,
+            until=until,
+            cursor=cursor,
+            limit=limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post(
     "/{alert_id}/acknowledge",
@@ -6,6 +6,7 @@ from api.alerts import router as alerts_router
 from api.patients import router as patients_router
 from api.dashboard import router as dashboard_router
 from api.wrsitbands import router as wristbands_router
+from api.metrics import router as metrics_router
 
 
 app = FastAPI(
@@ -20,4 +21,5 @@ app.include_router(alerts_router, prefix="/api/v1")
 app.include_router(patients_router, prefix="/api/v1")
 app.include_router(dashboard_router, prefix="/api/v1")
 app.include_router(wristbands_router, prefix="/api/v1")
+app.include_router(metrics_router, prefix="/api/v1")
 
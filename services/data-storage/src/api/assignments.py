@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException
 from sqlalchemy import text
 
 from storage.local import engine
+from storage.assignment_index import assignment_index
 
 router = APIRouter(prefix="/assignments", tags=["assignments"])
 
@@ -41,6 +42,26 @@ def get_assignment_by_wristband(wristband_id: int):
         "threshold_profile": row.threshold_profile,
     }
 
+@router.get("/profiles")
+def get_assignment_profiles():
+    """
+    Threshold profile of every active assignment, in one response.
+    Used by Risk Analysis Service to preload its profile cache.
+
+    `version` increases with every assignment change; change events on
+    the assignment_changes MQTT topic carry the same counter.
+    """
+    version, entries = assignment_index.versioned_snapshot()
+    return {
+        "version": version,
+        "count": len(entries),
+        "items": [
+            {"wristband_id": wristband_id, **entry}
+            for wristband_id, entry in sorted(entries.items())
+        ],
+    }
+
+
 @router.get("/active")
 def get_active_assignments():
     """
@@ -63,3 +84,13 @@ def get_active_assignments():
         {"wristband_id": row.wristband_id}
         for row in rows
     ]
+
+
+@router.post("/index/reload")
+def reload_assignment_index():
+    """
+    Rebuild the in-memory active-assignment index from the DB.
+    Call after editing WRISTBAND_ASSIGNMENT outside this service.
+    """
+    active = assignment_index.reload()
+    return {"status": "reloaded", "active_assignments": active}
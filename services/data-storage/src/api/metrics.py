@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+
+import metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics")
+def get_metrics():
+    """
+    Return runtime counters (ingestion queue depth, flush timings, ...).
+    """
+    return metrics.snapshot()
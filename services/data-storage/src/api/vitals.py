@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Query
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
 from sqlalchemy.orm import Session
 from storage.local import SessionLocal, LocalStorage
 from models import VitalMeasurement
@@ -23,6 +26,34 @@ def get_vitals_history(
     return {"items": items}
 
 
+@router.get("/range/{patient_id}")
+def get_vitals_range(
+    patient_id: int,
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    resolution: Optional[str] = Query(None, description="e.g. 30s, 1m, 5m, 1h"),
+    method: Literal["bucket", "lttb"] = Query("bucket"),
+    points: int = Query(500, ge=3, le=5000),
+):
+    """
+    Downsampled vitals history for a patient in [start, end).
+
+    - method=bucket: min/max/avg per bucket (resolution or auto from points)
+    - method=lttb: at most `points` LTTB-selected samples per metric
+    """
+    try:
+        return storage.get_vitals_range(
+            patient_id,
+            start=start,
+            end=end,
+            resolution=resolution,
+            method=method,
+            points=points,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # @router.get("/history")
 # def get_vitals_history(
 #     assignment_id: int = Query(...),
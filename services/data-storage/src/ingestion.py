@@ -0,0 +1,268 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.exc import OperationalError
+
+import metrics
+from metrics import LatencyHistogram
+
+
+# SQLite lock contention: the write will succeed once the lock is free
+_LOCK_ERRORS = ("database is locked", "database table is locked", "database is busy")
+
+
+def is_lock_error(e: Exception) -> bool:
+    """
+    Default BatchBuffer.retryable: SQLite busy / locked only. Other
+    OperationalErrors (no such table, disk I/O, ...) do not go away by
+    retrying.
+    """
+    return isinstance(e, OperationalError) and any(m in str(e) for m in _LOCK_ERRORS)
+
+
+class BatchBuffer:
+    """
+    Thread-safe write buffer for the MQTT ingestion path.
+
+    - Producers (MQTT callbacks) call add() and return immediately
+    - A background flusher hands pending records to flush_fn in one call
+    - A flush happens when batch_size records are pending or the oldest
+      pending record has waited max_latency_ms
+    - close() stops the flusher and flushes everything that is left
+    - A batch failing with a transient error (retryable(), default: SQLite
+      busy / locked) is put back and retried, up to max_retries times in a
+      row. Any other failure, or one more transient failure, is retried
+      record by record; records that fail with a non-transient error are
+      rejected (logged and counted) so one bad record cannot block the buffer
+    """
+
+    def __init__(
+        self,
+        name: str,
+        flush_fn: Callable[[List[Dict[str, Any]]], None],
+        batch_size: int = 200,
+        max_latency_ms: int = 500,
+        max_pending: int = 50_000,
+        retryable: Callable[[Exception], bool] = is_lock_error,
+        max_retries: int = 3,
+    ) -> None:
+        self.name = name
+        self.flush_fn = flush_fn
+        self.retryable = retryable
+        self.max_retries = max(0, int(max_retries))
+        # Transient batch failures in a row (reset by a successful write)
+        self._attempts = 0
+        self.batch_size = max(1, int(batch_size))
+        self.max_latency = max(1, int(max_latency_ms)) / 1000.0
+        self.max_pending = max(self.batch_size, int(max_pending))
+
+        self._pending: List[Dict[str, Any]] = []
+        self._oldest_at: Optional[float] = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Counters
+        self._received = 0
+        self._flushed = 0
+        self._dropped = 0
+        self._rejected = 0
+        self._flush_count = 0
+        self._flush_failures = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+        self._last_batch_size = 0
+        self.flush_latency = LatencyHistogram()
+
+        metrics.register(f"buffer.{name}", self.stats)
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"{self.name}-flusher",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Stop accepting records and flush everything still pending.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+        # Whatever the flusher could not write (or if it never ran)
+        while self.flush() > 0:
+            pass
+
+        print(f"[INGEST] {self.name} closed, stats={self.stats()}")
+
+    # ----------------------------
+    # Producer side
+    # ----------------------------
+    def add(self, record: Dict[str, Any]) -> bool:
+        with self._cond:
+            if self._closed:
+                return False
+
+            if len(self._pending) >= self.max_pending:
+                # Writer is not keeping up: shed the oldest record
+                self._pending.pop(0)
+                self._dropped += 1
+
+            if not self._pending:
+                self._oldest_at = time.monotonic()
+
+            self._pending.append(record)
+            self._received += 1
+
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+        return True
+
+    # ----------------------------
+    # Flushing
+    # ----------------------------
+    def flush(self) -> int:
+        """
+        Write one batch synchronously. Returns the number of records taken
+        off the queue (written or rejected).
+        """
+        with self._flush_lock:
+            with self._cond:
+                if not self._pending:
+                    return 0
+                batch = self._pending[: self.batch_size]
+                del self._pending[: len(batch)]
+                self._oldest_at = time.monotonic() if self._pending else None
+
+            started = time.perf_counter()
+            written, retry = len(batch), []
+            try:
+                self.flush_fn(batch)
+                self._attempts = 0
+            except Exception as e:
+                with self._cond:
+                    self._flush_failures += 1
+                print(f"[INGEST] {self.name} flush failed ({len(batch)} records): {e}")
+                if self.retryable(e) and self._attempts < self.max_retries:
+                    self._attempts += 1
+                    self._requeue(batch)
+                    return 0
+                written, retry = self._flush_one_by_one(batch)
+                if written:
+                    self._attempts = 0
+                if retry:
+                    self._requeue(retry)
+
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            self.flush_latency.record(elapsed_ms)
+
+            with self._cond:
+                self._flushed += written
+                self._flush_count += 1
+                self._last_flush_ms = elapsed_ms
+                self._total_flush_ms += elapsed_ms
+                self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+                self._last_batch_size = written
+
+            return len(batch) - len(retry)
+
+    def _flush_one_by_one(self, batch: List[Dict[str, Any]]):
+        """
+        Isolate the records that broke a batch. Returns (written, records
+        to retry); records failing with a non-retryable error are rejected.
+        """
+        written = 0
+        retry = []
+        for i, record in enumerate(batch):
+            try:
+                self.flush_fn([record])
+                written += 1
+            except Exception as e:
+                if self.retryable(e):
+                    # Still locked: the rest would fail (and wait) the same way
+                    retry = batch[i:]
+                    break
+                with self._cond:
+                    self._rejected += 1
+                print(f"[INGEST] {self.name} record rejected: {e} record={record!r}")
+        return written, retry
+
+    def _requeue(self, records: List[Dict[str, Any]]) -> None:
+        with self._cond:
+            # Put the records back in front so ordering is preserved
+            self._pending[:0] = records
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                del self._pending[:overflow]
+                self._dropped += overflow
+            self._oldest_at = time.monotonic()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    self._cond.wait(timeout=self._wait_time())
+
+                if self._closed:
+                    return
+
+            written = self.flush()
+            if written == 0 and self._flush_failures:
+                # Back off a little after a failed write
+                time.sleep(self.max_latency)
+
+    def _due(self) -> bool:
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.batch_size:
+            return True
+        return time.monotonic() - self._oldest_at >= self.max_latency
+
+    def _wait_time(self) -> float:
+        if not self._pending or self._oldest_at is None:
+            return self.max_latency
+        remaining = self.max_latency - (time.monotonic() - self._oldest_at)
+        return max(0.001, remaining)
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queue_depth": len(self._pending),
+                "received": self._received,
+                "flushed": self._flushed,
+                "dropped": self._dropped,
+                "rejected": self._rejected,
+                "flush_count": self._flush_count,
+                "flush_failures": self._flush_failures,
+                "last_batch_size": self._last_batch_size,
+                "last_flush_ms": round(self._last_flush_ms, 3),
+                "max_flush_ms": round(self._max_flush_ms, 3),
+                "avg_flush_ms": round(
+                    self._total_flush_ms / self._flush_count, 3
+                ) if self._flush_count else 0.0,
+                "batch_size": self.batch_size,
+                "max_latency_ms": int(self.max_latency * 1000),
+                "flush_ms": self.flush_latency.snapshot(),
+            }
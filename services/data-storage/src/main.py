@@ -1,8 +1,11 @@
 from storage.base import Base
-from storage.local import engine
+from storage.local import engine, LocalStorage
+from storage.assignment_index import assignment_index
+from storage.rollups import rollup_compactor
+from storage.retention import retention_manager
 import models  # noqa: F401  (register SQLAlchemy models)
 
-from mqtt_client import start_mqtt
+from mqtt_client import MQTTClient
 from config_loader import load_health_catalog_config
 
 from api.app import app
@@ -14,8 +17,55 @@ import uvicorn
 # ----------------------------
 # Database initialization
 # ----------------------------
+# Columns added to existing tables after their first release.
+# create_all() never alters a table, so add them with ALTER TABLE.
+ADDED_COLUMNS = {
+    "ALERT": {
+        "occurrence_count": "INTEGER NOT NULL DEFAULT 1",
+        "last_value": "FLOAT",
+        "last_seen_at": "DATETIME",
+    },
+}
+
+
+def add_missing_columns():
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {
+                row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')
+            }
+            for name, ddl in columns.items():
+                if name not in existing:
+                    conn.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN {name} {ddl}')
+                    print(f"[MAIN] added column {table}.{name}")
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+
+    # create_all() only creates indexes for tables it creates itself.
+    # Make sure indexes also exist on databases created by older versions.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                print(f"[MAIN] could not create index {index.name}: {e}")
+
+    # Backfill the latest-vital projection on first start after upgrade
+    with engine.connect() as conn:
+        has_latest = conn.exec_driver_sql(
+            "SELECT 1 FROM LATEST_VITAL LIMIT 1"
+        ).first()
+    if has_latest is None:
+        rows = LocalStorage().rebuild_latest_vitals()
+        print(f"[MAIN] LATEST_VITAL backfilled ({rows} assignments)")
+
+    with engine.connect() as conn:
+        mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+        conn.exec_driver_sql("PRAGMA optimize")
+    print(f"[MAIN] sqlite journal_mode={mode}")
 
 
 # ----------------------------
@@ -28,15 +78,24 @@ if __name__ == "__main__":
     init_db()
     print("[MAIN] database initialized")
 
+    # Warm the active-assignment index used by the MQTT hot path
+    assignment_index.reload()
+
+    # Keep 1-minute / 1-hour vital rollups up to date
+    rollup_compactor.start_in_background()
+
+    # Move expired raw vitals to per-day archive files
+    retention_manager.start_in_background()
+
     #  Load configuration from Health Catalog
     config = load_health_catalog_config()
     print("[MAIN] configuration loaded from Health Catalog")
     # print(config)  # enable only for debugging
 
     # Start MQTT consumer in background thread
+    mqtt_client = MQTTClient(config=config)
     mqtt_thread = threading.Thread(
-        target=start_mqtt,
-        args=(config,),
+        target=mqtt_client.start,
         daemon=True
     )
     mqtt_thread.start()
@@ -50,3 +109,9 @@ if __name__ == "__main__":
         port=8003,
         log_level="info"
     )
+
+    # REST API stopped (SIGINT/SIGTERM): flush buffered data before exit
+    mqtt_client.stop()
+    retention_manager.stop()
+    rollup_compactor.stop()
+    print("[MAIN] data-storage service stopped")
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Tuple
+
+
+# ----------------------------
+# Process-local metrics registry
+# ----------------------------
+# Components (ingestion buffers, background jobs, ...) register a
+# callable that returns a JSON-serializable dict of their counters.
+# The REST layer exposes a snapshot of all of them.
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+_lock = threading.Lock()
+
+
+def register(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    with _lock:
+        _providers[name] = provider
+
+
+def unregister(name: str) -> None:
+    with _lock:
+        _providers.pop(name, None)
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    with _lock:
+        providers = dict(_providers)
+
+    result: Dict[str, Dict[str, Any]] = {}
+    for name, provider in providers.items():
+        try:
+            result[name] = provider()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
+
+
+# ----------------------------
+# Latency histogram
+# ----------------------------
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram in milliseconds.
+
+    - record() is a bisect plus a few additions under a lock
+    - Percentiles are estimated as the upper bound of the bucket they
+      fall in (the observed max for the overflow bucket)
+    """
+
+    BOUNDS_MS: Tuple[float, ...] = (
+        0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000,
+    )
+
+    def __init__(self) -> None:
+        self._counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self._count = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, ms: float) -> None:
+        index = bisect_left(self.BOUNDS_MS, ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._total_ms += ms
+            if ms > self._max_ms:
+                self._max_ms = ms
+
+    def _percentile(self, counts, count: int, max_ms: float, q: float) -> float:
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                if index < len(self.BOUNDS_MS):
+                    return round(min(self.BOUNDS_MS[index], max_ms), 3)
+                break
+        return round(max_ms, 3)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            count, total_ms, max_ms = self._count, self._total_ms, self._max_ms
+
+        buckets = {f"le_{bound:g}ms": n for bound, n in zip(self.BOUNDS_MS, counts)}
+        buckets[f"gt_{self.BOUNDS_MS[-1]:g}ms"] = counts[-1]
+        return {
+            "count": count,
+            "avg_ms": round(total_ms / count, 3) if count else 0.0,
+            "p50_ms": self._percentile(counts, count, max_ms, 0.50),
+            "p95_ms": self._percentile(counts, count, max_ms, 0.95),
+            "p99_ms": self._percentile(counts, count, max_ms, 0.99),
+            "max_ms": round(max_ms, 3),
+            "buckets": buckets,
+        }
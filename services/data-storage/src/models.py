@@ -6,6 +6,8 @@ from sqlalchemy import (
     Float,
     ForeignKey,
     CheckConstraint,
+    Index,
+    text,
 )
 from storage.base import Base
 from datetime import datetime
@@ -61,6 +63,18 @@ class WristbandAssignment(Base):
     start_date = Column(DateTime, nullable=False, default=datetime.utcnow)
     end_date = Column(DateTime)
 
+    __table_args__ = (
+        # Active-assignment lookups (wristband_id + end_date IS NULL)
+        Index("idx_assignment_wristband_end", "wristband_id", "end_date"),
+        # Only one active assignment per wristband
+        Index(
+            "one_active_assignment",
+            "wristband_id",
+            unique=True,
+            sqlite_where=text("end_date IS NULL"),
+        ),
+    )
+
 
 # ----------------------------
 # Measurements
@@ -85,6 +99,98 @@ class VitalMeasurement(Base):
         CheckConstraint("battery_level BETWEEN 0 AND 100"),
     )
 
+    __table_args__ = (
+        # History and latest-per-assignment queries
+        Index("idx_vital_assignment_time", "assignment_id", "measured_at"),
+    )
+
+
+class LatestVital(Base):
+    """
+    Projection: newest vital row per assignment.
+    Upserted in the same transaction as the raw VITAL_MEASUREMENT insert,
+    so overview readers never scan the measurement history.
+    """
+    __tablename__ = "LATEST_VITAL"
+
+    assignment_id = Column(
+        Integer,
+        ForeignKey("WRISTBAND_ASSIGNMENT.assignment_id"),
+        primary_key=True,
+    )
+    measured_at = Column(DateTime, nullable=False)
+
+    heart_rate = Column(Integer)
+    spo2 = Column(Integer)
+    temperature = Column(Float)
+    motion = Column(Float)
+    battery_level = Column(Integer)
+
+
+# ----------------------------
+# Rollups (per-assignment aggregates)
+# ----------------------------
+class _VitalRollupColumns:
+    """
+    Aggregates of one assignment over one time bucket.
+    mean = <metric>_sum / <metric>_n, last = value of the newest sample.
+    """
+    assignment_id = Column(Integer, primary_key=True)
+    bucket_start = Column(Integer, primary_key=True)  # epoch seconds (UTC)
+
+    sample_count = Column(Integer, nullable=False, default=0)
+    last_at = Column(DateTime)
+
+    heart_rate_n = Column(Integer, nullable=False, default=0)
+    heart_rate_min = Column(Float)
+    heart_rate_max = Column(Float)
+    heart_rate_sum = Column(Float)
+    heart_rate_last = Column(Float)
+
+    spo2_n = Column(Integer, nullable=False, default=0)
+    spo2_min = Column(Float)
+    spo2_max = Column(Float)
+    spo2_sum = Column(Float)
+    spo2_last = Column(Float)
+
+    temperature_n = Column(Integer, nullable=False, default=0)
+    temperature_min = Column(Float)
+    temperature_max = Column(Float)
+    temperature_sum = Column(Float)
+    temperature_last = Column(Float)
+
+    motion_n = Column(Integer, nullable=False, default=0)
+    motion_min = Column(Float)
+    motion_max = Column(Float)
+    motion_sum = Column(Float)
+    motion_last = Column(Float)
+
+    battery_level_n = Column(Integer, nullable=False, default=0)
+    battery_level_min = Column(Float)
+    battery_level_max = Column(Float)
+    battery_level_sum = Column(Float)
+    battery_level_last = Column(Float)
+
+
+class VitalRollup1m(_VitalRollupColumns, Base):
+    __tablename__ = "VITAL_ROLLUP_1M"
+
+
+class VitalRollup1h(_VitalRollupColumns, Base):
+    __tablename__ = "VITAL_ROLLUP_1H"
+
+
+class RollupState(Base):
+    """
+    Compaction watermark: raw rows with measurement_id <= last_measurement_id
+    are already folded into the rollup tables.
+    """
+    __tablename__ = "ROLLUP_STATE"
+
+    name = Column(String(30), primary_key=True)
+    last_measurement_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
 
 # ----------------------------
 # Alerts (final, UI-ready)
@@ -139,3 +245,19 @@ class Alert(Base):
 
     description = Column(String, nullable=False)
     full_description = Column(String, nullable=False)
+
+    # Deduplication: repeats of an open alert update it instead of adding rows
+    occurrence_count = Column(Integer, nullable=False, default=1)
+    last_value = Column(Float)
+    last_seen_at = Column(DateTime)
+
+    __table_args__ = (
+        # Latest alert per assignment / patient alert history
+        Index("idx_alert_assignment_time", "assignment_id", "generated_at"),
+        # Open alert lookup when merging repeated occurrences
+        Index("idx_alert_open_key", "assignment_id", "status", "metric"),
+        # Active / critical alert counters
+        Index("idx_alert_status_severity", "status", "severity"),
+        # Keyset pagination of the alerts list
+        Index("idx_alert_generated_id", "generated_at", "alert_id"),
+    )
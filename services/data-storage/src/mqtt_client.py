@@ -1,22 +1,39 @@
 from __future__ import annotations
 
-import json
 import os
+from datetime import datetime
 from typing import Any, Dict, Optional
 
 import paho.mqtt.client as mqtt # type: ignore
-from sqlalchemy import text # type: ignore
-
-from storage.local import engine, LocalStorage
-
+from storage.local import LocalStorage
+from storage.assignment_index import assignment_index
+from ingestion import BatchBuffer
+from pipeline import Pipeline, Stage
+from shared.codec import ALERT, VITALS, CodecError, Schema, decode, dumps
+
+
+# ALERT columns that are NOT NULL without a default
+ALERT_REQUIRED_FIELDS = (
+    "alert_type",
+    "severity",
+    "threshold_profile",
+    "metric",
+    "value",
+    "description",
+    "full_description",
+)
 
 class MQTTClient:
     """
     Data-Storage MQTT consumer:
     - Subscribes to vitals + final alerts topics
+    - paho callback only enqueues: receive -> decode -> resolve -> write
+      run on worker threads linked by bounded queues
     - Validates JSON
-    - Resolves assignment_id (for vitals)
-    - Persists data into SQLite
+    - Resolves assignment_id (vitals; alerts without one)
+    - Buffers vitals and persists them into SQLite in batches
+    - Buffers alerts and persists them in batches (repeats merged)
+    - Publishes every saved alert row (with its alert_id) for the dashboard
     """
 
     def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
@@ -43,6 +60,14 @@ class MQTTClient:
             topics_cfg.get("alerts", {}).get("subscribe_pattern")
             or "health/alerts"
         )
+        self.assignment_changes_template = (
+            topics_cfg.get("assignment_changes", {}).get("template")
+            or "health/assignments/{wristband_id}"
+        )
+        self.persisted_alerts_topic = (
+            topics_cfg.get("persisted_alerts", {}).get("topic")
+            or "health/persisted_alerts"
+        )
 
         # ----------------------------
         # Feature flags
@@ -50,8 +75,80 @@ class MQTTClient:
         flags = self.config.get("feature_flags", {})
         self.strict_json_validation = bool(flags.get("enable_strict_schema_validation", True))
 
+        # ----------------------------
+        # Vitals ingestion buffer (group commit)
+        # ----------------------------
+        ingestion_cfg = self.config.get("ingestion", {})
+        self.vitals_buffer = BatchBuffer(
+            name="vitals",
+            flush_fn=self._flush_vitals,
+            batch_size=int(
+                ingestion_cfg.get("vitals_batch_size")
+                or os.getenv("VITALS_BATCH_SIZE", "200")
+            ),
+            max_latency_ms=int(
+                ingestion_cfg.get("vitals_max_latency_ms")
+                or os.getenv("VITALS_MAX_LATENCY_MS", "500")
+            ),
+        )
+
+        # ----------------------------
+        # Alert buffer: bursts share one transaction
+        # ----------------------------
+        self.alerts_buffer = BatchBuffer(
+            name="alerts",
+            flush_fn=self._flush_alerts,
+            batch_size=int(
+                ingestion_cfg.get("alerts_batch_size")
+                or os.getenv("ALERTS_BATCH_SIZE", "100")
+            ),
+            max_latency_ms=int(
+                ingestion_cfg.get("alerts_max_latency_ms")
+                or os.getenv("ALERTS_MAX_LATENCY_MS", "200")
+            ),
+        )
+        # Upsert: a repeat of an open alert bumps its counter instead of
+        # inserting a row, even without a producer dedup_key
+        self.alerts_upsert = str(
+            ingestion_cfg.get("alerts_upsert", os.getenv("ALERTS_UPSERT", "true"))
+        ).lower() in ("1", "true", "yes")
+
+        # ----------------------------
+        # Staged pipeline (off paho's network thread)
+        # ----------------------------
+        # A full entry queue drops QoS 0 vitals (counted) and briefly
+        # blocks the network loop for QoS 1 alerts
+        queue_size = int(
+            ingestion_cfg.get("pipeline_queue_size")
+            or os.getenv("MQTT_PIPELINE_QUEUE_SIZE", "10000")
+        )
+        self.pipeline = Pipeline([
+            Stage(
+                "decode",
+                self._decode_message,
+                workers=int(
+                    ingestion_cfg.get("decode_workers")
+                    or os.getenv("MQTT_DECODE_WORKERS", "1")
+                ),
+                queue_size=queue_size,
+            ),
+            Stage(
+                "resolve",
+                self._resolve_message,
+                workers=int(
+                    ingestion_cfg.get("resolve_workers")
+                    or os.getenv("MQTT_RESOLVE_WORKERS", "1")
+                ),
+                queue_size=queue_size,
+            ),
+        ])
+        self.alert_enqueue_timeout = float(os.getenv("MQTT_ALERT_ENQUEUE_TIMEOUT_SECONDS", "5"))
+
         self._client = mqtt.Client(client_id="data-storage-service")
 
+        # Tell other services (risk analysis profile cache) about assignment changes
+        assignment_index.add_listener(self._publish_assignment_change)
+
     # ----------------------------
     # Public API
     # ----------------------------
@@ -65,9 +162,28 @@ class MQTTClient:
         self._client.on_message = self._on_message
         self._client.on_disconnect = self._on_disconnect
 
+        self.vitals_buffer.start()
+        self.alerts_buffer.start()
+        self.pipeline.start()
+
         self._client.connect(self.broker, self.port, keepalive=self.keepalive)
         self._client.loop_forever()
 
+    def stop(self) -> None:
+        """
+        Disconnect from the broker, drain the pipeline and flush all
+        buffered vitals and alerts.
+        """
+        print("[MQTT] stopping data-storage mqtt client")
+        try:
+            self._client.disconnect()
+        except Exception as e:
+            print(f"[MQTT] disconnect failed: {e}")
+
+        self.pipeline.close()
+        self.vitals_buffer.close()
+        self.alerts_buffer.close()
+
     # ----------------------------
     # MQTT callbacks
     # ----------------------------
@@ -84,56 +200,77 @@ class MQTTClient:
         print(f"[MQTT] disconnected rc={rc}")
 
     def _on_message(self, client, userdata, msg):
-        topic = msg.topic
-        raw = msg.payload
+        """
+        Receive stage (paho network thread): enqueue only.
+        """
+        if msg.qos > 0:
+            self.pipeline.submit((msg.topic, msg.payload), block=True,
+                                 timeout=self.alert_enqueue_timeout)
+        else:
+            self.pipeline.submit((msg.topic, msg.payload))
 
+    # ----------------------------
+    # Pipeline stages
+    # ----------------------------
+    def _decode_message(self, item):
+        """
+        Decode / validate stage -> (kind, payload)
+        """
+        topic, raw = item
         print(f"[MQTT] message received topic={topic}")
 
-        payload = self._decode_json(raw)
-        if payload is None:
-            return
-
         if topic.startswith("health/alerts"):
-            self._handle_alert(payload)
-            return
+            kind, schema = "alert", ALERT
+        elif topic.startswith("wristbands/") and topic.endswith("/vitals"):
+            kind, schema = "vitals", VITALS
+        else:
+            print("[MQTT] unhandled topic, ignored")
+            return None
 
-        if topic.startswith("wristbands/") and topic.endswith("/vitals"):
+        payload = self._decode_json(raw, schema)
+        if payload is None:
+            return None
+        return kind, payload
+
+    def _resolve_message(self, item) -> None:
+        """
+        Resolve stage: assignment lookup, then hand off to the write
+        buffers (vitals / alerts), whose flushers are the write stage.
+        """
+        kind, payload = item
+        if kind == "alert":
+            self._handle_alert(payload)
+        else:
             self._handle_vitals(payload)
-            return
-
-        print("[MQTT] unhandled topic, ignored")
 
     # ----------------------------
     # Helpers
     # ----------------------------
-    def _decode_json(self, raw: bytes) -> Optional[Dict[str, Any]]:
+    def _decode_json(self, raw: bytes, schema: Schema) -> Optional[Dict[str, Any]]:
         try:
-            obj = json.loads(raw.decode("utf-8"))
-        except json.JSONDecodeError:
-            print(f"[MQTT] Invalid JSON payload: {raw!r}")
+            return decode(raw, schema if self.strict_json_validation else None)
+        except CodecError as e:
+            print(f"[MQTT] Invalid payload ({e}): {raw!r}")
             return None
 
-        if self.strict_json_validation and not isinstance(obj, dict):
-            print(f"[MQTT] JSON must be an object, got {type(obj)}")
-            return None
-
-        return obj
-
     def _resolve_assignment_id(self, wristband_id: int) -> Optional[int]:
-        with engine.begin() as conn:
-            row = conn.execute(
-                text(
-                    """
-                    SELECT assignment_id
-                    FROM WRISTBAND_ASSIGNMENT
-                    WHERE wristband_id = :wid
-                      AND end_date IS NULL
-                    """
-                ),
-                {"wid": wristband_id},
-            ).fetchone()
-
-        return int(row[0]) if row else None
+        # In-memory lookup; the index is maintained by LocalStorage
+        return assignment_index.get_assignment_id(wristband_id)
+
+    def _publish_assignment_change(self, wristband_id: Optional[int], entry: Optional[Dict]) -> None:
+        event = {
+            "wristband_id": wristband_id,
+            "active": entry is not None,
+            **(entry or {}),
+            "version": assignment_index.version,
+            "changed_at": datetime.utcnow().isoformat(),
+        }
+        topic = self.assignment_changes_template.format(
+            wristband_id="all" if wristband_id is None else wristband_id
+        )
+        info = self._client.publish(topic, dumps(event), qos=1)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            print(f"[MQTT] assignment change not published (rc={info.rc}) topic={topic}")
 
     # ----------------------------
     # Handlers
@@ -149,13 +286,30 @@ class MQTTClient:
             print(f"[VITAL] No active assignment for wristband {wristband_id}")
             return
 
-        self.storage.save_vital(assignment_id=assignment_id, data=payload)
-        print(f"[VITAL] stored ✅ assignment_id={assignment_id}")
+        self.vitals_buffer.add({**payload, "assignment_id": assignment_id})
+
+    def _flush_vitals(self, records) -> None:
+        written = self.storage.save_vitals(records)
+        print(
+            f"[VITAL] stored ✅ batch={written} "
+            f"queue={self.vitals_buffer.stats()['queue_depth']}"
+        )
 
     def _handle_alert(self, payload: Dict[str, Any]) -> None:
         print("[ALERT] received:", payload)
 
+        # Alert Notification resolves the assignment from its own cache.
+        # Older producers sent the wristband id as assignment_id, and an
+        # unresolved alert carries none: both map through the in-memory index.
         assignment_id = payload.get("assignment_id")
+        if "wristband_id" not in payload:
+            wristband_id = assignment_id
+            assignment_id = None
+        else:
+            wristband_id = payload["wristband_id"]
+        if assignment_id is None and wristband_id is not None:
+            assignment_id = self._resolve_assignment_id(int(wristband_id))
+
         if assignment_id is None:
             print("[ALERT] assignment_id missing, drop alert")
             return
@@ -171,10 +325,55 @@ class MQTTClient:
             "description": payload.get("description"),
             "full_description": payload.get("full_description"),
             "generated_at": payload.get("generated_at"),
+            # Deduplication (repeats of an open alert)
+            "dedup_key": payload.get("dedup_key"),
+            "occurrences": payload.get("occurrences"),
+            "last_value": payload.get("last_value"),
+            "last_seen_at": payload.get("last_seen_at"),
         }
 
-        self.storage.save_alert(assignment_id=int(assignment_id), data=alert_data)
-        print(f"[ALERT] stored ✅ assignment_id={assignment_id}")
+        # Reject here: a NOT NULL violation would fail the whole batch
+        missing = [f for f in ALERT_REQUIRED_FIELDS if alert_data[f] is None]
+        if missing:
+            print(f"[ALERT] {', '.join(missing)} missing, drop alert")
+            return
+
+        self.alerts_buffer.add({**alert_data, "assignment_id": int(assignment_id)})
+
+    def _flush_alerts(self, records) -> None:
+        saved = self.storage.save_alerts(records, upsert=self.alerts_upsert)
+        created = sum(1 for s in saved if s["created"])
+        print(
+            f"[ALERT] stored ✅ batch={len(saved)} "
+            f"new={created} merged={len(saved) - created}"
+        )
+        self._publish_persisted_alerts(saved)
+
+    def _publish_persisted_alerts(self, saved) -> None:
+        """
+        One event per saved row, as stored (alert_id, occurrence_count,
+        patient): "created" for new rows, "updated" for merged repeats.
+        """
+        events: Dict[int, str] = {}
+        for s in saved:
+            if s["created"]:
+                events[s["alert_id"]] = "created"
+            else:
+                events.setdefault(s["alert_id"], "updated")
+
+        # Never raise: the batch is already committed and must not be retried
+        try:
+            for row in self.storage.get_alerts(list(events)):
+                event = {"event": events[row["alert_id"]], "alert": row}
+                info = self._client.publish(self.persisted_alerts_topic, dumps(event), qos=1)
+                if info.rc != mqtt.MQTT_ERR_SUCCESS:
+                    print(
+                        f"[MQTT] persisted alert not published (rc={info.rc}) "
+                        f"alert_id={row['alert_id']}"
+                    )
+        except Exception as e:
+            # The dashboard catches up on its next /alerts fetch
+            print(f"[ALERT] persisted alerts not published: {e}")
 
 
 # Backward-compatible entry point
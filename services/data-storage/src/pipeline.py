@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+from metrics import LatencyHistogram
+
+
+_STOP = object()
+
+
+class Stage:
+    """
+    One pipeline stage: a bounded queue drained by worker threads.
+
+    - handler(item) returns the item for the next stage, or None
+    - Stage-to-stage hand-off blocks when the next queue is full
+      (backpressure); only the pipeline entry may drop
+    - wait / service histograms: time spent queued / in the handler
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Any],
+        workers: int = 1,
+        queue_size: int = 10_000,
+    ) -> None:
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.next: Optional[Stage] = None
+
+        self.wait = LatencyHistogram()
+        self.service = LatencyHistogram()
+
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._received = 0
+        self._processed = 0
+        self._dropped = 0
+        self._failures = 0
+
+        metrics.register(f"pipeline.{name}", self.stats)
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    def start(self) -> None:
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run,
+                name=f"pipeline-{self.name}-{i}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Process everything queued, then stop the workers.
+        The previous stage must already be closed.
+        """
+        for _ in self._threads:
+            self.queue.put(_STOP)
+
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    # ----------------------------
+    # Items
+    # ----------------------------
+    def put(self, item: Any, block: bool = True, timeout: Optional[float] = None) -> bool:
+        try:
+            self.queue.put((time.perf_counter(), item), block=block, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+                dropped = self._dropped
+            if dropped == 1 or dropped % 1000 == 0:
+                print(f"[INGEST] {self.name} queue full, {dropped} messages dropped so far")
+            return False
+
+        with self._lock:
+            self._received += 1
+        return True
+
+    def _run(self) -> None:
+        while True:
+            entry = self.queue.get()
+            if entry is _STOP:
+                return
+
+            enqueued_at, item = entry
+            started = time.perf_counter()
+            self.wait.record((started - enqueued_at) * 1000.0)
+
+            try:
+                result = self.handler(item)
+                if result is not None and self.next is not None:
+                    self.next.put(result)
+            except Exception as e:
+                with self._lock:
+                    self._failures += 1
+                print(f"[INGEST] {self.name} stage failed: {e}")
+
+            self.service.record((time.perf_counter() - started) * 1000.0)
+            with self._lock:
+                self._processed += 1
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {
+                "workers": self.workers,
+                "queue_depth": self.queue.qsize(),
+                "queue_size": self.queue.maxsize,
+                "received": self._received,
+                "processed": self._processed,
+                "dropped": self._dropped,
+                "failures": self._failures,
+            }
+        return {
+            **counters,
+            "wait_ms": self.wait.snapshot(),
+            "service_ms": self.service.snapshot(),
+        }
+
+
+class Pipeline:
+    """
+    Stages linked in order: stage i hands its results to stage i + 1.
+    """
+
+    def __init__(self, stages: List[Stage]) -> None:
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.next = next_stage
+
+    def start(self) -> None:
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, item: Any, block: bool = False, timeout: Optional[float] = None) -> bool:
+        """
+        Entry point. block=False never waits: a full first queue drops the item.
+        """
+        return self.stages[0].put(item, block=block, timeout=timeout)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Drain stage by stage so nothing queued is lost.
+        """
+        for stage in self.stages:
+            stage.close(timeout=timeout)
+        print(f"[INGEST] pipeline drained ({', '.join(s.name for s in self.stages)})")
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+
+class AssignmentIndex:
+    """
+    Process-local index of ACTIVE wristband assignments.
+
+    wristband_id -> {assignment_id, patient_id, threshold_profile}
+
+    - Loaded once at startup (reload)
+    - Kept up to date by LocalStorage assignment mutations
+    - Read on the MQTT hot path instead of a DB round trip
+    - reload() rebuilds it after an external DB edit
+    - Every change bumps `version` and is reported to the listeners as
+      (wristband_id, entry or None); (None, None) after a full reload
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._version = 0
+        self._listeners: List[Callable[[Optional[int], Optional[Dict]], None]] = []
+
+    # ----------------------------
+    # Bulk load
+    # ----------------------------
+    def reload(self, engine=None) -> int:
+        """
+        Rebuild the whole index from WRISTBAND_ASSIGNMENT.
+        Returns the number of active assignments loaded.
+        """
+        if engine is None:
+            from storage.local import engine
+
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("""
+                    SELECT
+                        wa.wristband_id,
+                        wa.assignment_id,
+                        wa.patient_id,
+                        p.threshold_profile
+                    FROM WRISTBAND_ASSIGNMENT wa
+                    LEFT JOIN PATIENT p
+                        ON p.patient_id = wa.patient_id
+                    WHERE wa.end_date IS NULL
+                """)
+            ).mappings().all()
+
+        entries = {
+            int(r["wristband_id"]): {
+                "assignment_id": int(r["assignment_id"]),
+                "patient_id": int(r["patient_id"]),
+                "threshold_profile": r["threshold_profile"],
+            }
+            for r in rows
+        }
+
+        with self._lock:
+            self._entries = entries
+            self._loaded = True
+            self._version += 1
+
+        print(f"[INDEX] assignment index loaded ({len(entries)} active)")
+        self._notify(None, None)
+        return len(entries)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.reload()
+
+    # ----------------------------
+    # Lookups (hot path)
+    # ----------------------------
+    def get(self, wristband_id: int) -> Optional[Dict]:
+        self._ensure_loaded()
+        entry = self._entries.get(int(wristband_id))
+        return dict(entry) if entry else None
+
+    def get_assignment_id(self, wristband_id: int) -> Optional[int]:
+        self._ensure_loaded()
+        entry = self._entries.get(int(wristband_id))
+        return entry["assignment_id"] if entry else None
+
+    def snapshot(self) -> Dict[int, Dict]:
+        self._ensure_loaded()
+        with self._lock:
+            return {wid: dict(e) for wid, e in self._entries.items()}
+
+    def versioned_snapshot(self) -> Tuple[int, Dict[int, Dict]]:
+        """
+        (version, snapshot) taken atomically.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            return self._version, {wid: dict(e) for wid, e in self._entries.items()}
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ----------------------------
+    # Mutations (called by LocalStorage)
+    # ----------------------------
+    def put(
+        self,
+        wristband_id: int,
+        assignment_id: int,
+        patient_id: int,
+        threshold_profile: Optional[str] = None,
+    ) -> None:
+        entry = {
+            "assignment_id": int(assignment_id),
+            "patient_id": int(patient_id),
+            "threshold_profile": threshold_profile,
+        }
+        with self._lock:
+            self._entries[int(wristband_id)] = entry
+            self._version += 1
+
+        self._notify(int(wristband_id), dict(entry))
+
+    def remove(self, wristband_id: int) -> Optional[Dict]:
+        with self._lock:
+            removed = self._entries.pop(int(wristband_id), None)
+            self._version += 1
+
+        self._notify(int(wristband_id), None)
+        return removed
+
+    # ----------------------------
+    # Change listeners
+    # ----------------------------
+    def add_listener(self, listener: Callable[[Optional[int], Optional[Dict]], None]) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self, wristband_id: Optional[int], entry: Optional[Dict]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(wristband_id, entry)
+            except Exception as e:
+                print(f"[INDEX] change listener failed: {e}")
+
+
+# Singleton instance
+assignment_index = AssignmentIndex()
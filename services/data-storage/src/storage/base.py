@@ -23,6 +23,11 @@ class StorageBackend(ABC):
         """Return a list of vital records for an assignment in a time range."""
         raise NotImplementedError
 
+    @abstractmethod
+    def get_vitals_range(self, patient_id: int, start=None, end=None):
+        """Return downsampled vital records for a patient in a time range."""
+        raise NotImplementedError
+
     @abstractmethod
     def unassign_wristband(self, wristband_id: int) -> bool:
         """
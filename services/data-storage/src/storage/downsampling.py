@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import math
+import re
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+VITAL_METRICS = ("heart_rate", "spo2", "temperature", "motion", "battery_level")
+
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Candidate bucket sizes used when the caller does not pick a resolution
+_RESOLUTION_LADDER = (
+    1, 5, 15, 30,
+    60, 300, 900, 1800,
+    3600, 3 * 3600, 6 * 3600, 12 * 3600,
+    86400,
+)
+
+
+# ----------------------------
+# Resolution helpers
+# ----------------------------
+def parse_resolution(value) -> int:
+    """
+    "30s" / "1m" / "5m" / "1h" / "1d" / 300 -> bucket size in seconds.
+    Raises ValueError on anything else.
+    """
+    if isinstance(value, int):
+        seconds = value
+    else:
+        match = re.fullmatch(r"\s*(\d+)\s*([smhd]?)\s*", str(value).lower())
+        if not match:
+            raise ValueError(f"Invalid resolution: {value!r}")
+        seconds = int(match.group(1)) * _UNITS[match.group(2) or "s"]
+
+    if seconds <= 0:
+        raise ValueError(f"Invalid resolution: {value!r}")
+    return seconds
+
+
+def pick_resolution(start: datetime, end: datetime, max_points: int) -> int:
+    """
+    Smallest ladder bucket that keeps the range within max_points buckets.
+    """
+    span = max(1.0, (end - start).total_seconds())
+    needed = span / max(1, max_points)
+    for seconds in _RESOLUTION_LADDER:
+        if seconds >= needed:
+            return seconds
+    return int(math.ceil(needed / 86400.0)) * 86400
+
+
+def to_epoch(value) -> float:
+    """
+    DB timestamp string / datetime (naive = UTC) -> epoch seconds.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def from_epoch(seconds: float) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+# ----------------------------
+# Bucket aggregation
+# ----------------------------
+class BucketAccumulator:
+    """
+    Mergeable per-bucket aggregates (count, min, max, sum, n per metric).
+
+    Partial aggregates from different sources (SQL GROUP BY, rollup
+    tables, raw rows) can be merged; averages are computed at the end.
+    """
+
+    def __init__(self, bucket_seconds: int, metrics: Sequence[str] = VITAL_METRICS):
+        self.bucket_seconds = bucket_seconds
+        self.metrics = tuple(metrics)
+        self._buckets: Dict[int, Dict] = {}
+
+    def _bucket(self, bucket_epoch: int) -> Dict:
+        bucket = self._buckets.get(bucket_epoch)
+        if bucket is None:
+            bucket = {"count": 0}
+            for m in self.metrics:
+                bucket[m] = [None, None, 0.0, 0]  # min, max, sum, n
+            self._buckets[bucket_epoch] = bucket
+        return bucket
+
+    def bucket_of(self, epoch: float) -> int:
+        return int(epoch // self.bucket_seconds) * self.bucket_seconds
+
+    def add_row(self, epoch: float, row: Dict) -> None:
+        bucket = self._bucket(self.bucket_of(epoch))
+        bucket["count"] += 1
+        for m in self.metrics:
+            value = row.get(m)
+            if value is None:
+                continue
+            agg = bucket[m]
+            agg[0] = value if agg[0] is None else min(agg[0], value)
+            agg[1] = value if agg[1] is None else max(agg[1], value)
+            agg[2] += value
+            agg[3] += 1
+
+    def merge(self, bucket_epoch: int, count: int, partials: Dict[str, Tuple]) -> None:
+        """
+        partials: metric -> (min, max, sum, n) for that bucket.
+        """
+        bucket = self._bucket(self.bucket_of(bucket_epoch))
+        bucket["count"] += int(count or 0)
+        for m, (lo, hi, total, n) in partials.items():
+            if m not in bucket or not n:
+                continue
+            agg = bucket[m]
+            agg[0] = lo if agg[0] is None else min(agg[0], lo)
+            agg[1] = hi if agg[1] is None else max(agg[1], hi)
+            agg[2] += total or 0.0
+            agg[3] += int(n)
+
+    def finalize(self) -> List[Dict]:
+        items = []
+        for bucket_epoch in sorted(self._buckets):
+            bucket = self._buckets[bucket_epoch]
+            item = {
+                "bucket_start": from_epoch(bucket_epoch),
+                "count": bucket["count"],
+            }
+            for m in self.metrics:
+                lo, hi, total, n = bucket[m]
+                item[f"{m}_min"] = lo
+                item[f"{m}_max"] = hi
+                item[f"{m}_avg"] = round(total / n, 3) if n else None
+            items.append(item)
+        return items
+
+
+# ----------------------------
+# LTTB (Largest-Triangle-Three-Buckets)
+# ----------------------------
+def lttb(points: Sequence[Tuple[float, float]], threshold: int) -> List[Tuple[float, float]]:
+    """
+    Reduce a time series to `threshold` points while keeping its visual
+    shape. points must be sorted by x.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average point of the next bucket
+        avg_start = int(math.floor((i + 1) * every)) + 1
+        avg_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_len = max(1, avg_end - avg_start)
+        avg_x = sum(p[0] for p in points[avg_start:avg_end]) / avg_len
+        avg_y = sum(p[1] for p in points[avg_start:avg_end]) / avg_len
+
+        # Pick the point of the current bucket with the largest triangle
+        range_start = int(math.floor(i * every)) + 1
+        range_end = int(math.floor((i + 1) * every)) + 1
+        ax, ay = points[a]
+
+        max_area = -1.0
+        next_a = range_start
+        for j in range(range_start, range_end):
+            area = abs(
+                (ax - avg_x) * (points[j][1] - ay)
+                - (ax - points[j][0]) * (avg_y - ay)
+            )
+            if area > max_area:
+                max_area = area
+                next_a = j
+
+        sampled.append(points[next_a])
+        a = next_a
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def lttb_series(
+    rows: Iterable[Dict],
+    threshold: int,
+    metrics: Sequence[str] = VITAL_METRICS,
+) -> Dict[str, List[List]]:
+    """
+    rows: dicts with "epoch" plus metric values, sorted by time.
+    Returns metric -> [[iso_timestamp, value], ...] reduced with LTTB.
+    """
+    series: Dict[str, List[Tuple[float, float]]] = {m: [] for m in metrics}
+    for row in rows:
+        for m in metrics:
+            value = row.get(m)
+            if value is not None:
+                series[m].append((row["epoch"], float(value)))
+
+    return {
+        m: [[from_epoch(x), y] for x, y in lttb(points, threshold)]
+        for m, points in series.items()
+    }
+
+
+def normalize_range(
+    start: Optional[datetime],
+    end: Optional[datetime],
+    default_hours: int = 24,
+) -> Tuple[datetime, datetime]:
+    """
+    Fill in a missing start/end and return naive UTC datetimes.
+    """
+    def _naive(value: datetime) -> datetime:
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    end = _naive(end) if end else datetime.utcnow()
+    start = _naive(start) if start else from_epoch(
+        to_epoch(end) - default_hours * 3600
+    ).replace(tzinfo=None)
+
+    if start >= end:
+        raise ValueError("start must be before end")
+    return start, end
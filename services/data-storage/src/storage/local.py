@@ -1,11 +1,28 @@
+import base64
+import json
 import os
 from datetime import datetime, timezone
 
-from sqlalchemy import text, create_engine
+from sqlalchemy import text, create_engine, insert, event, bindparam
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from storage.base import StorageBackend
-from models import VitalMeasurement, Alert
+from storage.assignment_index import assignment_index
+from storage.overview import dashboard_overview
+from storage.rollups import aggregate_rollup, get_watermark, rollup_table_for
+from storage.retention import vital_archive
+from storage.downsampling import (
+    VITAL_METRICS,
+    BucketAccumulator,
+    from_epoch,
+    lttb_series,
+    normalize_range,
+    parse_resolution,
+    pick_resolution,
+    to_epoch,
+)
+from models import VitalMeasurement, LatestVital, Alert
 
 
 # ----------------------------
@@ -14,14 +31,73 @@ from models import VitalMeasurement, Alert
 DB_PATH = os.getenv("DB_PATH", "/app/data/health.db")
 DATABASE_URL = f"sqlite:///{DB_PATH}"
 
+# SQLite tuning (applied on every new connection)
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
+    connect_args={
+        "check_same_thread": False,
+        "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+    },
 )
 
+
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets REST readers run while the MQTT writer commits.
+    synchronous=NORMAL is safe with WAL and avoids an fsync per commit.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        # Negative value = size in KiB
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
+# Upper bound on buckets a single history request may produce
+MAX_HISTORY_BUCKETS = int(os.getenv("MAX_HISTORY_BUCKETS", "5000"))
+
+# Alert rows joined with their assignment and patient (list_alerts / get_alerts)
+ALERT_ROWS_SQL = """
+    SELECT
+        a.alert_id,
+        a.assignment_id,
+        a.generated_at,
+        a.severity,
+        a.status,
+        a.alert_type,
+        a.threshold_profile,
+        a.metric,
+        a.value,
+        a.description,
+        a.full_description,
+        a.occurrence_count,
+        a.last_value,
+        a.last_seen_at,
+        wa.wristband_id,
+        wa.patient_id,
+        p.name AS patient_name
+    FROM ALERT a
+    JOIN WRISTBAND_ASSIGNMENT wa
+        ON a.assignment_id = wa.assignment_id
+    JOIN PATIENT p
+        ON wa.patient_id = p.patient_id
+"""
+
+
 # ----------------------------
 # Storage implementation
 # ----------------------------
@@ -50,35 +126,241 @@ class LocalStorage(StorageBackend):
             )
 
             session.add(row)
+            self._upsert_latest_vitals(session, [{
+                "assignment_id": assignment_id,
+                "measured_at": measured_at,
+                "heart_rate": row.heart_rate,
+                "spo2": row.spo2,
+                "temperature": row.temperature,
+                "motion": row.motion,
+                "battery_level": row.battery_level,
+            }])
             session.commit()
+
+            dashboard_overview.on_vitals_saved([{
+                "assignment_id": assignment_id,
+                "measured_at": measured_at,
+                "battery_level": data.get("battery_level"),
+            }])
         finally:
             session.close()
 
+    def save_vitals(self, records: list[dict]) -> int:
+        """
+        Persist a batch of vitals in ONE transaction (multi-row insert).
+
+        Each record is a vitals payload plus its resolved "assignment_id".
+        Used by the MQTT ingestion buffer instead of one commit per message.
+        """
+        if not records:
+            return 0
+
+        rows = [
+            {
+                "assignment_id": r["assignment_id"],
+                "measured_at": self._parse_datetime(r.get("measured_at")),
+                "heart_rate": r.get("heart_rate"),
+                "spo2": r.get("spo2"),
+                "temperature": r.get("temperature"),
+                "motion": r.get("motion"),
+                "battery_level": r.get("battery_level"),
+            }
+            for r in records
+        ]
+
+        with engine.begin() as conn:
+            conn.execute(insert(VitalMeasurement), rows)
+            self._upsert_latest_vitals(conn, rows)
+
+        dashboard_overview.on_vitals_saved(rows)
+        return len(rows)
+
+    @staticmethod
+    def _upsert_latest_vitals(conn, rows: list[dict]) -> None:
+        """
+        Upsert LATEST_VITAL inside the caller's transaction.
+        Older (out-of-order) measurements never overwrite a newer one.
+        """
+        stmt = sqlite_insert(LatestVital)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LatestVital.assignment_id],
+            set_={
+                "measured_at": stmt.excluded.measured_at,
+                "heart_rate": stmt.excluded.heart_rate,
+                "spo2": stmt.excluded.spo2,
+                "temperature": stmt.excluded.temperature,
+                "motion": stmt.excluded.motion,
+                "battery_level": stmt.excluded.battery_level,
+            },
+            where=stmt.excluded.measured_at >= LatestVital.measured_at,
+        )
+        conn.execute(stmt, rows)
+
+    def rebuild_latest_vitals(self) -> int:
+        """
+        Recompute LATEST_VITAL from VITAL_MEASUREMENT (one-off backfill
+        for databases that predate the projection).
+        """
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM LATEST_VITAL"))
+            result = conn.execute(
+                text("""
+                    INSERT INTO LATEST_VITAL (
+                        assignment_id, measured_at,
+                        heart_rate, spo2, temperature, motion, battery_level
+                    )
+                    SELECT
+                        vm.assignment_id, vm.measured_at,
+                        vm.heart_rate, vm.spo2, vm.temperature, vm.motion,
+                        vm.battery_level
+                    FROM VITAL_MEASUREMENT vm
+                    WHERE vm.measurement_id = (
+                        SELECT vm2.measurement_id
+                        FROM VITAL_MEASUREMENT vm2
+                        WHERE vm2.assignment_id = vm.assignment_id
+                        ORDER BY vm2.measured_at DESC, vm2.measurement_id DESC
+                        LIMIT 1
+                    )
+                """)
+            )
+            return result.rowcount
+
     # ----------------------------
     # ALERTS
     # ----------------------------
-    def save_alert(self, assignment_id: int, data: dict) -> None:
-        session = SessionLocal()
-        try:
-            generated_at = self._parse_datetime(data.get("generated_at"))
+    def save_alert(self, assignment_id: int, data: dict) -> dict:
+        """
+        Insert a new alert (or fold a producer-deduplicated repeat into
+        the open one, see save_alerts).
 
-            row = Alert(
-                assignment_id=assignment_id,
-                generated_at=generated_at,
-                alert_type=data["alert_type"],
-                severity=data["severity"],
-                status=data.get("status", "JUST_GENERATED"),
-                threshold_profile=data["threshold_profile"],
-                metric=data["metric"],
-                value=data["value"],
-                description=data["description"],
-                full_description=data["full_description"],
-            )
+        Returns {"alert_id": int, "created": bool}.
+        """
+        return self.save_alerts([{**data, "assignment_id": assignment_id}])[0]
 
-            session.add(row)
-            session.commit()
-        finally:
-            session.close()
+    def save_alerts(self, records: list[dict], upsert: bool = False) -> list[dict]:
+        """
+        Persist a batch of alerts in ONE transaction.
+
+        Each record is an alert plus its resolved "assignment_id".
+
+        - A repeat of an alert that is still open (JUST_GENERATED) for the
+          same assignment, metric, alert_type and severity is folded into
+          it: occurrence_count += occurrences, last_value / last_seen_at
+          move forward, no new row
+        - Alerts from the deduplicating producer (dedup_key set) are always
+          merged this way; upsert=True merges every alert
+        - Repeats inside the batch fold into the row the batch created
+
+        Returns {"alert_id": int, "created": bool} per record, in order.
+        """
+        if not records:
+            return []
+
+        results = []
+        created = []
+        open_alerts = {}   # (assignment, metric, alert_type, severity) -> alert_id
+        updates = {}       # alert_id -> UPDATE params
+
+        # Hook under the same lock as the commit: no recompute() in between
+        with dashboard_overview.mutation():
+            with engine.begin() as conn:
+                for data in records:
+                    assignment_id = data["assignment_id"]
+                    status = data.get("status") or "JUST_GENERATED"
+                    last_seen_at = self._parse_datetime(
+                        data.get("last_seen_at") or data.get("generated_at")
+                    )
+                    last_value = data.get("last_value", data.get("value"))
+                    occurrences = max(1, int(data.get("occurrences") or 1))
+                    key = (assignment_id, data["metric"], data["alert_type"], data["severity"])
+
+                    if upsert or data.get("dedup_key"):
+                        if key not in open_alerts:
+                            open_alerts[key] = self._find_open_alert(conn, key)
+
+                        open_alert_id = open_alerts[key]
+                        if open_alert_id is not None:
+                            update = updates.setdefault(open_alert_id, {
+                                "alert_id": open_alert_id,
+                                "occurrences": 0,
+                            })
+                            update["occurrences"] += occurrences
+                            update["last_value"] = last_value
+                            update["last_seen_at"] = self._db_timestamp(last_seen_at)
+                            results.append({"alert_id": open_alert_id, "created": False})
+                            continue
+
+                    generated_at = self._parse_datetime(data.get("generated_at"))
+                    alert_id = conn.execute(
+                        insert(Alert).values(
+                            assignment_id=assignment_id,
+                            generated_at=generated_at,
+                            alert_type=data["alert_type"],
+                            severity=data["severity"],
+                            status=status,
+                            threshold_profile=data["threshold_profile"],
+                            metric=data["metric"],
+                            value=data["value"],
+                            description=data["description"],
+                            full_description=data["full_description"],
+                            occurrence_count=occurrences,
+                            last_value=last_value,
+                            last_seen_at=last_seen_at,
+                        )
+                    ).inserted_primary_key[0]
+
+                    if status == "JUST_GENERATED":
+                        open_alerts[key] = alert_id
+                    results.append({"alert_id": alert_id, "created": True})
+                    created.append({
+                        "alert_id": alert_id,
+                        "assignment_id": assignment_id,
+                        "generated_at": generated_at,
+                        "alert_type": data["alert_type"],
+                        "severity": data["severity"],
+                        "status": status,
+                        "description": data["description"],
+                    })
+
+                if updates:
+                    conn.execute(
+                        text("""
+                            UPDATE ALERT
+                            SET occurrence_count = occurrence_count + :occurrences,
+                                last_value = :last_value,
+                                last_seen_at = :last_seen_at
+                            WHERE alert_id = :alert_id
+                        """),
+                        list(updates.values()),
+                    )
+
+            # Merged repeats leave the overview counters unchanged
+            for alert in created:
+                dashboard_overview.on_alert_saved(alert)
+        return results
+
+    @staticmethod
+    def _find_open_alert(conn, key: tuple):
+        assignment_id, metric, alert_type, severity = key
+        return conn.execute(
+            text("""
+                SELECT alert_id
+                FROM ALERT
+                WHERE assignment_id = :assignment_id
+                AND status = 'JUST_GENERATED'
+                AND metric = :metric
+                AND alert_type = :alert_type
+                AND severity = :severity
+                ORDER BY generated_at DESC, alert_id DESC
+                LIMIT 1
+            """),
+            {
+                "assignment_id": assignment_id,
+                "metric": metric,
+                "alert_type": alert_type,
+                "severity": severity,
+            },
+        ).scalar()
 
 
     # ----------------------------
@@ -113,13 +395,8 @@ class LocalStorage(StorageBackend):
                         AND wa.end_date IS NULL
                     LEFT JOIN WRISTBAND w
                         ON w.wristband_id = wa.wristband_id
-                    LEFT JOIN VITAL_MEASUREMENT vm
+                    LEFT JOIN LATEST_VITAL vm
                         ON vm.assignment_id = wa.assignment_id
-                        AND vm.measured_at = (
-                            SELECT MAX(vm2.measured_at)
-                            FROM VITAL_MEASUREMENT vm2
-                            WHERE vm2.assignment_id = wa.assignment_id
-                        )
                     LEFT JOIN ALERT la
                         ON la.assignment_id = wa.assignment_id
                         AND la.status != 'ACKNOWLEDGED'
@@ -170,13 +447,8 @@ class LocalStorage(StorageBackend):
                         AND wa.end_date IS NULL
                     LEFT JOIN WRISTBAND w
                         ON w.wristband_id = wa.wristband_id
-                    LEFT JOIN VITAL_MEASUREMENT vm
+                    LEFT JOIN LATEST_VITAL vm
                         ON vm.assignment_id = wa.assignment_id
-                        AND vm.measured_at = (
-                            SELECT MAX(v2.measured_at)
-                            FROM VITAL_MEASUREMENT v2
-                            WHERE v2.assignment_id = wa.assignment_id
-                        )
                     LEFT JOIN ALERT la
                         ON la.assignment_id = wa.assignment_id
                         AND la.status != 'ACKNOWLEDGED'
@@ -216,6 +488,9 @@ class LocalStorage(StorageBackend):
                         a.value,
                         a.description,
                         a.full_description,
+                        a.occurrence_count,
+                        a.last_value,
+                        a.last_seen_at,
                         wa.wristband_id
                     FROM ALERT a
                     JOIN WRISTBAND_ASSIGNMENT wa
@@ -239,17 +514,21 @@ class LocalStorage(StorageBackend):
         try:
             wristband_id = data.pop("wristband_id", None)
 
-            res = session.execute(
-                text("""
-                    INSERT INTO PATIENT (name, age, gender, phone, threshold_profile)
-                    VALUES (:name, :age, :gender, :phone, :threshold_profile)
-                """),
-                data,
-            )
+            with dashboard_overview.mutation():
+                res = session.execute(
+                    text("""
+                        INSERT INTO PATIENT (name, age, gender, phone, threshold_profile)
+                        VALUES (:name, :age, :gender, :phone, :threshold_profile)
+                    """),
+                    data,
+                )
 
-            patient_id = res.lastrowid
-            session.commit()
+                patient_id = res.lastrowid
+                session.commit()
 
+                dashboard_overview.on_patient_created(patient_id, data["name"])
+
+            # assign_wristband also registers the assignment in assignment_index
             if wristband_id is not None:
                 self.assign_wristband(patient_id, wristband_id)
 
@@ -267,21 +546,41 @@ class LocalStorage(StorageBackend):
     def assign_wristband(self, patient_id: int, wristband_id: int) -> None:
         session = SessionLocal()
         try:
-            session.execute(
-                text("""
-                    INSERT INTO WRISTBAND_ASSIGNMENT (
-                        patient_id,
-                        wristband_id,
-                        start_date
-                    )
-                    VALUES (:patient_id, :wristband_id, CURRENT_TIMESTAMP)
-                """),
-                {
-                    "patient_id": patient_id,
-                    "wristband_id": wristband_id,
-                },
+            with dashboard_overview.mutation():
+                res = session.execute(
+                    text("""
+                        INSERT INTO WRISTBAND_ASSIGNMENT (
+                            patient_id,
+                            wristband_id,
+                            start_date
+                        )
+                        VALUES (:patient_id, :wristband_id, CURRENT_TIMESTAMP)
+                    """),
+                    {
+                        "patient_id": patient_id,
+                        "wristband_id": wristband_id,
+                    },
+                )
+                assignment_id = res.lastrowid
+
+                threshold_profile = session.execute(
+                    text("SELECT threshold_profile FROM PATIENT WHERE patient_id = :pid"),
+                    {"pid": patient_id},
+                ).scalar()
+
+                session.commit()
+
+                dashboard_overview.on_assignment_started(
+                    assignment_id, patient_id, wristband_id
+                )
+
+            # Keep the in-memory index in sync with the committed row
+            assignment_index.put(
+                wristband_id=wristband_id,
+                assignment_id=assignment_id,
+                patient_id=patient_id,
+                threshold_profile=threshold_profile,
             )
-            session.commit()
         finally:
             session.close()
 
@@ -390,17 +689,25 @@ class LocalStorage(StorageBackend):
     def unassign_wristband(self, wristband_id: int) -> bool:
         session = SessionLocal()
         try:
-            result = session.execute(
-                text("""
-                    UPDATE WRISTBAND_ASSIGNMENT
-                    SET end_date = CURRENT_TIMESTAMP
-                    WHERE wristband_id = :wristband_id
-                    AND end_date IS NULL
-                """),
-                {"wristband_id": wristband_id}
-            )
+            with dashboard_overview.mutation():
+                result = session.execute(
+                    text("""
+                        UPDATE WRISTBAND_ASSIGNMENT
+                        SET end_date = CURRENT_TIMESTAMP
+                        WHERE wristband_id = :wristband_id
+                        AND end_date IS NULL
+                    """),
+                    {"wristband_id": wristband_id}
+                )
 
-            session.commit()
+                session.commit()
+
+                ended = assignment_index.remove(wristband_id)
+                if ended is not None:
+                    dashboard_overview.on_assignment_ended(ended["assignment_id"])
+                elif result.rowcount > 0:
+                    # Index was out of sync: let the overview rebuild itself
+                    dashboard_overview.invalidate()
 
             # rowcount = چند assignment بسته شده
             return result.rowcount > 0
@@ -410,38 +717,111 @@ class LocalStorage(StorageBackend):
     # ----------------------------
     # list Alerts
     # ----------------------------
-    def list_alerts(self) -> list[dict]:
+    def list_alerts(
+        self,
+        status: list[str] | None = None,
+        severity: list[str] | None = None,
+        patient_id: int | None = None,
+        metric: str | None = None,
+        since: datetime | str | None = None,
+        until: datetime | str | None = None,
+        cursor: str | None = None,
+        limit: int | None = None,
+    ) -> dict:
+        """
+        Filtered, keyset-paginated alert listing (newest first).
+
+        Pages are ordered by (generated_at, alert_id) DESC. next_cursor is
+        an opaque token for the following page, or None on the last page.
+        limit None returns every matching alert (next_cursor None).
+        Raises ValueError on a malformed cursor.
+        """
+        where = []
+        params: dict = {}
+        expanding = []
+
+        if status:
+            where.append("a.status IN :statuses")
+            params["statuses"] = list(status)
+            expanding.append("statuses")
+        if severity:
+            where.append("a.severity IN :severities")
+            params["severities"] = list(severity)
+            expanding.append("severities")
+        if patient_id is not None:
+            where.append("wa.patient_id = :patient_id")
+            params["patient_id"] = patient_id
+        if metric:
+            where.append("a.metric = :metric")
+            params["metric"] = metric
+        if since is not None:
+            where.append("a.generated_at >= :since")
+            params["since"] = self._db_timestamp(since)
+        if until is not None:
+            where.append("a.generated_at < :until")
+            params["until"] = self._db_timestamp(until)
+        if cursor:
+            cursor_at, cursor_id = self._decode_alert_cursor(cursor)
+            where.append(
+                "(a.generated_at < :cursor_at"
+                " OR (a.generated_at = :cursor_at AND a.alert_id < :cursor_id))"
+            )
+            params["cursor_at"] = cursor_at
+            params["cursor_id"] = cursor_id
+
+        sql = ALERT_ROWS_SQL
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += """
+            ORDER BY a.generated_at DESC, a.alert_id DESC
+        """
+        if limit is not None:
+            sql += " LIMIT :limit"
+            params["limit"] = limit + 1
+
+        stmt = text(sql)
+        if expanding:
+            stmt = stmt.bindparams(
+                *[bindparam(name, expanding=True) for name in expanding]
+            )
+
         session = SessionLocal()
         try:
-            rows = session.execute(
-                text("""
-                    SELECT
-                        a.alert_id,
-                        a.assignment_id,
-                        a.generated_at,
-                        a.severity,
-                        a.status,
-                        a.alert_type,
-                        a.threshold_profile,
-                        a.metric,
-                        a.value,
-                        a.description,
-                        a.full_description,
-                        wa.wristband_id,
-                        p.name AS patient_name
-                    FROM ALERT a
-                    JOIN WRISTBAND_ASSIGNMENT wa
-                        ON a.assignment_id = wa.assignment_id
-                    JOIN PATIENT p
-                        ON wa.patient_id = p.patient_id
-                    ORDER BY a.generated_at DESC
-                """)
-            ).mappings().all()
+            rows = session.execute(stmt, params).mappings().all()
+        finally:
+            session.close()
 
-            return [dict(r) for r in rows]
+        items = [dict(r) for r in rows[:limit]]
+        next_cursor = None
+        if limit is not None and len(rows) > limit and items:
+            last = items[-1]
+            next_cursor = self._encode_alert_cursor(
+                last["generated_at"], last["alert_id"]
+            )
+
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get_alerts(self, alert_ids: list[int]) -> list[dict]:
+        """
+        Alerts by id, in the same shape as list_alerts() items.
+        Unknown ids are skipped; order follows alert_ids.
+        """
+        if not alert_ids:
+            return []
+
+        stmt = text(
+            ALERT_ROWS_SQL + " WHERE a.alert_id IN :alert_ids"
+        ).bindparams(bindparam("alert_ids", expanding=True))
+
+        session = SessionLocal()
+        try:
+            rows = session.execute(stmt, {"alert_ids": list(alert_ids)}).mappings().all()
         finally:
             session.close()
-    
+
+        by_id = {r["alert_id"]: dict(r) for r in rows}
+        return [by_id[i] for i in alert_ids if i in by_id]
+
     def acknowledge_alert(
         self,
         alert_id: int,
@@ -450,24 +830,43 @@ class LocalStorage(StorageBackend):
         ) -> bool:
             session = SessionLocal()
             try:
-                result = session.execute(
-                    text("""
-                        UPDATE ALERT
-                        SET
-                            status = 'ACKNOWLEDGED',
-                            acknowledged_at = CURRENT_TIMESTAMP,
-                            reviewed_by = :reviewed_by,
-                            clinical_note = :clinical_note
-                        WHERE alert_id = :alert_id
-                    """),
-                    {
-                        "alert_id": alert_id,
-                        "reviewed_by": reviewed_by,
-                        "clinical_note": clinical_note,
-                    },
-                )
+                with dashboard_overview.mutation():
+                    previous = session.execute(
+                        text("""
+                            SELECT assignment_id, severity, status
+                            FROM ALERT
+                            WHERE alert_id = :alert_id
+                        """),
+                        {"alert_id": alert_id},
+                    ).mappings().first()
+
+                    result = session.execute(
+                        text("""
+                            UPDATE ALERT
+                            SET
+                                status = 'ACKNOWLEDGED',
+                                acknowledged_at = CURRENT_TIMESTAMP,
+                                reviewed_by = :reviewed_by,
+                                clinical_note = :clinical_note
+                            WHERE alert_id = :alert_id
+                        """),
+                        {
+                            "alert_id": alert_id,
+                            "reviewed_by": reviewed_by,
+                            "clinical_note": clinical_note,
+                        },
+                    )
+
+                    session.commit()
+
+                    if previous is not None:
+                        dashboard_overview.on_alert_acknowledged(
+                            alert_id=alert_id,
+                            assignment_id=previous["assignment_id"],
+                            severity=previous["severity"],
+                            previous_status=previous["status"],
+                        )
 
-                session.commit()
                 return result.rowcount > 0
             finally:
                 session.close()
@@ -493,18 +892,13 @@ class LocalStorage(StorageBackend):
                         p.patient_id,
                         p.name AS patient_name
 
-                    FROM VITAL_MEASUREMENT vm
+                    FROM LATEST_VITAL vm
                     JOIN WRISTBAND_ASSIGNMENT wa
                         ON vm.assignment_id = wa.assignment_id
                     JOIN PATIENT p
                         ON wa.patient_id = p.patient_id
 
                     WHERE wa.end_date IS NULL
-                    AND vm.measured_at = (
-                        SELECT MAX(vm2.measured_at)
-                        FROM VITAL_MEASUREMENT vm2
-                        WHERE vm2.assignment_id = vm.assignment_id
-                    )
 
                     ORDER BY vm.measured_at DESC
                 """)
@@ -613,14 +1007,9 @@ class LocalStorage(StorageBackend):
                 text("""
                     SELECT COUNT(*)
                     FROM WRISTBAND_ASSIGNMENT wa
-                    JOIN VITAL_MEASUREMENT vm
+                    JOIN LATEST_VITAL vm
                     ON wa.assignment_id = vm.assignment_id
                     WHERE wa.end_date IS NULL
-                    AND vm.measured_at = (
-                        SELECT MAX(vm2.measured_at)
-                        FROM VITAL_MEASUREMENT vm2
-                        WHERE vm2.assignment_id = wa.assignment_id
-                    )
                     AND vm.battery_level < :threshold
                 """),
                 {"threshold": threshold},
@@ -630,123 +1019,357 @@ class LocalStorage(StorageBackend):
             session.close()
     
     def get_dashboard_overview(self) -> dict:
+        """
+        Served from incrementally maintained counters (storage.overview).
+        The counters rebuild themselves from one DB snapshot when needed.
+        """
+        return dashboard_overview.overview()
+
+    # ----------------------------
+    # Query API
+    # ----------------------------
+    def get_latest(self, assignment_id: int):
         session = SessionLocal()
         try:
-            now = datetime.now(timezone.utc)
+            row = session.execute(
+                text("""
+                    SELECT
+                        assignment_id,
+                        measured_at,
+                        heart_rate,
+                        spo2,
+                        temperature,
+                        motion,
+                        battery_level
+                    FROM LATEST_VITAL
+                    WHERE assignment_id = :assignment_id
+                """),
+                {"assignment_id": assignment_id},
+            ).mappings().first()
 
-            total_patients = session.execute(
-                text("SELECT COUNT(*) FROM PATIENT")
-            ).scalar_one()
+            return dict(row) if row else None
+        finally:
+            session.close()
 
-            active_devices = session.execute(
-                text("""
-                    SELECT COUNT(DISTINCT patient_id)
-                    FROM WRISTBAND_ASSIGNMENT
-                    WHERE end_date IS NULL
-                """)
-            ).scalar_one()
+    def get_history(
+        self,
+        assignment_id: int,
+        start=None,
+        end=None,
+        resolution=None,
+        method: str = "bucket",
+        points: int = 500,
+    ) -> dict:
+        """
+        Downsampled vitals for one assignment in [start, end).
+        See _history() for the response shape.
+        """
+        return self._history([assignment_id], start, end, resolution, method, points)
 
-            active_alerts = session.execute(
-                text("""
-                    SELECT COUNT(*)
-                    FROM ALERT
-                    WHERE status != 'ACKNOWLEDGED'
-                """)
-            ).scalar_one()
+    # ----------------------------
+    # Time-range history (downsampled)
+    # ----------------------------
+    def get_vitals_range(
+        self,
+        patient_id: int,
+        start=None,
+        end=None,
+        resolution=None,
+        method: str = "bucket",
+        points: int = 500,
+    ) -> dict:
+        """
+        Downsampled vitals for a patient across every assignment that
+        overlaps [start, end) (default: last 24 hours).
+        """
+        start, end = normalize_range(start, end)
+        assignment_ids = self._patient_assignments_in_range(patient_id, start, end)
+        return self._history(assignment_ids, start, end, resolution, method, points)
 
-            patients_in_risk = session.execute(
-                text("""
-                    SELECT COUNT(DISTINCT wa.patient_id)
-                    FROM ALERT a
-                    JOIN WRISTBAND_ASSIGNMENT wa
-                        ON a.assignment_id = wa.assignment_id
-                    WHERE a.status != 'ACKNOWLEDGED'
-                    AND a.severity = 'CRITICAL'
-                """)
-            ).scalar_one()
+    def _history(
+        self,
+        assignment_ids: list[int],
+        start,
+        end,
+        resolution,
+        method: str,
+        points: int,
+    ) -> dict:
+        """
+        method="bucket": min/max/avg per bucket of `resolution`
+            (picked automatically to fit `points` buckets if omitted)
+            -> {"method", "resolution_seconds", "items": [...]}
+        method="lttb": LTTB-reduced series of at most `points` per metric
+            -> {"method", "points", "series": {metric: [[t, v], ...]}}
+        Raises ValueError on invalid arguments.
+        """
+        start, end = normalize_range(start, end)
 
-            low_battery_devices = session.execute(
-                text("""
-                    SELECT COUNT(*)
-                    FROM WRISTBAND_ASSIGNMENT wa
-                    JOIN VITAL_MEASUREMENT vm
-                        ON wa.assignment_id = vm.assignment_id
-                    WHERE wa.end_date IS NULL
-                    AND vm.measured_at = (
-                        SELECT MAX(vm2.measured_at)
-                        FROM VITAL_MEASUREMENT vm2
-                        WHERE vm2.assignment_id = wa.assignment_id
-                    )
-                    AND vm.battery_level < 30
-                """)
-            ).scalar_one()
+        if method == "lttb":
+            rows = self._raw_history_rows(assignment_ids, start, end)
+            return {
+                "method": "lttb",
+                "start": start,
+                "end": end,
+                "points": points,
+                "series": lttb_series(rows, points),
+            }
 
-            recent_alert_rows = session.execute(
-                text("""
-                    SELECT
-                        a.alert_id,
-                        a.severity,
-                        a.alert_type,
-                        a.description,
-                        a.generated_at,
-                        a.status,
-                        w.wristband_id,
-                        p.name AS patient_name
-                    FROM ALERT a
-                    JOIN WRISTBAND_ASSIGNMENT wa
-                        ON a.assignment_id = wa.assignment_id
-                    JOIN WRISTBAND w
-                        ON wa.wristband_id = w.wristband_id
-                    JOIN PATIENT p
-                        ON wa.patient_id = p.patient_id
-                    ORDER BY a.generated_at DESC
-                    LIMIT 5
-                """)
+        if method != "bucket":
+            raise ValueError(f"Unknown method: {method!r}")
+
+        bucket_seconds = (
+            parse_resolution(resolution) if resolution
+            else pick_resolution(start, end, points)
+        )
+        if (end - start).total_seconds() / bucket_seconds > MAX_HISTORY_BUCKETS:
+            raise ValueError("Resolution too fine for the requested range")
+
+        acc = BucketAccumulator(bucket_seconds)
+        source = self._aggregate_buckets(acc, assignment_ids, start, end)
+
+        return {
+            "method": "bucket",
+            "start": start,
+            "end": end,
+            "resolution_seconds": bucket_seconds,
+            "source": source,
+            "items": acc.finalize(),
+        }
+
+    def _aggregate_buckets(self, acc: BucketAccumulator, assignment_ids, start, end) -> str:
+        """
+        Fill acc from the coarsest table that can answer the resolution:
+        1-hour rollups, 1-minute rollups, or raw rows.
+        Rows not yet compacted (above the rollup watermark) are added from
+        VITAL_MEASUREMENT so results are never stale.
+        Returns the name of the source used.
+        """
+        route = rollup_table_for(acc.bucket_seconds)
+        if route is None or not assignment_ids:
+            self._aggregate_raw(acc, assignment_ids, start, end)
+            return "VITAL_MEASUREMENT"
+
+        granularity, table = route
+        start_epoch = int(to_epoch(start) // granularity) * granularity
+        end_epoch = int(to_epoch(end))
+        aligned_start = self._db_timestamp(
+            datetime.fromtimestamp(start_epoch, tz=timezone.utc)
+        )
+
+        # One transaction = one snapshot for rollups + uncompacted tail
+        with engine.begin() as conn:
+            watermark = get_watermark(conn)
+            aggregate_rollup(conn, acc, table, assignment_ids, start_epoch, end_epoch)
+
+            tail = conn.execute(
+                text(f"""
+                    SELECT measured_at, {", ".join(VITAL_METRICS)}
+                    FROM VITAL_MEASUREMENT
+                    WHERE measurement_id > :watermark
+                    AND assignment_id IN :assignment_ids
+                    AND measured_at >= :start
+                    AND measured_at < :end
+                """).bindparams(bindparam("assignment_ids", expanding=True)),
+                {
+                    "watermark": watermark,
+                    "assignment_ids": list(assignment_ids),
+                    "start": aligned_start,
+                    "end": self._db_timestamp(end),
+                },
             ).mappings().all()
 
-            recent_alerts = [
+        for r in tail:
+            acc.add_row(to_epoch(r["measured_at"]), r)
+
+        return table
+
+    def _patient_assignments_in_range(self, patient_id: int, start, end) -> list[int]:
+        session = SessionLocal()
+        try:
+            rows = session.execute(
+                text("""
+                    SELECT assignment_id
+                    FROM WRISTBAND_ASSIGNMENT
+                    WHERE patient_id = :patient_id
+                    AND start_date < :end
+                    AND (end_date IS NULL OR end_date >= :start)
+                """),
                 {
-                    "alert_id": r["alert_id"],
-                    "severity": r["severity"],
-                    "alert_type": r["alert_type"],
-                    "description": r.get("description", ""),
-                    "device_id": f"WB-{r['wristband_id']}",
-                    "generated_at": r["generated_at"],
-                    "acknowledged": r["status"] == "ACKNOWLEDGED",
-                    "patient_name": r["patient_name"],
-                }
-                for r in recent_alert_rows
-            ]
+                    "patient_id": patient_id,
+                    "start": self._db_timestamp(start),
+                    "end": self._db_timestamp(end),
+                },
+            ).fetchall()
+            return [int(r[0]) for r in rows]
+        finally:
+            session.close()
 
-            return {
-                "system_overview": {
-                    "active_devices": active_devices,
-                    "patients_monitored": total_patients,
-                    "active_alerts": active_alerts,
-                    "last_update": now,
+    def _aggregate_raw(self, acc: BucketAccumulator, assignment_ids, start, end) -> None:
+        """
+        GROUP BY bucket in SQLite and merge the partials into acc.
+        """
+        if not assignment_ids:
+            return
+
+        columns = ",\n".join(
+            f"MIN({m}) AS {m}_min, MAX({m}) AS {m}_max, "
+            f"SUM({m}) AS {m}_sum, COUNT({m}) AS {m}_n"
+            for m in VITAL_METRICS
+        )
+        stmt = text(f"""
+            SELECT
+                (CAST(strftime('%s', measured_at) AS INTEGER) / :bucket) * :bucket
+                    AS bucket_epoch,
+                COUNT(*) AS n,
+                {columns}
+            FROM VITAL_MEASUREMENT
+            WHERE assignment_id IN :assignment_ids
+            AND measured_at >= :start
+            AND measured_at < :end
+            GROUP BY bucket_epoch
+        """).bindparams(bindparam("assignment_ids", expanding=True))
+
+        session = SessionLocal()
+        try:
+            rows = session.execute(
+                stmt,
+                {
+                    "bucket": acc.bucket_seconds,
+                    "assignment_ids": list(assignment_ids),
+                    "start": self._db_timestamp(start),
+                    "end": self._db_timestamp(end),
                 },
-                "stats": {
-                    "patients_in_risk": patients_in_risk,
-                    "low_battery_devices": low_battery_devices,
+            ).mappings().all()
+        finally:
+            session.close()
+
+        for r in rows:
+            acc.merge(
+                r["bucket_epoch"],
+                r["n"],
+                {
+                    m: (r[f"{m}_min"], r[f"{m}_max"], r[f"{m}_sum"], r[f"{m}_n"])
+                    for m in VITAL_METRICS
                 },
-                "recent_alerts": recent_alerts,
-            }
+            )
 
+        # Rows moved out of the hot table by the retention manager
+        archived = vital_archive.read_rows(assignment_ids, start, end)
+        if archived:
+            # An assignment-day is briefly in both places between archive
+            # and delete; those rows were already counted by the query above
+            epochs = [r["epoch"] for r in archived]
+            hot_ids = self._hot_measurement_ids(
+                assignment_ids,
+                from_epoch(min(epochs) - 0.001),
+                from_epoch(max(epochs) + 0.001),
+            )
+            for r in archived:
+                if r["measurement_id"] not in hot_ids:
+                    acc.add_row(r["epoch"], r)
+
+    def _hot_measurement_ids(self, assignment_ids, start, end) -> set:
+        """
+        measurement_ids still in VITAL_MEASUREMENT for the assignments in
+        [start, end) (idx_vital_assignment_time).
+        """
+        stmt = text("""
+            SELECT measurement_id
+            FROM VITAL_MEASUREMENT
+            WHERE assignment_id IN :assignment_ids
+            AND measured_at >= :start
+            AND measured_at < :end
+        """).bindparams(bindparam("assignment_ids", expanding=True))
+
+        session = SessionLocal()
+        try:
+            rows = session.execute(
+                stmt,
+                {
+                    "assignment_ids": list(assignment_ids),
+                    "start": self._db_timestamp(start),
+                    "end": self._db_timestamp(end),
+                },
+            ).all()
         finally:
             session.close()
-    # ----------------------------
-    # Query API (future phases)
-    # ----------------------------
-    def get_latest(self, assignment_id: int):
-        return None
 
-    def get_history(self, assignment_id: int, start=None, end=None):
-        return []
+        return {r[0] for r in rows}
+
+    def _raw_history_rows(self, assignment_ids, start, end) -> list[dict]:
+        """
+        Raw rows in [start, end), time-ordered, with an "epoch" field.
+        Archived days are merged in transparently.
+        """
+        if not assignment_ids:
+            return []
+
+        stmt = text(f"""
+            SELECT measurement_id, measured_at, {", ".join(VITAL_METRICS)}
+            FROM VITAL_MEASUREMENT
+            WHERE assignment_id IN :assignment_ids
+            AND measured_at >= :start
+            AND measured_at < :end
+            ORDER BY measured_at
+        """).bindparams(bindparam("assignment_ids", expanding=True))
+
+        session = SessionLocal()
+        try:
+            rows = session.execute(
+                stmt,
+                {
+                    "assignment_ids": list(assignment_ids),
+                    "start": self._db_timestamp(start),
+                    "end": self._db_timestamp(end),
+                },
+            ).mappings().all()
+        finally:
+            session.close()
+
+        result = [{**dict(r), "epoch": to_epoch(r["measured_at"])} for r in rows]
+
+        archived = vital_archive.read_rows(assignment_ids, start, end)
+        if archived:
+            # An assignment-day is briefly in both places between archive and delete
+            hot_ids = {r["measurement_id"] for r in result}
+            result.extend(r for r in archived if r["measurement_id"] not in hot_ids)
+            result.sort(key=lambda r: r["epoch"])
+
+        return result
 
 
     # ----------------------------
     # Helpers
     # ----------------------------
+    @staticmethod
+    def _encode_alert_cursor(generated_at, alert_id: int) -> str:
+        if isinstance(generated_at, datetime):
+            generated_at = LocalStorage._db_timestamp(generated_at)
+        raw = json.dumps([str(generated_at), int(alert_id)]).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def _decode_alert_cursor(cursor: str) -> tuple[str, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            generated_at, alert_id = json.loads(base64.urlsafe_b64decode(padded))
+            return str(generated_at), int(alert_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def _db_timestamp(value) -> str:
+        """
+        Format a datetime the way SQLAlchemy stores DateTime in SQLite
+        (naive UTC, microsecond precision) so string comparisons work.
+        """
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
     @staticmethod
     def _parse_datetime(value):
         if not value:
@@ -0,0 +1,347 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+
+LOW_BATTERY_THRESHOLD = 30
+RECENT_ALERTS_LIMIT = 5
+
+# Safety net: full recomputation interval (seconds) to correct any drift
+OVERVIEW_RECOMPUTE_SECONDS = float(os.getenv("OVERVIEW_RECOMPUTE_SECONDS", "300"))
+
+
+def _naive_utc(value) -> Optional[datetime]:
+    """
+    Normalize DB strings / aware datetimes to naive UTC for comparisons.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class DashboardOverview:
+    """
+    Incrementally maintained counters behind GET /dashboard/overview.
+
+    - LocalStorage calls the on_* hooks after each committed mutation,
+      holding mutation() across the transaction AND its hook so that a
+      recompute() in between cannot count the change twice
+    - overview() builds the response from memory under one lock (O(1))
+    - recompute() rebuilds everything from ONE DB snapshot; it runs on
+      first use, after invalidate(), and every OVERVIEW_RECOMPUTE_SECONDS
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._loaded_at = 0.0
+
+        self._patient_names: Dict[int, str] = {}
+        # assignment_id -> (patient_id, wristband_id), all assignments
+        self._assignments: Dict[int, tuple] = {}
+        self._active_assignments: set = set()
+        self._active_per_patient: Counter = Counter()
+
+        self._open_alerts = 0
+        self._open_critical_per_patient: Counter = Counter()
+
+        # assignment_id -> (measured_at, battery_level)
+        self._latest_battery: Dict[int, tuple] = {}
+        self._low_battery_active: set = set()
+
+        self._recent_alerts: List[Dict] = []
+
+    # ----------------------------
+    # Read side
+    # ----------------------------
+    def overview(self) -> dict:
+        with self._lock:
+            if self._needs_recompute():
+                self.recompute()
+
+            return {
+                "system_overview": {
+                    "active_devices": len(self._active_per_patient),
+                    "patients_monitored": len(self._patient_names),
+                    "active_alerts": self._open_alerts,
+                    "last_update": datetime.now(timezone.utc),
+                },
+                "stats": {
+                    "patients_in_risk": len(self._open_critical_per_patient),
+                    "low_battery_devices": len(self._low_battery_active),
+                },
+                "recent_alerts": [dict(a) for a in self._recent_alerts],
+            }
+
+    def mutation(self) -> threading.RLock:
+        """
+        Lock to hold across a write transaction and its on_* hook.
+        """
+        return self._lock
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded = False
+
+    def _needs_recompute(self) -> bool:
+        if not self._loaded:
+            return True
+        return time.monotonic() - self._loaded_at >= OVERVIEW_RECOMPUTE_SECONDS
+
+    # ----------------------------
+    # Full recomputation (fallback)
+    # ----------------------------
+    def recompute(self) -> None:
+        from storage.local import engine
+
+        with self._lock, engine.begin() as conn:
+            patients = conn.execute(
+                text("SELECT patient_id, name FROM PATIENT")
+            ).fetchall()
+
+            assignments = conn.execute(
+                text("""
+                    SELECT assignment_id, patient_id, wristband_id, end_date
+                    FROM WRISTBAND_ASSIGNMENT
+                """)
+            ).fetchall()
+
+            open_alerts = conn.execute(
+                text("""
+                    SELECT COUNT(*)
+                    FROM ALERT
+                    WHERE status != 'ACKNOWLEDGED'
+                """)
+            ).scalar_one()
+
+            open_critical = conn.execute(
+                text("""
+                    SELECT wa.patient_id, COUNT(*) AS n
+                    FROM ALERT a
+                    JOIN WRISTBAND_ASSIGNMENT wa
+                        ON a.assignment_id = wa.assignment_id
+                    WHERE a.status != 'ACKNOWLEDGED'
+                    AND a.severity = 'CRITICAL'
+                    GROUP BY wa.patient_id
+                """)
+            ).fetchall()
+
+            batteries = conn.execute(
+                text("""
+                    SELECT assignment_id, measured_at, battery_level
+                    FROM LATEST_VITAL
+                """)
+            ).fetchall()
+
+            recent = conn.execute(
+                text("""
+                    SELECT
+                        a.alert_id,
+                        a.assignment_id,
+                        a.severity,
+                        a.alert_type,
+                        a.description,
+                        a.generated_at,
+                        a.status
+                    FROM ALERT a
+                    ORDER BY a.generated_at DESC, a.alert_id DESC
+                    LIMIT :limit
+                """),
+                {"limit": RECENT_ALERTS_LIMIT * 4},
+            ).mappings().all()
+
+            self._patient_names = {int(p.patient_id): p.name for p in patients}
+
+            self._assignments = {}
+            self._active_assignments = set()
+            self._active_per_patient = Counter()
+            for a in assignments:
+                self._assignments[int(a.assignment_id)] = (
+                    int(a.patient_id),
+                    int(a.wristband_id),
+                )
+                if a.end_date is None:
+                    self._active_assignments.add(int(a.assignment_id))
+                    self._active_per_patient[int(a.patient_id)] += 1
+
+            self._open_alerts = int(open_alerts)
+            self._open_critical_per_patient = Counter(
+                {int(r.patient_id): int(r.n) for r in open_critical if r.n}
+            )
+
+            self._latest_battery = {
+                int(b.assignment_id): (_naive_utc(b.measured_at), b.battery_level)
+                for b in batteries
+            }
+            self._low_battery_active = {
+                aid for aid in self._active_assignments
+                if self._is_low(aid)
+            }
+
+            self._recent_alerts = []
+            for r in recent:
+                self._push_recent(dict(r))
+
+            self._loaded = True
+            self._loaded_at = time.monotonic()
+
+    # ----------------------------
+    # Mutation hooks (called after commit, under mutation())
+    # ----------------------------
+    def on_patient_created(self, patient_id: int, name: str) -> None:
+        with self._lock:
+            if self._loaded:
+                self._patient_names[int(patient_id)] = name
+
+    def on_assignment_started(
+        self, assignment_id: int, patient_id: int, wristband_id: int
+    ) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            aid = int(assignment_id)
+            self._assignments[aid] = (int(patient_id), int(wristband_id))
+            if aid not in self._active_assignments:
+                self._active_assignments.add(aid)
+                self._active_per_patient[int(patient_id)] += 1
+            if self._is_low(aid):
+                self._low_battery_active.add(aid)
+
+    def on_assignment_ended(self, assignment_id: int) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            aid = int(assignment_id)
+            if aid not in self._active_assignments:
+                return
+            self._active_assignments.discard(aid)
+            self._low_battery_active.discard(aid)
+            patient_id = self._assignments.get(aid, (None, None))[0]
+            self._decrement(self._active_per_patient, patient_id)
+
+    def on_vitals_saved(self, rows: List[dict]) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            for r in rows:
+                aid = int(r["assignment_id"])
+                measured_at = _naive_utc(r.get("measured_at"))
+                current = self._latest_battery.get(aid)
+                if current and current[0] and measured_at and measured_at < current[0]:
+                    continue
+                self._latest_battery[aid] = (measured_at, r.get("battery_level"))
+
+                if aid in self._active_assignments and self._is_low(aid):
+                    self._low_battery_active.add(aid)
+                else:
+                    self._low_battery_active.discard(aid)
+
+    def on_alert_saved(self, alert: dict) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            if alert.get("status") != "ACKNOWLEDGED":
+                self._open_alerts += 1
+                if alert.get("severity") == "CRITICAL":
+                    patient_id = self._patient_of(alert["assignment_id"])
+                    if patient_id is not None:
+                        self._open_critical_per_patient[patient_id] += 1
+            self._push_recent(alert)
+
+    def on_alert_acknowledged(
+        self,
+        alert_id: int,
+        assignment_id: int,
+        severity: str,
+        previous_status: str,
+    ) -> None:
+        with self._lock:
+            if not self._loaded:
+                return
+            if previous_status != "ACKNOWLEDGED":
+                self._open_alerts = max(0, self._open_alerts - 1)
+                if severity == "CRITICAL":
+                    self._decrement(
+                        self._open_critical_per_patient,
+                        self._patient_of(assignment_id),
+                    )
+            for a in self._recent_alerts:
+                if a["alert_id"] == alert_id:
+                    a["acknowledged"] = True
+
+    # ----------------------------
+    # Helpers
+    # ----------------------------
+    def _patient_of(self, assignment_id) -> Optional[int]:
+        try:
+            return self._assignments.get(int(assignment_id), (None, None))[0]
+        except (TypeError, ValueError):
+            return None
+
+    def _is_low(self, assignment_id: int) -> bool:
+        latest = self._latest_battery.get(assignment_id)
+        return bool(
+            latest
+            and latest[1] is not None
+            and latest[1] < LOW_BATTERY_THRESHOLD
+        )
+
+    @staticmethod
+    def _decrement(counter: Counter, key) -> None:
+        if key is None or key not in counter:
+            return
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    def _push_recent(self, alert: dict) -> None:
+        """
+        Insert an alert into the recent-alerts widget (newest first).
+        Alerts whose assignment/wristband/patient cannot be resolved are
+        skipped, like the INNER JOINs of the original query.
+        """
+        assignment = self._assignments.get(
+            int(alert["assignment_id"]) if alert.get("assignment_id") is not None else -1
+        )
+        if assignment is None:
+            return
+        patient_id, wristband_id = assignment
+        if patient_id not in self._patient_names:
+            return
+
+        item = {
+            "alert_id": alert["alert_id"],
+            "severity": alert["severity"],
+            "alert_type": alert["alert_type"],
+            "description": alert.get("description") or "",
+            "device_id": f"WB-{wristband_id}",
+            "generated_at": _naive_utc(alert.get("generated_at")),
+            "acknowledged": alert.get("status") == "ACKNOWLEDGED",
+            "patient_name": self._patient_names[patient_id],
+        }
+
+        items = [a for a in self._recent_alerts if a["alert_id"] != item["alert_id"]]
+        items.append(item)
+        items.sort(
+            key=lambda a: (a["generated_at"] or datetime.min, a["alert_id"]),
+            reverse=True,
+        )
+        self._recent_alerts = items[:RECENT_ALERTS_LIMIT]
+
+
+# Singleton instance
+dashboard_overview = DashboardOverview()
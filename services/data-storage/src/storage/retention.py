@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, text
+
+import metrics
+from storage.downsampling import VITAL_METRICS, to_epoch
+from storage.rollups import get_watermark
+
+
+# Raw VITAL_MEASUREMENT rows older than this are archived (0 = keep forever)
+RAW_RETENTION_DAYS = int(os.getenv("RAW_RETENTION_DAYS", "30"))
+
+# Default: "archive/" next to the SQLite file
+ARCHIVE_DIR = os.getenv(
+    "ARCHIVE_DIR",
+    os.path.join(os.path.dirname(os.getenv("DB_PATH", "/app/data/health.db")), "archive"),
+)
+
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+RETENTION_CHUNK_SIZE = int(os.getenv("RETENTION_CHUNK_SIZE", "2000"))
+
+# Pause between delete chunks so the MQTT writer can grab the write lock
+RETENTION_CHUNK_PAUSE_SECONDS = 0.05
+
+ARCHIVE_COLUMNS = ("measurement_id", "assignment_id", "measured_at") + VITAL_METRICS
+
+
+class VitalArchive:
+    """
+    Archive of raw vital measurements, one file per day per assignment.
+
+    <ARCHIVE_DIR>/vitals-YYYY-MM-DD/assignment-<assignment_id>.json.gz
+        {"version": 2, "day": "...", "assignment_id": N,
+         "columns": {name: [values...]}}   (rows ordered by measured_at)
+
+    - Columnar + gzip: repeated keys are stored once, values compress well
+    - A history query only opens the files of its assignments and days
+    - A file is written in one pass (tmp file + os.replace); rows reaching
+      an already archived day later are merged into it
+    - Rows are de-duplicated by measurement_id, so re-archiving is safe
+    - Files are parsed outside the lock, which only guards the cache
+    """
+
+    CACHE_SIZE = 32
+
+    def __init__(self, directory: str = ARCHIVE_DIR) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        # path -> (mtime, columns)
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def day_dir(self, day: date) -> str:
+        return os.path.join(self.directory, f"vitals-{day.isoformat()}")
+
+    def path_for(self, day: date, assignment_id: int) -> str:
+        return os.path.join(self.day_dir(day), f"assignment-{int(assignment_id)}.json.gz")
+
+    def days(self) -> List[date]:
+        if not os.path.isdir(self.directory):
+            return []
+        result = []
+        for name in os.listdir(self.directory):
+            if name.startswith("vitals-") and os.path.isdir(os.path.join(self.directory, name)):
+                try:
+                    result.append(date.fromisoformat(name[len("vitals-"):]))
+                except ValueError:
+                    continue
+        return sorted(result)
+
+    # ----------------------------
+    # Write side
+    # ----------------------------
+    def write(self, day: date, assignment_id: int, rows: List[Dict]) -> int:
+        """
+        Store the rows of one assignment-day, merged with what the file
+        already holds. Returns the file's row count.
+        """
+        path = self.path_for(day, assignment_id)
+        merged: Dict[int, Dict] = {
+            int(row["measurement_id"]): row for row in self._iter_rows(self._load(path))
+        }
+        for row in rows:
+            merged[int(row["measurement_id"])] = row
+
+        ordered = sorted(
+            merged.values(), key=lambda r: (str(r["measured_at"]), int(r["measurement_id"]))
+        )
+        payload = {
+            "version": 2,
+            "day": day.isoformat(),
+            "assignment_id": int(assignment_id),
+            "columns": {
+                c: [str(r[c]) if c == "measured_at" else r.get(c) for r in ordered]
+                for c in ARCHIVE_COLUMNS
+            },
+        }
+
+        os.makedirs(self.day_dir(day), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._cache.pop(path, None)
+        return len(ordered)
+
+    # ----------------------------
+    # Read side
+    # ----------------------------
+    def read_rows(self, assignment_ids: Iterable[int], start: datetime, end: datetime) -> List[Dict]:
+        """
+        Archived rows of the given assignments in [start, end) (naive UTC),
+        with the same keys as VITAL_MEASUREMENT plus "epoch".
+        """
+        wanted = sorted({int(a) for a in assignment_ids})
+        if not wanted or not os.path.isdir(self.directory):
+            return []
+
+        start_epoch, end_epoch = to_epoch(start), to_epoch(end)
+
+        rows = []
+        day = start.date()
+        while day <= end.date():
+            if os.path.isdir(self.day_dir(day)):
+                for assignment_id in wanted:
+                    columns = self._load(self.path_for(day, assignment_id))
+                    for row in self._iter_rows(columns):
+                        epoch = to_epoch(row["measured_at"])
+                        if start_epoch <= epoch < end_epoch:
+                            row["epoch"] = epoch
+                            rows.append(row)
+            day += timedelta(days=1)
+        return rows
+
+    def _load(self, path: str) -> Optional[Dict[str, list]]:
+        """
+        Parsed columns of one file (small LRU keyed by mtime).
+        """
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == mtime:
+                self._cache.move_to_end(path)
+                return cached[1]
+
+        # Decompress without holding the lock (other days / readers go on)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            columns = json.load(f)["columns"]
+
+        with self._lock:
+            self._cache[path] = (mtime, columns)
+            while len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return columns
+
+    @staticmethod
+    def _iter_rows(columns: Optional[Dict[str, list]]):
+        if not columns:
+            return
+        names = [c for c in ARCHIVE_COLUMNS if c in columns]
+        for values in zip(*(columns[c] for c in names)):
+            yield dict(zip(names, values))
+
+
+class RetentionManager:
+    """
+    Moves raw vitals older than RAW_RETENTION_DAYS out of VITAL_MEASUREMENT.
+
+    - Only rows already folded into the rollups (id <= rollup watermark)
+      are archived, so bucketed history keeps answering from the rollups
+    - Works one assignment-day at a time: its rows are archived in one
+      file, then deleted in short transactions of chunk_size rows; a
+      crash in between only leaves rows that the next run re-archives
+      (de-duplicated) and deletes
+    """
+
+    def __init__(
+        self,
+        archive: VitalArchive,
+        retention_days: int = RAW_RETENTION_DAYS,
+        interval_seconds: float = RETENTION_INTERVAL_SECONDS,
+        chunk_size: int = RETENTION_CHUNK_SIZE,
+    ) -> None:
+        self.archive = archive
+        self.retention_days = retention_days
+        self.interval_seconds = interval_seconds
+        self.chunk_size = chunk_size
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._rows_archived = 0
+        self._runs = 0
+        self._last_run_ms = 0.0
+        self._last_cutoff: Optional[str] = None
+        self._last_error: Optional[str] = None
+
+        metrics.register("retention", self.stats)
+
+    @property
+    def enabled(self) -> bool:
+        return self.retention_days > 0
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    def start_in_background(self) -> None:
+        if not self.enabled:
+            print("[RETENTION] disabled (RAW_RETENTION_DAYS=0)")
+            return
+        self._thread = threading.Thread(
+            target=self._run,
+            name="vital-retention",
+            daemon=True,
+        )
+        self._thread.start()
+        print(
+            f"[RETENTION] keeping {self.retention_days} days of raw vitals, "
+            f"archive={self.archive.directory}"
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"[RETENTION] run failed: {e}")
+            self._stop.wait(self.interval_seconds)
+
+    # ----------------------------
+    # Archival
+    # ----------------------------
+    def cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """
+        Start of the oldest UTC day kept in the hot table (naive UTC).
+        """
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        day = (now - timedelta(days=self.retention_days)).date()
+        return datetime(day.year, day.month, day.day)
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Archive + delete expired rows. Returns the number of rows moved.
+        """
+        if not self.enabled:
+            return 0
+
+        started = time.perf_counter()
+        cutoff = self.cutoff(now)
+        self._last_cutoff = cutoff.isoformat()
+
+        total = 0
+        while not self._stop.is_set():
+            moved = self._archive_next(cutoff)
+            if not moved:
+                break
+            total += moved
+            time.sleep(RETENTION_CHUNK_PAUSE_SECONDS)
+
+        self._runs += 1
+        self._last_run_ms = (time.perf_counter() - started) * 1000.0
+        if total:
+            print(
+                f"[RETENTION] archived {total} rows older than {cutoff.date()} "
+                f"in {self._last_run_ms:.1f} ms"
+            )
+        return total
+
+    def _archive_next(self, cutoff: datetime) -> int:
+        """
+        Archive + delete the expired rows of one assignment-day.
+        Returns the number of rows moved (0 when nothing is left).
+        """
+        from storage.local import engine
+
+        with engine.connect() as conn:
+            watermark = get_watermark(conn)
+            oldest = conn.execute(
+                text("""
+                    SELECT assignment_id, measured_at
+                    FROM VITAL_MEASUREMENT
+                    WHERE measured_at < :cutoff
+                    AND measurement_id <= :watermark
+                    ORDER BY measurement_id
+                    LIMIT 1
+                """),
+                {"cutoff": _db_timestamp(cutoff), "watermark": watermark},
+            ).first()
+            if oldest is None:
+                return 0
+
+            assignment_id = int(oldest.assignment_id)
+            day = datetime.fromisoformat(str(oldest.measured_at)).date()
+            day_start = datetime(day.year, day.month, day.day)
+            day_end = min(day_start + timedelta(days=1), cutoff)
+
+            # idx_vital_assignment_time
+            rows = conn.execute(
+                text(f"""
+                    SELECT {", ".join(ARCHIVE_COLUMNS)}
+                    FROM VITAL_MEASUREMENT
+                    WHERE assignment_id = :assignment_id
+                    AND measured_at >= :start
+                    AND measured_at < :end
+                    AND measurement_id <= :watermark
+                """),
+                {
+                    "assignment_id": assignment_id,
+                    "start": _db_timestamp(day_start),
+                    "end": _db_timestamp(day_end),
+                    "watermark": watermark,
+                },
+            ).mappings().all()
+
+        # 1) archive (durable, idempotent)
+        self.archive.write(day, assignment_id, [dict(r) for r in rows])
+
+        # 2) delete in short write transactions
+        ids = [int(r["measurement_id"]) for r in rows]
+        for i in range(0, len(ids), self.chunk_size):
+            if i:
+                time.sleep(RETENTION_CHUNK_PAUSE_SECONDS)
+            with engine.begin() as conn:
+                conn.execute(
+                    text("DELETE FROM VITAL_MEASUREMENT WHERE measurement_id IN :ids")
+                    .bindparams(bindparam("ids", expanding=True)),
+                    {"ids": ids[i:i + self.chunk_size]},
+                )
+
+        self._rows_archived += len(ids)
+        return len(ids)
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def stats(self) -> Dict:
+        return {
+            "retention_days": self.retention_days,
+            "archive_dir": self.archive.directory,
+            "archive_days": len(self.archive.days()),
+            "rows_archived": self._rows_archived,
+            "runs": self._runs,
+            "last_cutoff": self._last_cutoff,
+            "last_run_ms": round(self._last_run_ms, 3),
+            "last_error": self._last_error,
+        }
+
+
+def _db_timestamp(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+# Singleton instances
+vital_archive = VitalArchive()
+retention_manager = RetentionManager(vital_archive)
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+
+import metrics
+from storage.downsampling import VITAL_METRICS, BucketAccumulator, to_epoch
+
+
+ROLLUP_INTERVAL_SECONDS = float(os.getenv("ROLLUP_INTERVAL_SECONDS", "30"))
+ROLLUP_CHUNK_SIZE = int(os.getenv("ROLLUP_CHUNK_SIZE", "5000"))
+
+# Rollup tables, coarsest first: (bucket seconds, table name)
+ROLLUP_TABLES: Tuple[Tuple[int, str], ...] = (
+    (3600, "VITAL_ROLLUP_1H"),
+    (60, "VITAL_ROLLUP_1M"),
+)
+
+STATE_NAME = "vitals"
+
+
+def rollup_table_for(bucket_seconds: int) -> Optional[Tuple[int, str]]:
+    """
+    Coarsest rollup table whose granularity divides the requested bucket,
+    or None when only raw rows can answer it.
+    """
+    for granularity, table in ROLLUP_TABLES:
+        if bucket_seconds % granularity == 0:
+            return granularity, table
+    return None
+
+
+def _upsert_sql(table: str) -> str:
+    columns = ["assignment_id", "bucket_start", "sample_count", "last_at"]
+    updates = [
+        "sample_count = sample_count + excluded.sample_count",
+        "last_at = CASE WHEN last_at IS NULL OR excluded.last_at >= last_at "
+        "THEN excluded.last_at ELSE last_at END",
+    ]
+    for m in VITAL_METRICS:
+        columns += [f"{m}_n", f"{m}_min", f"{m}_max", f"{m}_sum", f"{m}_last"]
+        updates += [
+            f"{m}_n = {m}_n + excluded.{m}_n",
+            f"{m}_min = COALESCE(MIN({m}_min, excluded.{m}_min), {m}_min, excluded.{m}_min)",
+            f"{m}_max = COALESCE(MAX({m}_max, excluded.{m}_max), {m}_max, excluded.{m}_max)",
+            f"{m}_sum = COALESCE({m}_sum, 0) + COALESCE(excluded.{m}_sum, 0)",
+            f"{m}_last = CASE WHEN last_at IS NULL OR excluded.last_at >= last_at "
+            f"THEN excluded.{m}_last ELSE {m}_last END",
+        ]
+
+    # NOTE: SET expressions are evaluated against the pre-update row, so
+    # last_at in the CASE expressions still refers to the stored value.
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join(':' + c for c in columns)}) "
+        f"ON CONFLICT(assignment_id, bucket_start) DO UPDATE SET "
+        + ", ".join(updates)
+    )
+
+
+class RollupCompactor:
+    """
+    Background job folding new VITAL_MEASUREMENT rows into the 1-minute
+    and 1-hour rollup tables.
+
+    - Progress is tracked by a measurement_id watermark (ROLLUP_STATE),
+      so late-arriving samples are still picked up
+    - Each chunk (rows + both rollups + watermark) is one transaction
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = ROLLUP_INTERVAL_SECONDS,
+        chunk_size: int = ROLLUP_CHUNK_SIZE,
+    ) -> None:
+        self.interval_seconds = interval_seconds
+        self.chunk_size = chunk_size
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._watermark = 0
+        self._rows_compacted = 0
+        self._runs = 0
+        self._last_run_ms = 0.0
+        self._last_error: Optional[str] = None
+
+        metrics.register("rollups", self.stats)
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    def start_in_background(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run,
+            name="rollup-compactor",
+            daemon=True,
+        )
+        self._thread.start()
+        print("[ROLLUP] background compactor started")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"[ROLLUP] compaction failed: {e}")
+            self._stop.wait(self.interval_seconds)
+
+    # ----------------------------
+    # Compaction
+    # ----------------------------
+    def run_once(self) -> int:
+        """
+        Compact until caught up. Returns the number of raw rows folded.
+        """
+        started = time.perf_counter()
+        total = 0
+        while not self._stop.is_set():
+            done = self._compact_chunk()
+            total += done
+            if done < self.chunk_size:
+                break
+
+        self._runs += 1
+        self._last_run_ms = (time.perf_counter() - started) * 1000.0
+        if total:
+            print(f"[ROLLUP] compacted {total} rows in {self._last_run_ms:.1f} ms")
+        return total
+
+    def _compact_chunk(self) -> int:
+        from storage.local import engine
+
+        with engine.begin() as conn:
+            watermark = get_watermark(conn)
+
+            rows = conn.execute(
+                text(f"""
+                    SELECT measurement_id, assignment_id, measured_at,
+                           {", ".join(VITAL_METRICS)}
+                    FROM VITAL_MEASUREMENT
+                    WHERE measurement_id > :watermark
+                    ORDER BY measurement_id
+                    LIMIT :limit
+                """),
+                {"watermark": watermark, "limit": self.chunk_size},
+            ).mappings().all()
+
+            if not rows:
+                self._watermark = watermark
+                return 0
+
+            for granularity, table in ROLLUP_TABLES:
+                partials = self._aggregate(rows, granularity)
+                conn.execute(text(_upsert_sql(table)), partials)
+
+            new_watermark = int(rows[-1]["measurement_id"])
+            conn.execute(
+                text("""
+                    INSERT INTO ROLLUP_STATE (name, last_measurement_id, updated_at)
+                    VALUES (:name, :wm, CURRENT_TIMESTAMP)
+                    ON CONFLICT(name) DO UPDATE SET
+                        last_measurement_id = excluded.last_measurement_id,
+                        updated_at = excluded.updated_at
+                """),
+                {"name": STATE_NAME, "wm": new_watermark},
+            )
+
+        self._watermark = new_watermark
+        self._rows_compacted += len(rows)
+        return len(rows)
+
+    @staticmethod
+    def _aggregate(rows, granularity: int) -> List[Dict]:
+        buckets: Dict[Tuple[int, int], Dict] = {}
+
+        for r in rows:
+            epoch = to_epoch(r["measured_at"])
+            key = (int(r["assignment_id"]), int(epoch // granularity) * granularity)
+            b = buckets.get(key)
+            if b is None:
+                b = {
+                    "assignment_id": key[0],
+                    "bucket_start": key[1],
+                    "sample_count": 0,
+                    "last_at": None,
+                    "_last_epoch": None,
+                }
+                for m in VITAL_METRICS:
+                    b.update({
+                        f"{m}_n": 0, f"{m}_min": None, f"{m}_max": None,
+                        f"{m}_sum": None, f"{m}_last": None,
+                    })
+                buckets[key] = b
+
+            b["sample_count"] += 1
+            newest = b["_last_epoch"] is None or epoch >= b["_last_epoch"]
+            if newest:
+                b["_last_epoch"] = epoch
+                b["last_at"] = r["measured_at"]
+
+            for m in VITAL_METRICS:
+                value = r[m]
+                if newest:
+                    b[f"{m}_last"] = value
+                if value is None:
+                    continue
+                b[f"{m}_n"] += 1
+                b[f"{m}_min"] = value if b[f"{m}_min"] is None else min(b[f"{m}_min"], value)
+                b[f"{m}_max"] = value if b[f"{m}_max"] is None else max(b[f"{m}_max"], value)
+                b[f"{m}_sum"] = value + (b[f"{m}_sum"] or 0)
+
+        for b in buckets.values():
+            b.pop("_last_epoch")
+        return list(buckets.values())
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def stats(self) -> Dict:
+        return {
+            "watermark": self._watermark,
+            "rows_compacted": self._rows_compacted,
+            "runs": self._runs,
+            "last_run_ms": round(self._last_run_ms, 3),
+            "last_error": self._last_error,
+            "interval_seconds": self.interval_seconds,
+        }
+
+
+# ----------------------------
+# Read helpers (used by LocalStorage history queries)
+# ----------------------------
+def get_watermark(conn) -> int:
+    value = conn.execute(
+        text("SELECT last_measurement_id FROM ROLLUP_STATE WHERE name = :name"),
+        {"name": STATE_NAME},
+    ).scalar()
+    return int(value or 0)
+
+
+def aggregate_rollup(
+    conn,
+    acc: BucketAccumulator,
+    table: str,
+    assignment_ids,
+    start_epoch: int,
+    end_epoch: int,
+) -> None:
+    """
+    Re-bucket rollup rows into acc.bucket_seconds and merge them.
+    """
+    columns = ",\n".join(
+        f"MIN({m}_min) AS {m}_min, MAX({m}_max) AS {m}_max, "
+        f"SUM({m}_sum) AS {m}_sum, SUM({m}_n) AS {m}_n"
+        for m in VITAL_METRICS
+    )
+    stmt = text(f"""
+        SELECT
+            (bucket_start / :bucket) * :bucket AS bucket_epoch,
+            SUM(sample_count) AS n,
+            {columns}
+        FROM {table}
+        WHERE assignment_id IN :assignment_ids
+        AND bucket_start >= :start_epoch
+        AND bucket_start < :end_epoch
+        GROUP BY bucket_epoch
+    """).bindparams(bindparam("assignment_ids", expanding=True))
+
+    rows = conn.execute(
+        stmt,
+        {
+            "bucket": acc.bucket_seconds,
+            "assignment_ids": list(assignment_ids),
+            "start_epoch": start_epoch,
+            "end_epoch": end_epoch,
+        },
+    ).mappings().all()
+
+    for r in rows:
+        acc.merge(
+            r["bucket_epoch"],
+            r["n"],
+            {
+                m: (r[f"{m}_min"], r[f"{m}_max"], r[f"{m}_sum"], r[f"{m}_n"])
+                for m in VITAL_METRICS
+            },
+        )
+
+
+# Singleton instance
+rollup_compactor = RollupCompactor()
@@ -1,8 +1,17 @@
-import json
+import os
+import signal
+import threading
+import time
 import requests
 import paho.mqtt.client as mqtt
 from datetime import datetime
 
+from threshold_engine import ThresholdEngine
+from worker_pool import ShardedWorkerPool
+from profile_cache import ProfileCache
+from window_state import WindowStore
+from shared.codec import ASSIGNMENT_CHANGE, VITALS, CodecError, decode, dumps
+
 # ----------------------------------
 # Health Catalog
 # ----------------------------------
@@ -17,6 +26,26 @@ ENVIRONMENTS_ENDPOINT = "/config/environments"
 # ----------------------------------
 DATA_STORAGE_BASE = "http://data-storage:8003"
 ASSIGNMENT_ENDPOINT = "/api/v1/assignments/by-wristband/{}"
+ASSIGNMENT_PROFILES_ENDPOINT = "/api/v1/assignments/profiles"
+
+# Profile cache: assignment change events usually invalidate first,
+# the TTL is the safety net. Unassigned wristbands are cached shorter.
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+PROFILE_CACHE_NEGATIVE_TTL_SECONDS = float(
+    os.getenv("PROFILE_CACHE_NEGATIVE_TTL_SECONDS", "30")
+)
+
+# ----------------------------------
+# Processing workers
+# ----------------------------------
+RISK_WORKERS = int(os.getenv("RISK_WORKERS", "4"))
+RISK_BATCH_SIZE = int(os.getenv("RISK_BATCH_SIZE", "200"))
+RISK_QUEUE_SIZE = int(os.getenv("RISK_QUEUE_SIZE", "10000"))  # per worker
+RISK_STATS_INTERVAL_SECONDS = float(os.getenv("RISK_STATS_INTERVAL_SECONDS", "30"))
+
+# Windowed rules keep state per wristband; bound how many are tracked
+WINDOW_MAX_WRISTBANDS = int(os.getenv("WINDOW_MAX_WRISTBANDS", "10000"))
+WINDOW_IDLE_SECONDS = float(os.getenv("WINDOW_IDLE_SECONDS", "3600"))
 
 # ----------------------------------
 # Global configs (loaded at startup)
@@ -24,9 +53,11 @@ ASSIGNMENT_ENDPOINT = "/api/v1/assignments/by-wristband/{}"
 THRESHOLDS = {}
 MQTT_TOPICS = {}
 ENV_CONFIG = {}
+ENGINE = None  # ThresholdEngine compiled from THRESHOLDS
+POOL = None    # ShardedWorkerPool (receive -> process)
+WINDOWS = None  # WindowStore built from THRESHOLDS["window_rules"]
 
 DEFAULT_PROFILE = "STANDARD"
-PROFILE_CACHE = {}  # wristband_id -> threshold_profile
 
 
 # ----------------------------------
@@ -45,29 +76,52 @@ def resolve_severity(value, ranges):
             return level
     return "NORMAL"
 
-def get_profile_for_wristband(wristband_id: int) -> str:
+def fetch_profile(wristband_id: int):
     """
-    Resolve patient threshold profile via Data Storage.
-    Cached per wristband.
+    Threshold profile of the active assignment, None if there is none.
     """
-    if wristband_id in PROFILE_CACHE:
-        return PROFILE_CACHE[wristband_id]
+    resp = requests.get(
+        DATA_STORAGE_BASE + ASSIGNMENT_ENDPOINT.format(wristband_id),
+        timeout=1.5
+    )
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+    return resp.json().get("threshold_profile") or DEFAULT_PROFILE
+
+
+def fetch_all_profiles() -> tuple:
+    resp = requests.get(DATA_STORAGE_BASE + ASSIGNMENT_PROFILES_ENDPOINT, timeout=5)
+    resp.raise_for_status()
+    body = resp.json()
+    return body.get("version", 0), {
+        item["wristband_id"]: item["threshold_profile"]
+        for item in body["items"]
+    }
 
-    try:
-        resp = requests.get(
-            DATA_STORAGE_BASE + ASSIGNMENT_ENDPOINT.format(wristband_id),
-            timeout=1.5
-        )
-        if resp.status_code != 200:
-            raise RuntimeError("assignment not found")
 
-        profile = resp.json().get("threshold_profile", DEFAULT_PROFILE)
-        PROFILE_CACHE[wristband_id] = profile
-        return profile
+PROFILE_CACHE = ProfileCache(
+    fetch_one=fetch_profile,
+    fetch_all=fetch_all_profiles,
+    default_profile=DEFAULT_PROFILE,
+    ttl_seconds=PROFILE_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=PROFILE_CACHE_NEGATIVE_TTL_SECONDS,
+)
+
+
+def get_profile_for_wristband(wristband_id: int) -> str:
+    """
+    Resolve patient threshold profile via Data Storage (cached).
+    """
+    return PROFILE_CACHE.get(wristband_id)
+
 
+def preload_profiles():
+    try:
+        PROFILE_CACHE.preload()
     except Exception as e:
-        print(f"[RISK] profile lookup failed for wristband {wristband_id}: {e}")
-        return DEFAULT_PROFILE
+        # Lookups fall back to one request per wristband
+        print(f"[RISK] profile preload failed: {e}")
 
 
 # ----------------------------------
@@ -81,63 +135,111 @@ def on_connect(client, userdata, flags, rc):
 
     print(f"[RISK] Subscribed to {vitals_topic}")
 
+    changes_topic = assignment_changes_pattern()
+    client.subscribe(changes_topic, qos=1)
+
+    print(f"[RISK] Subscribed to {changes_topic}")
+
+
+def assignment_changes_pattern() -> str:
+    return (
+        MQTT_TOPICS["mqtt_topics"].get("assignment_changes", {}).get("subscribe_pattern")
+        or "health/assignments/+"
+    )
+
 
 def on_message(client, userdata, msg):
-    print(f"[RISK] Message received on {msg.topic}")
+    """
+    Receive stage (paho network thread): enqueue only.
+    The topic carries the wristband id, so it is the ordering key.
+    """
+    if mqtt.topic_matches_sub(assignment_changes_pattern(), msg.topic):
+        on_assignment_change(msg)
+        return
+
+    POOL.submit(msg.topic, (msg.topic, msg.payload))
 
+
+def on_assignment_change(msg):
     try:
-        payload = json.loads(msg.payload.decode())
-    except json.JSONDecodeError:
-        print("[RISK] Invalid JSON payload")
+        event = decode(msg.payload, ASSIGNMENT_CHANGE)
+    except CodecError as e:
+        print(f"[RISK] Invalid assignment change payload: {e}")
         return
 
-    wristband_id = payload.get("wristband_id")
-    if wristband_id is None:
-        print("[RISK] wristband_id missing")
+    print(f"[RISK] Assignment changed → {event}")
+
+    if event.get("wristband_id") is None:
+        # Whole index reloaded in Data Storage: fetch a new snapshot
+        threading.Thread(target=preload_profiles, daemon=True).start()
         return
 
-    # 1️⃣ Resolve patient profile
-    profile = get_profile_for_wristband(int(wristband_id))
-    profile_thresholds = THRESHOLDS["profiles"].get(profile)
+    PROFILE_CACHE.apply_change(event)
 
-    if not profile_thresholds:
-        print(f"[RISK] Unknown profile {profile}")
-        return
 
-    highest_severity = "NORMAL"
-    breached_metric = None
-    breached_value = None
+def handle_messages(client, messages: list):
+    """
+    Processing stage (worker thread): decode a micro-batch and evaluate it.
+    """
+    payloads = []
+    for topic, raw in messages:
+        print(f"[RISK] Message received on {topic}")
+
+        try:
+            payloads.append(decode(raw, VITALS))
+        except CodecError as e:
+            print(f"[RISK] Invalid vitals payload: {e}")
 
-    # 2️⃣ Evaluate all vitals
-    for metric, value in payload.items():
-        if metric not in profile_thresholds or value is None:
+    if payloads:
+        process_vitals(client, payloads)
+
+
+def process_vitals(client, payloads: list):
+    """
+    Evaluate a micro-batch of vital payloads and publish risk events.
+    """
+    # 1️⃣ Resolve patient profiles
+    profiles = [
+        get_profile_for_wristband(int(p["wristband_id"])) for p in payloads
+    ]
+
+    # 2️⃣ Evaluate all vitals (one vectorized pass)
+    results, levels = ENGINE.evaluate(payloads, profiles, return_levels=True)
+
+    # Engine columns needed by the windowed (persistence) rules
+    level_columns = [
+        (metric, ENGINE.metric_index[metric])
+        for metric in WINDOWS.metrics if metric in ENGINE.metric_index
+    ]
+
+    for i, (payload, profile, result) in enumerate(zip(payloads, profiles, results)):
+        if result is None:
+            print(f"[RISK] Unknown profile {profile}")
             continue
 
-        severity = resolve_severity(value, profile_thresholds[metric])
+        # 3️⃣ Windowed rules (trends, persistence, anomalies)
+        findings = WINDOWS.update(
+            payload, {metric: int(levels[i, col]) for metric, col in level_columns}
+        )
+        for finding in findings:
+            publish_window_event(client, payload["wristband_id"], profile, finding)
 
-        if severity == "CRITICAL":
-            highest_severity = "CRITICAL"
-            breached_metric = metric
-            breached_value = value
-            break
+        if result.severity == "NORMAL":
+            print("[RISK] All vitals normal")
+            continue
 
-        if severity == "WARNING" and highest_severity != "CRITICAL":
-            highest_severity = "WARNING"
-            breached_metric = metric
-            breached_value = value
+        publish_risk_event(client, payload["wristband_id"], profile, result)
 
-    if highest_severity == "NORMAL":
-        print("[RISK] All vitals normal")
-        return
 
-    # 3️⃣ Build risk event (intermediate)
+def publish_risk_event(client, wristband_id, profile: str, result):
+    # 4️⃣ Build risk event (intermediate)
     risk_event = {
         "wristband_id": wristband_id,
         "alert_type": "THRESHOLD_BREACH",
-        "severity": highest_severity,
+        "severity": result.severity,
         "threshold_profile": profile,
-        "vital": breached_metric,
-        "value": breached_value,
+        "vital": result.metric,
+        "value": result.value,
         "generated_at": datetime.utcnow().isoformat()
     }
 
@@ -145,15 +247,55 @@ def on_message(client, userdata, msg):
         wristband_id=wristband_id
     )
 
-    client.publish(topic, json.dumps(risk_event), qos=1)
+    client.publish(topic, dumps(risk_event), qos=1)
     print(f"[RISK] Risk event published → {risk_event}")
 
 
+def publish_window_event(client, wristband_id, profile: str, finding: dict):
+    risk_event = {
+        "wristband_id": wristband_id,
+        "alert_type": finding["alert_type"],
+        "severity": finding["severity"],
+        "threshold_profile": profile,
+        "vital": finding["metric"],
+        "value": finding["value"],
+        "rule": finding["rule"],
+        "reason": finding["detail"]["reason"],
+        "detail": finding["detail"],
+        "generated_at": datetime.utcnow().isoformat()
+    }
+
+    topic = MQTT_TOPICS["mqtt_topics"]["risk_events"]["template"].format(
+        wristband_id=wristband_id
+    )
+
+    client.publish(topic, dumps(risk_event), qos=1)
+    print(f"[RISK] Window risk event published → {risk_event}")
+
+
+def raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def log_stats_forever():
+    while True:
+        time.sleep(RISK_STATS_INTERVAL_SECONDS)
+        stats = POOL.stats(per_worker=False)
+        print(
+            f"[RISK] queue_depth={stats['queue_depth']} "
+            f"(max/worker={stats['max_queue_depth']}) "
+            f"processed={stats['processed']} dropped={stats['dropped']} "
+            f"latency avg={stats['avg_latency_ms']}ms max={stats['max_latency_ms']}ms"
+        )
+        print(f"[RISK] profile cache {PROFILE_CACHE.stats()}")
+        print(f"[RISK] window store {WINDOWS.stats()}")
+
+
 # ----------------------------------
 # Main
 # ----------------------------------
 def main():
-    global THRESHOLDS, MQTT_TOPICS, ENV_CONFIG
+    global THRESHOLDS, MQTT_TOPICS, ENV_CONFIG, ENGINE, POOL, WINDOWS
 
     print("[RISK] Starting Risk Analysis Service")
 
@@ -162,6 +304,18 @@ def main():
     MQTT_TOPICS = load_from_catalog(MQTT_TOPICS_ENDPOINT)
     ENV_CONFIG = load_from_catalog(ENVIRONMENTS_ENDPOINT)
 
+    ENGINE = ThresholdEngine(THRESHOLDS["profiles"])
+    print(f"[RISK] Compiled {len(ENGINE.profile_names)} threshold profiles")
+
+    WINDOWS = WindowStore(
+        THRESHOLDS.get("window_rules"),
+        max_wristbands=WINDOW_MAX_WRISTBANDS,
+        idle_seconds=WINDOW_IDLE_SECONDS,
+    )
+    print(f"[RISK] {len(WINDOWS.rules)} window rules loaded")
+
+    preload_profiles()
+
     active_env = ENV_CONFIG["active_environment"]
     mqtt_conf = ENV_CONFIG["environments"][active_env]["mqtt"]
 
@@ -170,10 +324,35 @@ def main():
     client.on_connect = on_connect
     client.on_message = on_message
 
+    POOL = ShardedWorkerPool(
+        "vitals",
+        lambda messages: handle_messages(client, messages),
+        workers=RISK_WORKERS,
+        batch_size=RISK_BATCH_SIZE,
+        max_pending=RISK_QUEUE_SIZE,
+    )
+    POOL.start()
+    print(f"[RISK] {RISK_WORKERS} workers started (batch={RISK_BATCH_SIZE})")
+
+    threading.Thread(target=log_stats_forever, name="risk-stats", daemon=True).start()
+
+    # docker stop -> leave loop_forever and drain the workers
+    signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+
     print(f"[RISK] Connecting to MQTT {mqtt_conf['host']}:{mqtt_conf['port']}")
     client.connect(mqtt_conf["host"], mqtt_conf["port"])
 
-    client.loop_forever()
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        print("[RISK] Shutting down")
+    finally:
+        # Keep the network loop running while queued risk events are published
+        client.unsubscribe(MQTT_TOPICS["mqtt_topics"]["vitals"]["subscribe_pattern"])
+        client.loop_start()
+        POOL.close()
+        client.disconnect()
+        client.loop_stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,187 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+# Sentinel stored for wristbands without an active assignment
+_MISSING = object()
+
+
+class ProfileCache:
+    """
+    wristband_id -> threshold_profile, backed by Data Storage.
+
+    - preload() fills it from the bulk snapshot endpoint
+    - Snapshot and change events carry Data Storage's assignment version;
+      a snapshot entry older than the last change applied to that
+      wristband (event received while the snapshot was in flight) is skipped
+    - Entries expire after ttl_seconds and are then fetched one by one
+    - Misses (no active assignment) are cached for negative_ttl_seconds
+    - apply_change() applies assignment change events right away
+    - If a refresh fails, the expired profile is kept (or the default used)
+    """
+
+    def __init__(
+        self,
+        fetch_one: Callable[[int], Optional[str]],
+        fetch_all: Callable[[], Dict[int, Optional[str]]],
+        default_profile: str,
+        ttl_seconds: float = 300.0,
+        negative_ttl_seconds: float = 30.0,
+    ) -> None:
+        """
+        fetch_one(wristband_id) -> profile, or None if not assigned
+            (raises on transport errors)
+        fetch_all() -> (version, {wristband_id: profile}) of all active
+            assignments
+        """
+        self.fetch_one = fetch_one
+        self.fetch_all = fetch_all
+        self.default_profile = default_profile
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+
+        # wristband_id -> (expires_at, profile or _MISSING)
+        self._entries: Dict[int, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+        # wristband_id -> version of the last change event applied
+        self._versions: Dict[int, int] = {}
+        self._snapshot_version = 0
+
+        # Counters
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._failures = 0
+        self._invalidations = 0
+        self._preloads = 0
+        self._stale_skipped = 0
+
+    # ----------------------------
+    # Bulk load
+    # ----------------------------
+    def preload(self) -> int:
+        """
+        Replace the cache with the bulk snapshot, keeping the change events
+        newer than it. Returns the entry count.
+        """
+        version, profiles = self.fetch_all()
+        version = int(version or 0)
+        now = time.monotonic()
+        entries = {
+            int(wid): (now + self.ttl_seconds, profile or self.default_profile)
+            for wid, profile in profiles.items()
+        }
+
+        with self._lock:
+            if version < self._snapshot_version:
+                # Data Storage restarted: its version counter started over
+                self._versions.clear()
+
+            # Changes applied while the snapshot was in flight win
+            newer = {wid: v for wid, v in self._versions.items() if v > version}
+            for wid in newer:
+                entries.pop(wid, None)
+                if wid in self._entries:
+                    entries[wid] = self._entries[wid]
+            self._stale_skipped += len(newer)
+
+            self._entries = entries
+            self._versions = newer
+            self._snapshot_version = version
+            self._preloads += 1
+
+        print(f"[RISK] profile cache preloaded ({len(entries)} wristbands, version {version})")
+        return len(entries)
+
+    # ----------------------------
+    # Lookup
+    # ----------------------------
+    def get(self, wristband_id: int) -> str:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(wristband_id)
+            if entry is not None and entry[0] > now:
+                if entry[1] is _MISSING:
+                    self._negative_hits += 1
+                    return self.default_profile
+                self._hits += 1
+                return entry[1]
+            self._misses += 1
+
+        try:
+            profile = self.fetch_one(wristband_id)
+        except Exception as e:
+            print(f"[RISK] profile lookup failed for wristband {wristband_id}: {e}")
+            with self._lock:
+                self._failures += 1
+                stale = entry[1] if entry is not None else _MISSING
+                # Retry after the negative TTL, serve the old value meanwhile
+                self._entries[wristband_id] = (now + self.negative_ttl_seconds, stale)
+            return self.default_profile if stale is _MISSING else stale
+
+        with self._lock:
+            if profile is None:
+                self._entries[wristband_id] = (now + self.negative_ttl_seconds, _MISSING)
+                return self.default_profile
+            self._entries[wristband_id] = (now + self.ttl_seconds, profile)
+            return profile
+
+    # ----------------------------
+    # Invalidation
+    # ----------------------------
+    def invalidate(self, wristband_id: Optional[int] = None) -> None:
+        """
+        Drop one wristband (or everything when None).
+        """
+        with self._lock:
+            if wristband_id is None:
+                self._invalidations += len(self._entries)
+                self._entries.clear()
+            elif self._entries.pop(wristband_id, None) is not None:
+                self._invalidations += 1
+
+    def apply_change(self, event: Dict[str, Any]) -> None:
+        """
+        Assignment change event from Data Storage:
+        {"wristband_id", "active", "threshold_profile", ...}
+        wristband_id None means the whole index was reloaded.
+        """
+        wristband_id = event.get("wristband_id")
+        if wristband_id is None:
+            self.invalidate()
+            return
+
+        wristband_id = int(wristband_id)
+        now = time.monotonic()
+        with self._lock:
+            self._invalidations += 1
+            if event.get("version") is not None:
+                self._versions[wristband_id] = int(event["version"])
+            if event.get("active"):
+                profile = event.get("threshold_profile") or self.default_profile
+                self._entries[wristband_id] = (now + self.ttl_seconds, profile)
+            else:
+                self._entries[wristband_id] = (now + self.negative_ttl_seconds, _MISSING)
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._negative_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "negative_hits": self._negative_hits,
+                "misses": self._misses,
+                "hit_ratio": round(
+                    (self._hits + self._negative_hits) / lookups, 3
+                ) if lookups else 0.0,
+                "failures": self._failures,
+                "invalidations": self._invalidations,
+                "preloads": self._preloads,
+                "snapshot_version": self._snapshot_version,
+                "stale_skipped": self._stale_skipped,
+            }
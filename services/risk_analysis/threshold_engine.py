@@ -0,0 +1,165 @@
+from numbers import Real
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+
+# Severity codes (higher = worse)
+NORMAL, WARNING, CRITICAL = 0, 1, 2
+SEVERITY_NAMES = ("NORMAL", "WARNING", "CRITICAL")
+
+# Position used for "metric not in this payload"
+_ABSENT = np.iinfo(np.int32).max
+
+
+class Evaluation(NamedTuple):
+    severity: str
+    metric: Optional[str]
+    value: Optional[float]
+
+
+class _Bounds:
+    """
+    [low, high) bounds of one level for every (profile, metric) cell.
+    None in thresholds.json means unbounded on that side.
+    """
+
+    def __init__(self, n_profiles: int, n_metrics: int) -> None:
+        self.low = np.zeros((n_profiles, n_metrics))
+        self.high = np.zeros((n_profiles, n_metrics))
+        self.has_low = np.zeros((n_profiles, n_metrics), dtype=bool)
+        self.has_high = np.zeros((n_profiles, n_metrics), dtype=bool)
+
+    def set(self, p: int, m: int, bounds) -> None:
+        low, high = bounds
+        if low is not None:
+            self.low[p, m] = low
+            self.has_low[p, m] = True
+        if high is not None:
+            self.high[p, m] = high
+            self.has_high[p, m] = True
+
+    def contains(self, values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """
+        values: (N, M), rows: (N,) profile index per message -> (N, M) bool
+        """
+        with np.errstate(invalid="ignore"):
+            above = ~self.has_low[rows] | (values >= self.low[rows])
+            below = ~self.has_high[rows] | (values < self.high[rows])
+        return above & below
+
+
+class ThresholdEngine:
+    """
+    Threshold profiles compiled into NumPy bound arrays.
+
+    - One (profiles x metrics) matrix of bounds per level
+    - evaluate() scores a micro-batch of payloads in one vectorized pass
+    - Same result as checking every metric with resolve_severity in
+      payload order: the first CRITICAL metric wins, otherwise the last
+      WARNING one
+    """
+
+    def __init__(self, profiles: Dict[str, Dict[str, Dict[str, list]]]) -> None:
+        self.profile_names: List[str] = list(profiles)
+        self.metric_names: List[str] = []
+        for metric_ranges in profiles.values():
+            for metric in metric_ranges:
+                if metric not in self.metric_names:
+                    self.metric_names.append(metric)
+
+        self._profile_index = {name: i for i, name in enumerate(self.profile_names)}
+        self.metric_index = {name: i for i, name in enumerate(self.metric_names)}
+
+        n_p, n_m = len(self.profile_names), len(self.metric_names)
+        self._defined = np.zeros((n_p, n_m), dtype=bool)
+        self._critical = _Bounds(n_p, n_m)
+        self._warning = _Bounds(n_p, n_m)
+
+        for p, name in enumerate(self.profile_names):
+            for metric, ranges in profiles[name].items():
+                m = self.metric_index[metric]
+                self._defined[p, m] = True
+                self._critical.set(p, m, ranges["CRITICAL"])
+                self._warning.set(p, m, ranges["WARNING"])
+
+    def has_profile(self, profile: str) -> bool:
+        return profile in self._profile_index
+
+    # ----------------------------
+    # Evaluation
+    # ----------------------------
+    def evaluate(
+        self,
+        payloads: Sequence[dict],
+        profiles: Sequence[str],
+        return_levels: bool = False,
+    ):
+        """
+        Score a batch of vital payloads.
+
+        Returns one Evaluation per payload (None for an unknown profile).
+        Missing, None or non-numeric values are ignored.
+
+        With return_levels=True returns (evaluations, levels) where
+        levels[i, metric_index[m]] is the severity code of metric m in
+        payload i (NORMAL when absent).
+        """
+        n = len(payloads)
+        n_m = len(self.metric_names)
+        results: List[Optional[Evaluation]] = [None] * n
+        if n == 0 or n_m == 0:
+            levels = np.zeros((n, n_m), dtype=np.int8)
+            return (results, levels) if return_levels else results
+
+        values = np.full((n, n_m), np.nan)
+        positions = np.full((n, n_m), _ABSENT, dtype=np.int32)
+        rows = np.zeros(n, dtype=np.intp)
+        known = np.zeros(n, dtype=bool)
+
+        # Flatten the payloads into (message, metric) matrices
+        metric_index = self.metric_index
+        for i, (payload, profile) in enumerate(zip(payloads, profiles)):
+            p = self._profile_index.get(profile)
+            if p is None:
+                continue
+            rows[i] = p
+            known[i] = True
+            for pos, (key, value) in enumerate(payload.items()):
+                m = metric_index.get(key)
+                if m is None or not isinstance(value, Real):
+                    continue
+                values[i, m] = value
+                positions[i, m] = pos
+
+        present = ~np.isnan(values) & self._defined[rows] & known[:, None]
+        critical = present & self._critical.contains(values, rows)
+        warning = present & ~critical & self._warning.contains(values, rows)
+
+        # First CRITICAL metric in payload order, else the last WARNING one
+        first_critical = np.where(critical, positions, _ABSENT).argmin(axis=1)
+        last_warning = np.where(warning, positions, -1).argmax(axis=1)
+        any_critical = critical.any(axis=1)
+        any_warning = warning.any(axis=1)
+
+        for i in range(n):
+            if not known[i]:
+                continue
+            if any_critical[i]:
+                severity, m = CRITICAL, first_critical[i]
+            elif any_warning[i]:
+                severity, m = WARNING, last_warning[i]
+            else:
+                results[i] = Evaluation("NORMAL", None, None)
+                continue
+            metric = self.metric_names[m]
+            results[i] = Evaluation(SEVERITY_NAMES[severity], metric, payloads[i][metric])
+
+        if not return_levels:
+            return results
+
+        levels = np.where(critical, CRITICAL, np.where(warning, WARNING, NORMAL)).astype(np.int8)
+        return results, levels
+
+    def evaluate_one(self, payload: dict, profile: str) -> Optional[Evaluation]:
+        return self.evaluate([payload], [profile])[0]
@@ -0,0 +1,414 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from numbers import Real
+from typing import Any, Dict, List, Optional
+
+from threshold_engine import SEVERITY_NAMES
+
+
+class RollingWindow:
+    """
+    Last `size` (t, x) samples in a ring buffer.
+
+    mean / std / slope are O(1): running sums are updated when a sample
+    enters or leaves the window, and rebuilt from the buffer every few
+    wrap-arounds to keep float error from piling up.
+    """
+
+    __slots__ = ("size", "n", "_t", "_x", "_pos", "_origin",
+                 "_sx", "_sxx", "_st", "_stt", "_stx", "_updates")
+
+    def __init__(self, size: int) -> None:
+        self.size = max(2, int(size))
+        self.n = 0
+        self._t = [0.0] * self.size
+        self._x = [0.0] * self.size
+        self._pos = 0
+        self._origin: Optional[float] = None  # t of the first sample (precision)
+        self._sx = self._sxx = self._st = self._stt = self._stx = 0.0
+        self._updates = 0
+
+    def push(self, t: float, x: float) -> None:
+        if self._origin is None:
+            self._origin = t
+        t -= self._origin
+
+        if self.n == self.size:
+            ot, ox = self._t[self._pos], self._x[self._pos]
+            self._sx -= ox
+            self._sxx -= ox * ox
+            self._st -= ot
+            self._stt -= ot * ot
+            self._stx -= ot * ox
+        else:
+            self.n += 1
+
+        self._t[self._pos] = t
+        self._x[self._pos] = x
+        self._pos = (self._pos + 1) % self.size
+        self._sx += x
+        self._sxx += x * x
+        self._st += t
+        self._stt += t * t
+        self._stx += t * x
+
+        self._updates += 1
+        if self._updates >= 16 * self.size:
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        samples = self.samples()
+        origin = samples[0][0]
+        self._origin += origin
+        self._sx = self._sxx = self._st = self._stt = self._stx = 0.0
+        for i, (t, x) in enumerate(samples):
+            t -= origin
+            self._t[(self._pos - self.n + i) % self.size] = t
+            self._sx += x
+            self._sxx += x * x
+            self._st += t
+            self._stt += t * t
+            self._stx += t * x
+        self._updates = 0
+
+    def samples(self) -> List[tuple]:
+        """
+        (t, x) oldest first, t relative to the window origin.
+        """
+        start = (self._pos - self.n) % self.size
+        return [
+            (self._t[(start + i) % self.size], self._x[(start + i) % self.size])
+            for i in range(self.n)
+        ]
+
+    def mean(self) -> float:
+        return self._sx / self.n if self.n else 0.0
+
+    def std(self) -> float:
+        if self.n < 2:
+            return 0.0
+        mean = self._sx / self.n
+        return math.sqrt(max(0.0, self._sxx / self.n - mean * mean))
+
+    def slope(self) -> float:
+        """
+        Least-squares slope in units per second.
+        """
+        if self.n < 2:
+            return 0.0
+        denominator = self.n * self._stt - self._st * self._st
+        if denominator <= 1e-9:
+            return 0.0
+        return (self.n * self._stx - self._st * self._sx) / denominator
+
+
+class CountWindow:
+    """
+    How many of the last `m` flags were set (O(1) per update).
+    """
+
+    __slots__ = ("m", "_flags", "_pos", "count")
+
+    def __init__(self, m: int) -> None:
+        self.m = max(1, int(m))
+        self._flags = [False] * self.m
+        self._pos = 0
+        self.count = 0
+
+    def push(self, flag: bool) -> int:
+        self.count += int(flag) - int(self._flags[self._pos])
+        self._flags[self._pos] = flag
+        self._pos = (self._pos + 1) % self.m
+        return self.count
+
+
+class MetricState:
+    """
+    Streaming state of one metric of one wristband.
+    """
+
+    __slots__ = ("window", "ewma_mean", "ewma_var", "samples", "counters")
+
+    def __init__(self, window_size: int) -> None:
+        self.window = RollingWindow(window_size)
+        self.ewma_mean = 0.0
+        self.ewma_var = 0.0
+        self.samples = 0
+        self.counters: Dict[int, CountWindow] = {}  # rule index -> N of M state
+
+    def update_ewma(self, x: float, alpha: float) -> None:
+        if self.samples == 0:
+            self.ewma_mean = x
+            self.ewma_var = 0.0
+            return
+        diff = x - self.ewma_mean
+        increment = alpha * diff
+        self.ewma_mean += increment
+        self.ewma_var = (1 - alpha) * (self.ewma_var + diff * increment)
+
+
+class WristbandState:
+    __slots__ = ("metrics", "active_rules", "last_seen")
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, MetricState] = {}
+        self.active_rules: set = set()  # rules currently firing (edge trigger)
+        self.last_seen = 0.0
+
+
+# ----------------------------
+# Rules
+# ----------------------------
+class WindowRule:
+    """
+    Base class. check() returns a detail dict when the rule matches the
+    current sample. Rules only fire on the transition into the matching
+    state, not on every sample while it lasts.
+    """
+
+    def __init__(self, index: int, cfg: Dict[str, Any]) -> None:
+        self.index = index
+        self.name = cfg.get("name") or f"{cfg['type']}_{cfg['metric']}"
+        self.metric = cfg["metric"]
+        self.severity = cfg.get("severity", "WARNING").upper()
+        self.alert_type = cfg["alert_type"]
+        self.min_samples = int(cfg.get("min_samples", 1))
+
+    def check(self, state: MetricState, value: float, level: int) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class PersistenceRule(WindowRule):
+    """
+    Metric at `level` or worse in at least n of the last m samples.
+    """
+
+    def __init__(self, index: int, cfg: Dict[str, Any]) -> None:
+        super().__init__(index, cfg)
+        self.level = SEVERITY_NAMES.index(cfg.get("level", "WARNING").upper())
+        self.n = int(cfg["n"])
+        self.m = int(cfg["m"])
+
+    def check(self, state, value, level):
+        counter = state.counters.get(self.index)
+        if counter is None:
+            counter = state.counters[self.index] = CountWindow(self.m)
+        count = counter.push(level >= self.level)
+        if count < self.n:
+            return None
+        return {
+            "count": count,
+            "of": self.m,
+            "reason": f"{SEVERITY_NAMES[self.level].lower()} or worse in "
+                      f"{count} of the last {self.m} samples",
+        }
+
+
+class RateOfChangeRule(WindowRule):
+    """
+    Trend over the window steeper than per_minute (direction up/down/any).
+    """
+
+    def __init__(self, index: int, cfg: Dict[str, Any]) -> None:
+        super().__init__(index, cfg)
+        self.per_minute = float(cfg["per_minute"])
+        self.direction = cfg.get("direction", "any")
+
+    def check(self, state, value, level):
+        if state.window.n < self.min_samples:
+            return None
+        per_minute = state.window.slope() * 60.0
+        if self.direction == "up":
+            matched = per_minute >= self.per_minute
+        elif self.direction == "down":
+            matched = per_minute <= -self.per_minute
+        else:
+            matched = abs(per_minute) >= self.per_minute
+        if not matched:
+            return None
+        return {
+            "per_minute": round(per_minute, 3),
+            "window_mean": round(state.window.mean(), 3),
+            "samples": state.window.n,
+            "reason": f"changing by {per_minute:+.1f}/min over the last "
+                      f"{state.window.n} samples",
+        }
+
+
+class EwmaAnomalyRule(WindowRule):
+    """
+    Sample more than z standard deviations away from the EWMA baseline
+    (baseline taken before this sample is folded in).
+    """
+
+    def __init__(self, index: int, cfg: Dict[str, Any]) -> None:
+        super().__init__(index, cfg)
+        self.z = float(cfg.get("z", 4.0))
+
+    def check(self, state, value, level):
+        if state.samples < self.min_samples or state.ewma_var <= 0:
+            return None
+        score = (value - state.ewma_mean) / math.sqrt(state.ewma_var)
+        if abs(score) < self.z:
+            return None
+        return {
+            "score": round(score, 2),
+            "baseline": round(state.ewma_mean, 3),
+            "reason": f"{score:+.1f} standard deviations from the recent baseline "
+                      f"({state.ewma_mean:.1f})",
+        }
+
+
+RULE_TYPES = {
+    "persistence": PersistenceRule,
+    "rate_of_change": RateOfChangeRule,
+    "ewma_anomaly": EwmaAnomalyRule,
+}
+
+
+class WindowStore:
+    """
+    Per-wristband streaming state for windowed risk rules.
+
+    - Fixed-size ring buffer per (wristband, metric): memory per
+      wristband is bounded by window_size x metrics
+    - At most max_wristbands are tracked; the least recently seen one
+      is evicted (idle bands also expire after idle_seconds)
+    - update() is called once per sample; a wristband must only be
+      updated from one thread at a time (the worker pool shards by
+      wristband)
+    """
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]],
+        max_wristbands: int = 10_000,
+        idle_seconds: float = 3600.0,
+    ) -> None:
+        config = config or {}
+        self.window_size = int(config.get("window_size", 36))
+        self.ewma_alpha = float(config.get("ewma_alpha", 0.1))
+        self.max_wristbands = max(1, int(max_wristbands))
+        self.idle_seconds = idle_seconds
+
+        self.rules: List[WindowRule] = []
+        for i, rule_cfg in enumerate(config.get("rules", [])):
+            rule_cls = RULE_TYPES.get(rule_cfg.get("type"))
+            if rule_cls is None:
+                print(f"[RISK] unknown window rule type {rule_cfg.get('type')!r}, skipped")
+                continue
+            self.rules.append(rule_cls(i, rule_cfg))
+
+        self.metrics = sorted({rule.metric for rule in self.rules})
+        self._bands: "OrderedDict[int, WristbandState]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._evictions = 0
+        self._findings = 0
+
+    def _state(self, wristband_id: int, now: float) -> WristbandState:
+        with self._lock:
+            state = self._bands.get(wristband_id)
+            if state is None:
+                state = self._bands[wristband_id] = WristbandState()
+                while len(self._bands) > self.max_wristbands:
+                    self._bands.popitem(last=False)
+                    self._evictions += 1
+            else:
+                self._bands.move_to_end(wristband_id)
+
+            # Expire idle bands from the cold end
+            while self._bands:
+                oldest_id, oldest = next(iter(self._bands.items()))
+                if oldest is state or now - oldest.last_seen < self.idle_seconds:
+                    break
+                del self._bands[oldest_id]
+                self._evictions += 1
+
+        state.last_seen = now
+        return state
+
+    def update(self, payload: Dict[str, Any], levels: Dict[str, int]) -> List[Dict[str, Any]]:
+        """
+        Fold one payload into its wristband's state and evaluate the rules.
+        levels: metric -> severity code from the threshold engine.
+
+        Returns findings: {"rule", "alert_type", "severity", "metric",
+        "value", "detail"}
+        """
+        if not self.rules:
+            return []
+
+        now = time.monotonic()
+        state = self._state(int(payload["wristband_id"]), now)
+        t = sample_time(payload)
+
+        for metric in self.metrics:
+            value = payload.get(metric)
+            if not isinstance(value, Real):
+                continue
+            metric_state = state.metrics.get(metric)
+            if metric_state is None:
+                metric_state = state.metrics[metric] = MetricState(self.window_size)
+            metric_state.window.push(t, float(value))
+
+        findings: List[Dict[str, Any]] = []
+        for rule in self.rules:
+            metric_state = state.metrics.get(rule.metric)
+            value = payload.get(rule.metric)
+            if metric_state is None or not isinstance(value, Real):
+                continue
+
+            detail = rule.check(metric_state, float(value), levels.get(rule.metric, 0))
+            if detail is None:
+                state.active_rules.discard(rule.index)
+                continue
+            if rule.index in state.active_rules:
+                continue  # still firing, already reported
+
+            state.active_rules.add(rule.index)
+            findings.append({
+                "rule": rule.name,
+                "alert_type": rule.alert_type,
+                "severity": rule.severity,
+                "metric": rule.metric,
+                "value": value,
+                "detail": detail,
+            })
+
+        # EWMA baselines are updated after the rules looked at the sample
+        for metric in self.metrics:
+            value = payload.get(metric)
+            metric_state = state.metrics.get(metric)
+            if metric_state is not None and isinstance(value, Real):
+                metric_state.update_ewma(float(value), self.ewma_alpha)
+                metric_state.samples += 1
+
+        self._findings += len(findings)
+        return findings
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "wristbands": len(self._bands),
+                "max_wristbands": self.max_wristbands,
+                "rules": len(self.rules),
+                "evictions": self._evictions,
+                "findings": self._findings,
+            }
+
+
+def sample_time(payload: Dict[str, Any]) -> float:
+    """
+    Measurement time (epoch seconds) from measured_at, else now.
+    """
+    measured_at = payload.get("measured_at")
+    if isinstance(measured_at, str):
+        try:
+            return datetime.fromisoformat(measured_at).timestamp()
+        except ValueError:
+            pass
+    return time.time()
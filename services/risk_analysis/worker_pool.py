@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class _Shard:
+    """
+    Bounded FIFO queue drained by one worker thread.
+    """
+
+    def __init__(self, index: int, max_pending: int) -> None:
+        self.index = index
+        self.max_pending = max(1, max_pending)
+        self.pending: deque = deque()  # (received_at, item)
+        self.cond = threading.Condition()
+        self.thread: Optional[threading.Thread] = None
+
+        # Counters
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.failures = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_batch_ms = 0.0
+        self.last_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.total_latency_ms = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self.cond:
+            return {
+                "worker": self.index,
+                "queue_depth": len(self.pending),
+                "received": self.received,
+                "processed": self.processed,
+                "dropped": self.dropped,
+                "failures": self.failures,
+                "batches": self.batches,
+                "last_batch_size": self.last_batch_size,
+                "last_batch_ms": round(self.last_batch_ms, 3),
+                "last_latency_ms": round(self.last_latency_ms, 3),
+                "max_latency_ms": round(self.max_latency_ms, 3),
+                "avg_latency_ms": round(
+                    self.total_latency_ms / self.processed, 3
+                ) if self.processed else 0.0,
+            }
+
+
+class ShardedWorkerPool:
+    """
+    Receive / process split for MQTT messages.
+
+    - submit() is called from paho's network thread and never blocks
+    - Items with the same key always go to the same worker, so per-key
+      (per-wristband) order is preserved
+    - Each worker hands up to batch_size queued items to handler in one call
+    - Latency = time from submit() until the item's batch was processed
+    - A full queue sheds its oldest item
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[List[Any]], None],
+        workers: int = 4,
+        batch_size: int = 200,
+        max_pending: int = 10_000,
+    ) -> None:
+        self.name = name
+        self.handler = handler
+        self.batch_size = max(1, int(batch_size))
+        self._shards = [_Shard(i, max_pending) for i in range(max(1, int(workers)))]
+        self._closed = False
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    def start(self) -> None:
+        for shard in self._shards:
+            if shard.thread is not None:
+                continue
+            shard.thread = threading.Thread(
+                target=self._run,
+                args=(shard,),
+                name=f"{self.name}-worker-{shard.index}",
+                daemon=True,
+            )
+            shard.thread.start()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Stop accepting items and wait for the workers to drain their queues.
+        """
+        self._closed = True
+        for shard in self._shards:
+            with shard.cond:
+                shard.cond.notify_all()
+
+        deadline = time.monotonic() + timeout
+        for shard in self._shards:
+            if shard.thread is not None:
+                shard.thread.join(timeout=max(0.0, deadline - time.monotonic()))
+                shard.thread = None
+
+        print(f"[RISK] {self.name} pool closed, stats={self.stats(per_worker=False)}")
+
+    # ----------------------------
+    # Receive stage
+    # ----------------------------
+    def submit(self, key: Hashable, item: Any) -> bool:
+        if self._closed:
+            return False
+
+        shard = self._shards[hash(key) % len(self._shards)]
+        with shard.cond:
+            if len(shard.pending) >= shard.max_pending:
+                shard.pending.popleft()
+                shard.dropped += 1
+            shard.pending.append((time.monotonic(), item))
+            shard.received += 1
+            if len(shard.pending) == 1 or len(shard.pending) >= self.batch_size:
+                shard.cond.notify()
+        return True
+
+    # ----------------------------
+    # Processing stage
+    # ----------------------------
+    def _take(self, shard: _Shard) -> List[Tuple[float, Any]]:
+        with shard.cond:
+            while not shard.pending and not self._closed:
+                shard.cond.wait(timeout=1.0)
+            n = min(len(shard.pending), self.batch_size)
+            return [shard.pending.popleft() for _ in range(n)]
+
+    def _run(self, shard: _Shard) -> None:
+        while True:
+            batch = self._take(shard)
+            if not batch:
+                return  # closed and drained
+
+            started = time.monotonic()
+            failed = False
+            try:
+                self.handler([item for _, item in batch])
+            except Exception as e:
+                failed = True
+                print(f"[RISK] {self.name} worker {shard.index} failed "
+                      f"({len(batch)} messages): {e}")
+            finished = time.monotonic()
+
+            latencies = [(finished - received_at) * 1000.0 for received_at, _ in batch]
+            with shard.cond:
+                shard.batches += 1
+                shard.processed += len(batch)
+                shard.failures += int(failed)
+                shard.last_batch_size = len(batch)
+                shard.last_batch_ms = (finished - started) * 1000.0
+                shard.last_latency_ms = latencies[-1]
+                shard.max_latency_ms = max(shard.max_latency_ms, max(latencies))
+                shard.total_latency_ms += sum(latencies)
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+    def stats(self, per_worker: bool = True) -> Dict[str, Any]:
+        workers = [shard.stats() for shard in self._shards]
+        processed = sum(w["processed"] for w in workers)
+        result = {
+            "workers": len(workers),
+            "batch_size": self.batch_size,
+            "queue_depth": sum(w["queue_depth"] for w in workers),
+            "max_queue_depth": max(w["queue_depth"] for w in workers),
+            "received": sum(w["received"] for w in workers),
+            "processed": processed,
+            "dropped": sum(w["dropped"] for w in workers),
+            "failures": sum(w["failures"] for w in workers),
+            "max_latency_ms": max(w["max_latency_ms"] for w in workers),
+            "avg_latency_ms": round(
+                sum(w["avg_latency_ms"] * w["processed"] for w in workers) / processed, 3
+            ) if processed else 0.0,
+        }
+        if per_worker:
+            result["per_worker"] = workers
+        return result
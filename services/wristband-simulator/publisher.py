@@ -1,4 +1,3 @@
-import json
 import time
 import random
 import os
@@ -6,6 +5,8 @@ import requests
 from datetime import datetime, timezone
 import paho.mqtt.publish as publish
 
+from shared.codec import FORMAT_JSON, VITALS_FORMATS, encode_vitals
+
 # -----------------------------
 # ENV CONFIG (Docker-friendly)
 # -----------------------------
@@ -13,6 +14,11 @@ MQTT_HOST = os.getenv("MQTT_HOST", "mqtt-broker")
 MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
 DATA_STORAGE_URL = os.getenv("DATA_STORAGE_URL", "http://data-storage:8003")
 
+# Vitals wire format: "json" or "binary-v1" (see mqtt_topics.json payload_formats)
+VITALS_PAYLOAD_FORMAT = os.getenv("VITALS_PAYLOAD_FORMAT", FORMAT_JSON)
+if VITALS_PAYLOAD_FORMAT not in VITALS_FORMATS:
+    raise SystemExit(f"[SIM] Unknown VITALS_PAYLOAD_FORMAT {VITALS_PAYLOAD_FORMAT!r}")
+
 PUBLISH_INTERVAL_SEC = 5
 
 # Distribution
@@ -83,7 +89,7 @@ def fetch_active_assignments():
 # -----------------------------
 # Main loop
 # -----------------------------
-print("[SIM] Wristband Simulator started (STANDARD profile only)")
+print(f"[SIM] Wristband Simulator started (STANDARD profile only, {VITALS_PAYLOAD_FORMAT} payloads)")
 
 while True:
     print("[SIM] Fetching active assignments...")
@@ -113,7 +119,7 @@ while True:
 
         publish.single(
             topic=topic,
-            payload=json.dumps(vitals_payload),
+            payload=encode_vitals(vitals_payload, VITALS_PAYLOAD_FORMAT),
             hostname=MQTT_HOST,
             port=MQTT_PORT,
             qos=0
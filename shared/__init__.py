@@ -0,0 +1,3 @@
+"""
+Code shared by the platform services (copied into each image).
+"""
@@ -0,0 +1,346 @@
+"""
+MQTT message codec shared by all services.
+
+- loads() / dumps(): orjson when installed, stdlib json otherwise.
+  Payloads are decoded straight from bytes and encoded to bytes.
+- decode(data, schema): JSON object + typed validation of the message
+  shapes below (vitals, risk events, final alerts, persisted alerts,
+  assignment changes)
+- Vitals may also arrive in the compact binary format (encode_vitals);
+  decode() detects it from the first byte
+- Every failure raises CodecError
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+try:  # optional fast backend
+    import orjson
+except ImportError:  # pragma: no cover - depends on the image
+    orjson = None
+
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+class CodecError(ValueError):
+    """
+    Payload is not valid JSON or does not match its message schema.
+    """
+
+
+# ----------------------------
+# JSON
+# ----------------------------
+def _default(obj: Any) -> Any:
+    # numpy scalars (risk analysis) -> plain Python numbers
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+if orjson is not None:
+    _DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def loads(data: Any) -> Any:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError as e:
+            raise CodecError(f"invalid JSON: {e}") from None
+
+    def dumps(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=_default, option=_DUMPS_OPTIONS)
+        except TypeError as e:
+            raise CodecError(str(e)) from None
+
+else:
+
+    def loads(data: Any) -> Any:
+        try:
+            return json.loads(data)  # bytes accepted (UTF-8 detected)
+        except (ValueError, UnicodeDecodeError) as e:
+            raise CodecError(f"invalid JSON: {e}") from None
+
+    def dumps(obj: Any) -> bytes:
+        try:
+            return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+        except (TypeError, ValueError) as e:
+            raise CodecError(str(e)) from None
+
+
+# ----------------------------
+# Message schemas
+# ----------------------------
+INT = (int,)
+NUMBER = (int, float)
+STR = (str,)
+BOOL = (bool,)
+OBJECT = (dict,)
+
+
+class Schema:
+    """
+    Typed shape of one message kind.
+
+    - required fields must be present and not null
+    - optional fields may be missing or null
+    - unknown fields pass through (newer producers)
+    - bool is not accepted where a number is expected
+    """
+
+    def __init__(
+        self,
+        name: str,
+        required: Mapping[str, Tuple[type, ...]],
+        optional: Optional[Mapping[str, Tuple[type, ...]]] = None,
+    ) -> None:
+        self.name = name
+        self.required = dict(required)
+        self.optional = dict(optional or {})
+
+    def validate(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        for field, types in self.required.items():
+            value = message.get(field)
+            if value is None:
+                raise CodecError(f"{self.name}: {field} missing")
+            self._check(field, value, types)
+
+        for field, types in self.optional.items():
+            value = message.get(field)
+            if value is not None:
+                self._check(field, value, types)
+
+        return message
+
+    def _check(self, field: str, value: Any, types: Tuple[type, ...]) -> None:
+        is_bool = value is True or value is False
+        if not isinstance(value, types) or (is_bool and bool not in types):
+            raise CodecError(
+                f"{self.name}: {field} must be {'/'.join(t.__name__ for t in types)}, "
+                f"got {type(value).__name__}"
+            )
+
+
+VITALS = Schema(
+    "vitals",
+    required={"wristband_id": INT},
+    optional={
+        "measured_at": STR,
+        "heart_rate": NUMBER,
+        "spo2": NUMBER,
+        "temperature": NUMBER,
+        "motion": NUMBER,
+        "battery_level": NUMBER,
+    },
+)
+
+RISK_EVENT = Schema(
+    "risk_event",
+    required={
+        "wristband_id": INT,
+        "alert_type": STR,
+        "severity": STR,
+        "vital": STR,
+    },
+    optional={
+        "value": NUMBER,
+        "threshold_profile": STR,
+        "generated_at": STR,
+        "rule": STR,
+        "reason": STR,
+        "detail": OBJECT,
+    },
+)
+
+ALERT = Schema(
+    "alert",
+    required={
+        "alert_type": STR,
+        "severity": STR,
+        "metric": STR,
+    },
+    optional={
+        "assignment_id": INT,
+        "patient_id": INT,
+        "wristband_id": INT,
+        "status": STR,
+        "value": NUMBER,
+        "threshold_profile": STR,
+        "description": STR,
+        "full_description": STR,
+        "generated_at": STR,
+        "event": STR,
+        "dedup_key": STR,
+        "occurrences": INT,
+        "occurrence_count": INT,
+        "first_seen_at": STR,
+        "last_seen_at": STR,
+        "last_value": NUMBER,
+        "escalated_from": STR,
+    },
+)
+
+# Alert row as saved by Data Storage: {"event": "created" | "updated", "alert": {...}}
+PERSISTED_ALERT = Schema(
+    "persisted_alert",
+    required={"event": STR, "alert": OBJECT},
+)
+
+ASSIGNMENT_CHANGE = Schema(
+    "assignment_change",
+    required={"active": BOOL},
+    optional={
+        "wristband_id": INT,
+        "assignment_id": INT,
+        "patient_id": INT,
+        "threshold_profile": STR,
+        "version": INT,
+        "changed_at": STR,
+    },
+)
+
+
+# ----------------------------
+# Binary vitals (wristbands/{id}/vitals)
+# ----------------------------
+# Layout v1, little endian, 25 bytes:
+#   magic u8 | version u8 | presence mask u8 | wristband_id u32 |
+#   measured_at i64 (us since epoch, UTC) | 5 x i16 fixed-point vitals
+# A clear mask bit means the field was null / missing.
+# The magic byte can never start a UTF-8 JSON document.
+VITALS_MAGIC = 0xB7
+VITALS_BINARY_VERSION = 1
+_MAGIC_BYTE = bytes([VITALS_MAGIC])
+_VERSION_BYTE = bytes([VITALS_BINARY_VERSION])
+
+FORMAT_JSON = "json"
+FORMAT_BINARY = "binary-v1"
+VITALS_FORMATS = (FORMAT_JSON, FORMAT_BINARY)
+
+_VITALS_STRUCT = struct.Struct("<BBBIq5h")
+
+# (field, fixed-point scale), in mask bit order
+_VITALS_FIELDS = (
+    ("heart_rate", 10),
+    ("spo2", 10),
+    ("temperature", 100),
+    ("motion", 100),
+    ("battery_level", 10),
+)
+_ALL_VITALS = (1 << len(_VITALS_FIELDS)) - 1
+_MEASURED_AT_BIT = 1 << len(_VITALS_FIELDS)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Formatting the timestamp costs more than unpacking; consecutive
+# messages share the second, so its text is cached (sec, prefix)
+_last_second = (None, "")
+
+
+def _isoformat_us(measured_us: int) -> str:
+    """
+    Same text as datetime.isoformat() of the UTC timestamp.
+    """
+    global _last_second
+    second, micro = divmod(measured_us, 1_000_000)
+    cached_second, prefix = _last_second
+    if second != cached_second:
+        prefix = (_EPOCH + timedelta(seconds=second)).strftime("%Y-%m-%dT%H:%M:%S")
+        _last_second = (second, prefix)
+    if micro:
+        return f"{prefix}.{micro:06d}+00:00"
+    return f"{prefix}+00:00"
+
+
+def encode_vitals(payload: Dict[str, Any], fmt: str = FORMAT_JSON) -> bytes:
+    """
+    Vitals payload -> wire bytes in the requested format.
+    """
+    if fmt == FORMAT_JSON:
+        return dumps(payload)
+    if fmt != FORMAT_BINARY:
+        raise CodecError(f"unknown vitals format {fmt!r}")
+
+    mask = 0
+    values = []
+    for bit, (field, scale) in enumerate(_VITALS_FIELDS):
+        value = payload.get(field)
+        if value is None:
+            values.append(0)
+            continue
+        mask |= 1 << bit
+        values.append(round(value * scale))
+
+    measured_us = 0
+    measured_at = payload.get("measured_at")
+    if measured_at is not None:
+        mask |= _MEASURED_AT_BIT
+        if isinstance(measured_at, str):
+            measured_at = datetime.fromisoformat(measured_at.replace("Z", "+00:00"))
+        if measured_at.tzinfo is None:
+            measured_at = measured_at.replace(tzinfo=timezone.utc)
+        measured_us = (measured_at - _EPOCH) // timedelta(microseconds=1)
+
+    try:
+        return _VITALS_STRUCT.pack(
+            VITALS_MAGIC, VITALS_BINARY_VERSION, mask,
+            payload["wristband_id"], measured_us, *values,
+        )
+    except (KeyError, TypeError, struct.error) as e:
+        raise CodecError(f"vitals not encodable as {FORMAT_BINARY}: {e}") from None
+
+
+def _decode_vitals_binary(data: bytes) -> Dict[str, Any]:
+    if data[1:2] != _VERSION_BYTE:
+        raise CodecError(f"unsupported binary vitals version {data[1:2]!r}")
+    try:
+        (_, _, mask, wristband_id, measured_us,
+         hr, spo2, temp, motion, battery) = _VITALS_STRUCT.unpack(data)
+    except struct.error as e:
+        raise CodecError(f"invalid binary vitals: {e}") from None
+
+    message: Dict[str, Any] = {
+        "wristband_id": wristband_id,
+        "measured_at": _isoformat_us(measured_us) if mask & _MEASURED_AT_BIT else None,
+    }
+    if mask & _ALL_VITALS == _ALL_VITALS:
+        # Usual case, unrolled: integral values come back as int
+        message["heart_rate"] = hr / 10 if hr % 10 else hr // 10
+        message["spo2"] = spo2 / 10 if spo2 % 10 else spo2 // 10
+        message["temperature"] = temp / 100 if temp % 100 else temp // 100
+        message["motion"] = motion / 100 if motion % 100 else motion // 100
+        message["battery_level"] = battery / 10 if battery % 10 else battery // 10
+        return message
+
+    values = (hr, spo2, temp, motion, battery)
+    for bit, ((field, scale), value) in enumerate(zip(_VITALS_FIELDS, values)):
+        if not mask & (1 << bit):
+            message[field] = None
+        elif value % scale:
+            message[field] = value / scale
+        else:
+            message[field] = value // scale
+    return message
+
+
+def decode(data: Any, schema: Optional[Schema] = None) -> Dict[str, Any]:
+    """
+    bytes -> validated message dict (JSON or binary vitals).
+    """
+    if data[:1] == _MAGIC_BYTE:
+        if schema is not None and schema is not VITALS:
+            raise CodecError(f"{schema.name}: binary payloads are vitals only")
+        # Typed by construction, no schema pass needed
+        return _decode_vitals_binary(data)
+
+    message = loads(data)
+    if not isinstance(message, dict):
+        raise CodecError(f"JSON must be an object, got {type(message).__name__}")
+    if schema is not None:
+        schema.validate(message)
+    return message
@@ -0,0 +1,157 @@
+# tests/test_alert_assignment_resolver.py
+
+import sys
+from pathlib import Path
+
+# ------------------------------------------------------------------
+# Make alert_notification service importable for tests
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+ALERT_DIR = ROOT / "services" / "alert_notification"
+
+sys.path.insert(0, str(ALERT_DIR))
+
+import assignment_resolver  # noqa
+from assignment_resolver import AssignmentResolver  # noqa
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_resolver(monkeypatch, assignments: dict) -> tuple:
+    """
+    Resolver whose single lookups read `assignments` (wristband -> entry);
+    returns (resolver, clock, fetched wristband ids).
+    """
+    clock = Clock()
+    monkeypatch.setattr(assignment_resolver.time, "monotonic", clock)
+    resolver = AssignmentResolver("http://data-storage", ttl_seconds=300, negative_ttl_seconds=30)
+
+    fetched = []
+
+    def fetch_one(wristband_id):
+        fetched.append(wristband_id)
+        value = assignments.get(wristband_id)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    resolver._fetch_one = fetch_one
+    return resolver, clock, fetched
+
+
+def entry(assignment_id, patient_id=1, profile="STANDARD"):
+    return {"assignment_id": assignment_id, "patient_id": patient_id, "threshold_profile": profile}
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_entries_are_cached_until_ttl(monkeypatch):
+    resolver, clock, fetched = make_resolver(monkeypatch, {7: entry(70)})
+
+    assert resolver.resolve(7) == entry(70)
+    clock.now += 299
+    assert resolver.resolve(7) == entry(70)
+    assert fetched == [7]
+
+    clock.now += 2
+    resolver.resolve(7)
+    assert fetched == [7, 7]
+    assert resolver.stats()["hits"] == 1
+
+
+def test_unassigned_wristband_is_cached_shorter(monkeypatch):
+    assignments = {}
+    resolver, clock, fetched = make_resolver(monkeypatch, assignments)
+
+    assert resolver.resolve(8) is None
+    clock.now += 29
+    assert resolver.resolve(8) is None
+    assert fetched == [8]
+
+    assignments[8] = entry(80)
+    clock.now += 2
+    assert resolver.resolve(8) == entry(80)
+
+
+def test_lookup_failure_serves_the_expired_entry(monkeypatch):
+    assignments = {9: entry(90)}
+    resolver, clock, _ = make_resolver(monkeypatch, assignments)
+    resolver.resolve(9)
+
+    assignments[9] = ConnectionError("data-storage down")
+    clock.now += 301
+    assert resolver.resolve(9) == entry(90)
+    assert resolver.stats()["failures"] == 1
+
+
+def test_change_events_update_the_cache(monkeypatch):
+    resolver, _, fetched = make_resolver(monkeypatch, {})
+
+    resolver.apply_change({"wristband_id": 10, "active": True, **entry(100, 5)})
+    assert resolver.resolve(10) == entry(100, 5)
+
+    resolver.apply_change({"wristband_id": 10, "active": False})
+    assert resolver.resolve(10) is None
+    assert fetched == []
+
+
+def snapshot(resolver, version, items, before_return=None):
+    """
+    Make warm() read `items` at `version`; `before_return` runs while the
+    request is "in flight".
+    """
+    def fetch_all():
+        if before_return:
+            before_return()
+        return version, [{"wristband_id": wid, **e} for wid, e in items.items()]
+
+    resolver._fetch_all = fetch_all
+
+
+def test_change_during_warm_is_not_overwritten(monkeypatch):
+    resolver, _, fetched = make_resolver(monkeypatch, {})
+
+    # Wristband 11 is unassigned and 12 reassigned after the snapshot was read
+    snapshot(resolver, 5, {11: entry(110), 12: entry(120)}, before_return=lambda: (
+        resolver.apply_change({"wristband_id": 11, "active": False, "version": 6}),
+        resolver.apply_change({"wristband_id": 12, "active": True, "version": 7, **entry(121)}),
+    ))
+    assert resolver.warm() == 2
+
+    assert resolver.resolve(11) is None
+    assert resolver.resolve(12) == entry(121)
+    assert fetched == []
+    assert resolver.stats()["stale_skipped"] == 2
+
+
+def test_older_change_is_replaced_by_the_snapshot(monkeypatch):
+    resolver, _, _ = make_resolver(monkeypatch, {})
+    resolver.apply_change({"wristband_id": 13, "active": False, "version": 3})
+
+    snapshot(resolver, 4, {13: entry(130)})
+    resolver.warm()
+    assert resolver.resolve(13) == entry(130)
+
+
+def test_version_reset_forgets_remembered_changes(monkeypatch):
+    resolver, _, _ = make_resolver(monkeypatch, {})
+    snapshot(resolver, 50, {})
+    resolver.warm()
+    resolver.apply_change({"wristband_id": 14, "active": False, "version": 51})
+
+    # Data Storage restarted: versions count from 0 again
+    snapshot(resolver, 2, {14: entry(140)})
+    resolver.warm()
+    assert resolver.resolve(14) == entry(140)
+    assert resolver.stats()["snapshot_version"] == 2
@@ -0,0 +1,159 @@
+# tests/test_alert_dedup.py
+
+import sys
+from pathlib import Path
+
+# ------------------------------------------------------------------
+# Make alert_notification service importable for tests
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+ALERT_DIR = ROOT / "services" / "alert_notification"
+
+sys.path.insert(0, str(ALERT_DIR))
+
+import dedup  # noqa
+from dedup import CREATED, UPDATED, AlertDeduplicator  # noqa
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_dedup(monkeypatch, **kwargs) -> tuple:
+    clock = Clock()
+    monkeypatch.setattr(dedup.time, "monotonic", clock)
+    kwargs.setdefault("cooldown_seconds", 300)
+    kwargs.setdefault("update_interval_seconds", 60)
+    return AlertDeduplicator(**kwargs), clock
+
+
+def risk(severity="CRITICAL", value=150, wristband_id=1, vital="heart_rate"):
+    return {
+        "wristband_id": wristband_id,
+        "alert_type": "THRESHOLD_BREACH",
+        "vital": vital,
+        "severity": severity,
+        "value": value,
+    }
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_repeats_are_counted_and_published_once_per_interval(monkeypatch):
+    d, clock = make_dedup(monkeypatch)
+    assert d.process(risk())["event"] == CREATED
+
+    for _ in range(3):
+        clock.now += 5
+        assert d.process(risk()) is None
+
+    clock.now += 60
+    update = d.process(risk(value=155))
+    assert update["event"] == UPDATED
+    assert (update["occurrences"], update["occurrence_count"]) == (4, 5)
+    assert update["last_value"] == 155
+
+
+def test_cooldown_expiry_opens_a_new_alert(monkeypatch):
+    d, clock = make_dedup(monkeypatch)
+    first = d.process(risk())
+
+    clock.now += 50
+    assert d.process(risk()) is None      # repeat inside the cooldown
+
+    clock.now += 301
+    assert d.flush_due()                  # the one repeat is published...
+    assert d.stats()["open_episodes"] == 0
+
+    again = d.process(risk())              # ...and the episode has ended
+    assert again["event"] == CREATED
+    assert again["dedup_key"] == first["dedup_key"]
+    assert again["occurrence_count"] == 1
+
+
+def test_flush_due_publishes_leftovers(monkeypatch):
+    d, clock = make_dedup(monkeypatch)
+    d.process(risk())
+    clock.now += 5
+    d.process(risk(value=160))
+    assert d.flush_due() == []             # update interval not elapsed
+
+    clock.now += 60
+    due = d.flush_due()
+    assert len(due) == 1
+    event, fields = due[0]
+    assert event["value"] == 160
+    assert (fields["event"], fields["occurrences"]) == (UPDATED, 1)
+    assert d.flush_due() == []             # nothing pending any more
+
+
+def test_escalation_is_published_at_once(monkeypatch):
+    d, clock = make_dedup(monkeypatch)
+    d.process(risk("WARNING", 110))
+    clock.now += 5
+
+    escalated = d.process(risk("CRITICAL", 150))
+    assert escalated["event"] == CREATED
+    assert escalated["severity"] == "CRITICAL"
+    assert escalated["escalated_from"] == "WARNING"
+    assert d.stats()["escalated"] == 1
+
+
+def test_downgrade_does_not_keep_the_higher_alert_open(monkeypatch):
+    d, clock = make_dedup(monkeypatch)
+    d.process(risk("CRITICAL", 150))
+
+    # Steady WARNING while the CRITICAL alert is open: counted only
+    for _ in range(9):
+        clock.now += 30
+        assert d.process(risk("WARNING", 110)) is None
+    assert d.stats()["downgraded"] == 9
+
+    # CRITICAL cooled down 300 s after its last occurrence: WARNING is raised
+    clock.now += 35
+    warning = d.process(risk("WARNING", 112))
+    assert warning["event"] == CREATED
+    assert warning["severity"] == "WARNING"
+    assert warning["last_value"] == 112
+    assert "escalated_from" not in warning
+
+
+def test_downgrade_keeps_the_higher_alert_values(monkeypatch):
+    d, clock = make_dedup(monkeypatch)
+    d.process(risk("CRITICAL", 150))
+    clock.now += 5
+    d.process(risk("CRITICAL", 152))
+    clock.now += 5
+    d.process(risk("WARNING", 110))
+
+    clock.now += 60
+    (event, fields), = d.flush_due()
+    assert event["severity"] == "CRITICAL" and event["value"] == 152
+    assert (fields["severity"], fields["last_value"], fields["occurrences"]) == ("CRITICAL", 152, 1)
+
+
+def test_eviction_hands_pending_occurrences_to_flush(monkeypatch):
+    d, clock = make_dedup(monkeypatch, max_keys=2)
+    d.process(risk(wristband_id=1))
+    clock.now += 1
+    d.process(risk(wristband_id=1, value=151))   # pending on wristband 1
+    d.process(risk(wristband_id=2))
+    clock.now += 1
+
+    d.process(risk(wristband_id=3))              # evicts wristband 1
+    stats = d.stats()
+    assert (stats["open_episodes"], stats["evictions"]) == (2, 1)
+
+    (event, fields), = d.flush_due()
+    assert event["wristband_id"] == 1
+    assert (fields["event"], fields["occurrences"], fields["last_value"]) == (UPDATED, 1, 151)
+    assert d.flush_due() == []
@@ -0,0 +1,124 @@
+# tests/test_dashboard_alert_stream.py
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# ------------------------------------------------------------------
+# Make dashboard-backend importable for tests
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+DASHBOARD_DIR = ROOT / "services" / "dashboard-backend"
+
+sys.path.insert(0, str(DASHBOARD_DIR))
+sys.path.insert(0, str(ROOT))   # shared/ (PYTHONPATH=/app in the images)
+
+from shared.codec import dumps  # noqa
+from app.api.ws import router  # noqa
+from app.mqtt.alert_subscriber import AlertMQTTSubscriber  # noqa
+from app.services.alert_stream import alert_event_stream  # noqa
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+subscriber = AlertMQTTSubscriber({"mqtt_topics": {}})
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+def saved_row(alert_id: int, occurrence_count: int = 1) -> dict:
+    """
+    Alert row as Data Storage publishes it on persisted_alerts.
+    """
+    return {
+        "alert_id": alert_id,
+        "assignment_id": 4,
+        "generated_at": "2026-01-01 10:00:00.000000",
+        "severity": "CRITICAL",
+        "status": "JUST_GENERATED",
+        "alert_type": "THRESHOLD_BREACH",
+        "threshold_profile": "STANDARD",
+        "metric": "spo2",
+        "value": 84,
+        "description": "Spo2 below CRITICAL threshold",
+        "full_description": "test alert",
+        "occurrence_count": occurrence_count,
+        "last_value": 83,
+        "last_seen_at": "2026-01-01 10:00:05.000000",
+        "wristband_id": 3,
+        "patient_id": 2,
+        "patient_name": "Jane Doe",
+    }
+
+
+def deliver(event: str, row: dict) -> None:
+    msg = SimpleNamespace(
+        topic=subscriber.alerts_topic,
+        payload=dumps({"event": event, "alert": row}),
+    )
+    subscriber._on_message(None, None, msg)
+
+
+def receive_replay(since: int, count: int) -> list:
+    with client.websocket_connect(f"/alerts?since={since}") as ws:
+        return [ws.receive_json() for _ in range(count)]
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_persisted_alerts_replay_by_since():
+    start = alert_event_stream.stats()["latest_seq"]
+    deliver("created", saved_row(101))
+    deliver("updated", saved_row(101, occurrence_count=3))
+    deliver("created", saved_row(102))
+
+    events = receive_replay(start, 3)
+    assert [e["seq"] for e in events] == [start + 1, start + 2, start + 3]
+    assert [e["type"] for e in events] == ["alert_created", "alert_updated", "alert_created"]
+
+    # Resume after the first event: only the later ones are replayed
+    assert [e["seq"] for e in receive_replay(start + 1, 2)] == [start + 2, start + 3]
+
+    # Updates carry the row they patch
+    updated = events[1]["alert"]
+    assert updated["alert_id"] == 101
+    assert updated["occurrence_count"] == 3
+
+
+def test_stream_item_matches_alerts_rows():
+    start = alert_event_stream.stats()["latest_seq"]
+    deliver("created", saved_row(201))
+
+    item = receive_replay(start, 1)[0]["alert"]
+    assert item["alert_id"] == 201
+    assert item["patient_id"] == 2
+    assert item["patient_name"] == "Jane Doe"
+    assert item["device_id"] == "WB-3"
+    assert item["severity"] == "CRITICAL"
+    assert item["status"] == "JUST_GENERATED"
+    assert (item["metric"], item["value"], item["last_value"]) == ("spo2", 84, 83)
+    assert item["occurrence_count"] == 1
+
+
+def test_invalid_or_unsaved_alert_is_ignored():
+    start = alert_event_stream.stats()["latest_seq"]
+    subscriber._on_message(None, None, SimpleNamespace(topic="t", payload=b"{not json"))
+    deliver("created", {**saved_row(301), "alert_id": None})
+    assert alert_event_stream.stats()["latest_seq"] == start
+
+
+def test_replay_from_unknown_seq_starts_with_reset():
+    latest = alert_event_stream.stats()["latest_seq"]
+    deliver("created", saved_row(401))
+
+    with client.websocket_connect(f"/alerts?since={latest + 100}") as ws:
+        reset = ws.receive_json()
+    assert reset["type"] == "reset"
+    assert reset["latest_seq"] == latest + 1
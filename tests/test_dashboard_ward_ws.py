@@ -0,0 +1,105 @@
+# tests/test_dashboard_ward_ws.py
+
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# ------------------------------------------------------------------
+# Make dashboard-backend importable for tests
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+DASHBOARD_DIR = ROOT / "services" / "dashboard-backend"
+
+sys.path.insert(0, str(DASHBOARD_DIR))
+sys.path.insert(0, str(ROOT))   # shared/ (PYTHONPATH=/app in the images)
+
+from app.api.ws import router  # noqa
+from app.services.patient_vital_stream import patient_vital_stream  # noqa
+
+app = FastAPI()
+app.include_router(router)
+client = TestClient(app)
+
+WARD_URL = "/vitals?max_fps=60"
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+def command(ws, message) -> dict:
+    ws.send_json(message)
+    return ws.receive_json()
+
+
+def publish(ws, patient_id: int, heart_rate: int) -> None:
+    # publish() must run on the app's event loop
+    ws.portal.call(
+        patient_vital_stream.publish,
+        patient_id,
+        {"type": "vital_update", "patient_id": patient_id, "data": {"heart_rate": heart_rate}},
+    )
+
+
+def batch_patients(ws) -> list:
+    frame = ws.receive_json()
+    assert frame["type"] == "vital_batch"
+    return [e["patient_id"] for e in frame["events"]]
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_subscribe_unsubscribe_and_all():
+    with client.websocket_connect(WARD_URL) as ws:
+        reply = command(ws, {"action": "subscribe", "patient_ids": [501, 502]})
+        assert reply == {"type": "subscribed", "patient_ids": [501, 502], "all": False}
+
+        publish(ws, 501, 80)
+        assert batch_patients(ws) == [501]
+
+        reply = command(ws, {"action": "unsubscribe", "patient_ids": [502]})
+        assert reply["patient_ids"] == [501]
+
+        reply = command(ws, {"action": "subscribe", "all": True})
+        assert reply["all"] is True
+        publish(ws, 599, 70)            # never subscribed explicitly
+        assert batch_patients(ws) == [599]
+
+        reply = command(ws, {"action": "unsubscribe", "all": True})
+        assert reply == {"type": "subscribed", "patient_ids": [], "all": False}
+        publish(ws, 501, 81)
+
+        # Nothing was delivered after "unsubscribe all"
+        reply = command(ws, {"action": "subscribe", "patient_ids": [503]})
+        assert reply["patient_ids"] == [503]
+
+
+def test_bad_frames_get_an_error_reply_and_keep_the_socket():
+    with client.websocket_connect(WARD_URL) as ws:
+        for send in (
+            lambda: ws.send_text("{not json"),
+            lambda: ws.send_bytes(b"\xff\xfe"),
+            lambda: ws.send_json([1, 2]),
+            lambda: ws.send_json({"action": "explode"}),
+            lambda: ws.send_json({"action": "subscribe", "patient_ids": ["x"]}),
+        ):
+            send()
+            reply = ws.receive_json()
+            assert reply["type"] == "error"
+            assert reply["detail"]
+
+        reply = command(ws, {"action": "subscribe", "patient_ids": [504]})
+        assert reply["patient_ids"] == [504]
+
+
+def test_disconnect_releases_the_subscription():
+    with client.websocket_connect(WARD_URL) as ws:
+        command(ws, {"action": "subscribe", "patient_ids": [505], "all": True})
+        assert patient_vital_stream.stats()["subscribers"] >= 1
+
+    stats = patient_vital_stream.stats()
+    assert stats["subscribers"] == 0
+    assert stats["patients_watched"] == 0
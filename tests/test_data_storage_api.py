@@ -0,0 +1,194 @@
+# tests/test_data_storage_api.py
+
+import os
+import sys
+import shutil
+import tempfile
+import importlib.util
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+# ------------------------------------------------------------------
+# Make data-storage service importable for tests
+# (on a throw-away copy of data/health.db)
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+DS_DIR = ROOT / "services" / "data-storage" / "src"
+
+DB_COPY = Path(tempfile.mkdtemp()) / "health.db"
+shutil.copy(ROOT / "data" / "health.db", DB_COPY)
+os.environ["DB_PATH"] = str(DB_COPY)
+
+sys.path.insert(0, str(DS_DIR))
+sys.path.insert(0, str(ROOT))   # shared/ (PYTHONPATH=/app in the images)
+
+_spec = importlib.util.spec_from_file_location("data_storage_main", DS_DIR / "main.py")
+ds_main = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ds_main)
+ds_main.init_db()
+
+from sqlalchemy import text  # noqa
+from api.app import app  # noqa
+from storage.local import LocalStorage, engine  # noqa
+from ingestion import BatchBuffer  # noqa
+from mqtt_client import MQTTClient  # noqa
+from shared.codec import PERSISTED_ALERT, decode  # noqa
+
+client = TestClient(app)
+storage = LocalStorage()
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+def active_assignment_id() -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT assignment_id FROM WRISTBAND_ASSIGNMENT
+            WHERE end_date IS NULL
+            ORDER BY assignment_id
+            LIMIT 1
+        """)).scalar()
+
+
+def alert_status(alert_id: int) -> str:
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT status FROM ALERT WHERE alert_id = :id"), {"id": alert_id}
+        ).scalar()
+
+
+def overview_counters() -> tuple:
+    resp = client.get("/api/v1/dashboard/overview")
+    assert resp.status_code == 200
+    data = resp.json()
+    return data["system_overview"]["active_alerts"], data["stats"]["patients_in_risk"]
+
+
+class RecordingMQTT:
+    """
+    Stands in for the paho client: keeps what would be published.
+    """
+    def __init__(self):
+        self.published = []
+
+    def publish(self, topic, payload, qos=0):
+        self.published.append((topic, decode(payload, PERSISTED_ALERT)))
+        return type("Info", (), {"rc": 0})()
+
+
+def critical_alert(assignment_id: int) -> dict:
+    return {
+        "assignment_id": assignment_id,
+        "alert_type": "THRESHOLD_BREACH",
+        "severity": "CRITICAL",
+        "status": "JUST_GENERATED",
+        "threshold_profile": "STANDARD",
+        "metric": "spo2",
+        "value": 84,
+        "description": "Spo2 above CRITICAL threshold",
+        "full_description": "test alert",
+    }
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_acknowledge_alert_updates_status_and_overview():
+    # Acknowledge every open alert of the assignment first, so the
+    # patient is in risk only because of the alert created below
+    assignment_id = active_assignment_id()
+    with engine.connect() as conn:
+        open_ids = conn.execute(text("""
+            SELECT alert_id FROM ALERT
+            WHERE assignment_id = :aid AND status != 'ACKNOWLEDGED'
+        """), {"aid": assignment_id}).scalars().all()
+    for alert_id in open_ids:
+        assert client.post(f"/api/v1/alerts/{alert_id}/acknowledge").status_code == 204
+
+    open_before, in_risk_before = overview_counters()
+
+    saved = storage.save_alerts([critical_alert(assignment_id)])[0]
+    assert saved["created"]
+    assert overview_counters() == (open_before + 1, in_risk_before + 1)
+
+    resp = client.post(
+        f"/api/v1/alerts/{saved['alert_id']}/acknowledge",
+        json={"reviewed_by": "nurse-1", "clinical_note": "checked"},
+    )
+    assert resp.status_code == 204
+    assert alert_status(saved["alert_id"]) == "ACKNOWLEDGED"
+    assert overview_counters() == (open_before, in_risk_before)
+
+
+def test_acknowledge_unknown_alert_is_404():
+    resp = client.post("/api/v1/alerts/999999999/acknowledge")
+    assert resp.status_code == 404
+
+
+def test_bad_alert_does_not_block_the_buffer():
+    assignment_id = active_assignment_id()
+    bad = {**critical_alert(assignment_id), "threshold_profile": None}   # NOT NULL
+    good = [
+        {**critical_alert(assignment_id), "metric": "heart_rate", "full_description": "good 1"},
+        {**critical_alert(assignment_id), "metric": "temperature", "full_description": "good 2"},
+    ]
+
+    buffer = BatchBuffer("alerts-test", flush_fn=storage.save_alerts, batch_size=10)
+    for record in (good[0], bad, good[1]):
+        buffer.add(record)
+
+    assert buffer.flush() == 3
+    stats = buffer.stats()
+    assert (stats["queue_depth"], stats["flushed"], stats["rejected"]) == (0, 2, 1)
+
+    with engine.connect() as conn:
+        stored = conn.execute(text("""
+            SELECT full_description FROM ALERT
+            WHERE assignment_id = :aid AND full_description LIKE 'good %'
+        """), {"aid": assignment_id}).scalars().all()
+    assert sorted(stored) == ["good 1", "good 2"]
+
+
+def test_flushed_alerts_are_published_as_saved_rows():
+    assignment_id = active_assignment_id()
+    mqtt = MQTTClient(config={})
+    mqtt._client = RecordingMQTT()
+
+    alert = {**critical_alert(assignment_id), "metric": "motion", "dedup_key": "test-motion"}
+    mqtt._flush_alerts([alert])
+    mqtt._flush_alerts([{**alert, "occurrences": 2, "last_value": 90}])
+
+    (topic, created), (_, updated) = mqtt._client.published
+    assert topic == mqtt.persisted_alerts_topic
+    assert created["event"] == "created"
+    assert updated["event"] == "updated"
+
+    row = updated["alert"]
+    assert row["alert_id"] == created["alert"]["alert_id"]
+    assert row["occurrence_count"] == 3
+    assert row["last_value"] == 90
+    assert row["patient_name"]
+    assert row["alert_id"] in {
+        r["alert_id"] for r in storage.list_alerts(metric="motion")["items"]
+    }
+
+
+def test_alert_list_is_unbounded_without_limit_and_cursor():
+    resp = client.get("/api/v1/alerts/")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["next_cursor"] is None
+    all_ids = [r["alert_id"] for r in body["items"]]
+    assert len(all_ids) > 100
+
+    # Paging with limit, then the cursor alone, walks the same rows
+    page = client.get("/api/v1/alerts/", params={"limit": 40}).json()
+    paged = [r["alert_id"] for r in page["items"]]
+    while page["next_cursor"]:
+        page = client.get("/api/v1/alerts/", params={"cursor": page["next_cursor"]}).json()
+        assert len(page["items"]) <= 100
+        paged += [r["alert_id"] for r in page["items"]]
+    assert paged == all_ids
@@ -0,0 +1,185 @@
+# tests/test_data_storage_ingestion.py
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+# ------------------------------------------------------------------
+# Make data-storage service importable for tests
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+DS_DIR = ROOT / "services" / "data-storage" / "src"
+
+sys.path.insert(0, str(DS_DIR))
+
+from ingestion import BatchBuffer, is_lock_error  # noqa
+
+LOCKED = OperationalError("INSERT", {}, Exception("database is locked"))
+NO_TABLE = OperationalError("INSERT", {}, Exception("no such table: VITAL_MEASUREMENT"))
+BAD_ROW = IntegrityError("INSERT", {}, Exception("NOT NULL constraint failed"))
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+class Sink:
+    """
+    flush_fn that records batches; `fail(batch)` may return an error to raise.
+    """
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.batches = []
+        self.calls = 0
+        self.flushed = threading.Event()
+
+    def __call__(self, batch):
+        self.calls += 1
+        error = self.fail(batch) if self.fail else None
+        if error is not None:
+            raise error
+        self.batches.append([r["n"] for r in batch])
+        self.flushed.set()
+
+    @property
+    def written(self):
+        return [n for batch in self.batches for n in batch]
+
+
+def records(count, start=0):
+    return [{"n": i} for i in range(start, start + count)]
+
+
+def make_buffer(sink, **kwargs):
+    kwargs.setdefault("batch_size", 10)
+    kwargs.setdefault("max_latency_ms", 60_000)
+    return BatchBuffer("test", flush_fn=sink, **kwargs)
+
+# ------------------------------------------------------------------
+# Triggers and shutdown
+# ------------------------------------------------------------------
+
+def test_flushes_when_batch_size_is_reached():
+    sink = Sink()
+    buffer = make_buffer(sink, batch_size=3)
+    buffer.start()
+    try:
+        for r in records(2):
+            buffer.add(r)
+        assert not sink.flushed.wait(0.2)
+
+        buffer.add({"n": 2})
+        assert sink.flushed.wait(2)
+        assert sink.batches == [[0, 1, 2]]
+    finally:
+        buffer.close()
+
+
+def test_flushes_when_oldest_record_is_due():
+    sink = Sink()
+    buffer = make_buffer(sink, batch_size=100, max_latency_ms=100)
+    buffer.start()
+    try:
+        started = time.monotonic()
+        buffer.add({"n": 0})
+        assert sink.flushed.wait(2)
+        assert time.monotonic() - started >= 0.09
+        assert sink.batches == [[0]]
+    finally:
+        buffer.close()
+
+
+def test_close_drains_everything_in_order():
+    sink = Sink()
+    buffer = make_buffer(sink, batch_size=4)
+    for r in records(10):
+        buffer.add(r)
+
+    buffer.close()
+    assert sink.batches == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert buffer.stats()["queue_depth"] == 0
+    assert buffer.add({"n": 10}) is False
+
+
+def test_overflow_sheds_the_oldest_records():
+    sink = Sink()
+    buffer = make_buffer(sink, batch_size=2, max_pending=4)
+    for r in records(6):
+        buffer.add(r)
+
+    buffer.close()
+    assert sink.written == [2, 3, 4, 5]
+    assert buffer.stats()["dropped"] == 2
+
+# ------------------------------------------------------------------
+# Retry vs reject
+# ------------------------------------------------------------------
+
+def test_lock_errors_only_are_retryable():
+    assert is_lock_error(LOCKED)
+    assert is_lock_error(OperationalError("UPDATE", {}, Exception("database table is locked")))
+    assert not is_lock_error(NO_TABLE)
+    assert not is_lock_error(OperationalError("INSERT", {}, Exception("disk I/O error")))
+    assert not is_lock_error(BAD_ROW)
+
+
+def test_locked_batch_is_retried_as_a_whole():
+    failures = iter([LOCKED, LOCKED])
+    sink = Sink(fail=lambda batch: next(failures, None))
+    buffer = make_buffer(sink)
+    for r in records(3):
+        buffer.add(r)
+
+    assert buffer.flush() == 0
+    assert buffer.flush() == 0
+    assert buffer.flush() == 3
+    assert sink.batches == [[0, 1, 2]]
+    stats = buffer.stats()
+    assert (stats["flushed"], stats["rejected"], stats["flush_failures"]) == (3, 0, 2)
+
+
+def test_permanent_error_is_not_retried_forever():
+    sink = Sink(fail=lambda batch: NO_TABLE)
+    buffer = make_buffer(sink)
+    for r in records(3):
+        buffer.add(r)
+
+    # One batch attempt, then each record once: all rejected, queue empty
+    assert buffer.flush() == 3
+    assert sink.calls == 4
+    stats = buffer.stats()
+    assert (stats["queue_depth"], stats["rejected"]) == (0, 3)
+
+
+def test_bad_record_is_rejected_and_the_rest_written():
+    sink = Sink(fail=lambda batch: BAD_ROW if any(r["n"] == 1 for r in batch) else None)
+    buffer = make_buffer(sink)
+    for r in records(3):
+        buffer.add(r)
+
+    assert buffer.flush() == 3
+    assert sink.written == [0, 2]
+    assert buffer.stats()["rejected"] == 1
+
+
+def test_retries_are_capped_then_records_go_one_by_one():
+    locked = {"on": True}
+    sink = Sink(fail=lambda batch: LOCKED if locked["on"] else None)
+    buffer = make_buffer(sink, max_retries=2)
+    for r in records(3):
+        buffer.add(r)
+
+    assert buffer.flush() == 0        # retry 1
+    assert buffer.flush() == 0        # retry 2
+    calls = sink.calls
+    assert buffer.flush() == 0        # cap reached: batch + first record, then stop
+    assert sink.calls == calls + 2
+    assert buffer.stats()["queue_depth"] == 3   # still locked: nothing lost
+
+    locked["on"] = False
+    assert buffer.flush() == 3
+    assert sink.written == [0, 1, 2]
+    assert buffer.stats()["rejected"] == 0
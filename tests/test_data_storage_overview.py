@@ -0,0 +1,140 @@
+# tests/test_data_storage_overview.py
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import importlib.util
+from pathlib import Path
+
+# ------------------------------------------------------------------
+# Make data-storage service importable for tests
+# (on a throw-away copy of data/health.db, shared by the data-storage
+# test modules: the engine is created once per process)
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+DS_DIR = ROOT / "services" / "data-storage" / "src"
+
+if "storage.local" not in sys.modules:
+    DB_COPY = Path(tempfile.mkdtemp()) / "health.db"
+    shutil.copy(ROOT / "data" / "health.db", DB_COPY)
+    os.environ["DB_PATH"] = str(DB_COPY)
+
+    sys.path.insert(0, str(DS_DIR))
+    sys.path.insert(0, str(ROOT))   # shared/ (PYTHONPATH=/app in the images)
+
+    _spec = importlib.util.spec_from_file_location("data_storage_main", DS_DIR / "main.py")
+    ds_main = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(ds_main)
+    ds_main.init_db()
+
+from sqlalchemy import text  # noqa
+from storage.local import LocalStorage, engine  # noqa
+from storage.overview import dashboard_overview  # noqa
+
+storage = LocalStorage()
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+def counters() -> dict:
+    data = dashboard_overview.overview()
+    data["system_overview"].pop("last_update")
+    return data
+
+
+def assert_matches_recompute() -> None:
+    incremental = counters()
+    dashboard_overview.recompute()
+    assert incremental == counters()
+
+
+def active_assignment_id() -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT assignment_id FROM WRISTBAND_ASSIGNMENT
+            WHERE end_date IS NULL
+            ORDER BY assignment_id DESC
+            LIMIT 1
+        """)).scalar()
+
+
+def alert(assignment_id: int, severity: str = "CRITICAL") -> dict:
+    return {
+        "assignment_id": assignment_id,
+        "alert_type": "THRESHOLD_BREACH",
+        "severity": severity,
+        "status": "JUST_GENERATED",
+        "threshold_profile": "STANDARD",
+        "metric": "heart_rate",
+        "value": 150,
+        "description": f"Heart rate above {severity} threshold",
+        "full_description": "overview test alert",
+    }
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_counters_match_recompute_after_save_and_acknowledge():
+    counters()   # loaded: hooks apply incrementally from here
+    assignment_id = active_assignment_id()
+
+    saved = storage.save_alerts([alert(assignment_id), alert(assignment_id, "WARNING")])
+    assert_matches_recompute()
+
+    storage.acknowledge_alert(saved[0]["alert_id"])
+    assert_matches_recompute()
+
+    # Acknowledging twice changes nothing
+    storage.acknowledge_alert(saved[0]["alert_id"])
+    storage.acknowledge_alert(saved[1]["alert_id"])
+    assert_matches_recompute()
+
+
+def test_counters_match_recompute_after_assignment_changes():
+    counters()
+    patient = storage.create_patient({
+        "name": "Overview Test", "age": 40, "gender": "OTHER",
+        "phone": None, "threshold_profile": "STANDARD",
+    })
+    storage.create_wristband(9901)
+    storage.assign_wristband(patient["patient_id"], 9901)
+    assert_matches_recompute()
+
+    with engine.connect() as conn:
+        assignment_id = conn.execute(text("""
+            SELECT assignment_id FROM WRISTBAND_ASSIGNMENT
+            WHERE wristband_id = 9901 AND end_date IS NULL
+        """)).scalar()
+    storage.save_alerts([alert(assignment_id)])
+    assert_matches_recompute()
+
+    assert storage.unassign_wristband(9901)
+    assert_matches_recompute()
+
+
+def test_recompute_between_commit_and_hook_does_not_double_count(monkeypatch):
+    counters()
+    expected = counters()["system_overview"]["active_alerts"] + 1
+
+    # A recompute() racing the save: it must not see the commit before
+    # the hook has applied it
+    hook = dashboard_overview.on_alert_saved
+    racer = threading.Thread(target=dashboard_overview.recompute)
+
+    def racing_hook(saved):
+        racer.start()
+        racer.join(0.2)
+        hook(saved)
+
+    monkeypatch.setattr(dashboard_overview, "on_alert_saved", racing_hook)
+    storage.save_alerts([alert(active_assignment_id())])
+    racer.join(5)
+    assert not racer.is_alive()
+
+    assert counters()["system_overview"]["active_alerts"] == expected
+    assert_matches_recompute()
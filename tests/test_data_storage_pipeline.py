@@ -0,0 +1,176 @@
+# tests/test_data_storage_pipeline.py
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+# ------------------------------------------------------------------
+# Make data-storage service importable for tests
+# (on a throw-away copy of data/health.db, shared by the data-storage
+# test modules: the engine is created once per process)
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+DS_DIR = ROOT / "services" / "data-storage" / "src"
+
+if "storage.local" not in sys.modules:
+    DB_COPY = Path(tempfile.mkdtemp()) / "health.db"
+    shutil.copy(ROOT / "data" / "health.db", DB_COPY)
+    os.environ["DB_PATH"] = str(DB_COPY)
+
+    sys.path.insert(0, str(DS_DIR))
+    sys.path.insert(0, str(ROOT))   # shared/ (PYTHONPATH=/app in the images)
+
+    _spec = importlib.util.spec_from_file_location("data_storage_main", DS_DIR / "main.py")
+    ds_main = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(ds_main)
+    ds_main.init_db()
+
+from pipeline import Pipeline, Stage  # noqa
+from mqtt_client import MQTTClient  # noqa
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+def collector():
+    """
+    Last-stage handler that keeps what it receives.
+    """
+    seen = []
+
+    def handler(item):
+        seen.append(item)
+
+    return seen, handler
+
+
+def message(topic: str, payload: bytes, qos: int = 0):
+    return SimpleNamespace(topic=topic, payload=payload, qos=qos)
+
+# ------------------------------------------------------------------
+# Stage / Pipeline
+# ------------------------------------------------------------------
+
+def test_full_entry_queue_drops_without_blocking():
+    seen, handler = collector()
+    pipeline = Pipeline([Stage("t-drop", handler, queue_size=2)])
+
+    started = time.monotonic()
+    assert [pipeline.submit(i) for i in range(3)] == [True, True, False]
+    assert time.monotonic() - started < 0.5
+
+    stats = pipeline.stages[0].stats()
+    assert (stats["received"], stats["dropped"], stats["queue_depth"]) == (2, 1, 2)
+
+    pipeline.start()
+    pipeline.close()
+    assert seen == [0, 1]
+
+
+def test_blocking_submit_waits_for_room():
+    seen, handler = collector()
+    pipeline = Pipeline([Stage("t-block", handler, queue_size=1)])
+    assert pipeline.submit("a")
+
+    # Still full after the timeout: dropped
+    started = time.monotonic()
+    assert not pipeline.submit("b", block=True, timeout=0.1)
+    assert time.monotonic() - started >= 0.09
+
+    # Workers start while the producer waits: accepted
+    threading.Timer(0.2, pipeline.start).start()
+    assert pipeline.submit("c", block=True, timeout=5)
+
+    pipeline.close()
+    assert seen == ["a", "c"]
+
+
+def test_stage_hand_off_blocks_instead_of_dropping():
+    seen, handler = collector()
+    first = Stage("t-first", lambda item: item * 10, queue_size=100)
+    second = Stage("t-second", handler, queue_size=1)
+    pipeline = Pipeline([first, second])
+
+    for i in range(20):
+        assert pipeline.submit(i)
+    first.start()                       # second has no workers yet: first blocks
+    time.sleep(0.2)
+    assert second.stats()["dropped"] == 0
+    assert first.stats()["processed"] < 20
+
+    second.start()
+    pipeline.close()
+    assert seen == [i * 10 for i in range(20)]
+    assert second.stats()["dropped"] == 0
+
+
+def test_close_drains_queued_items_in_order():
+    seen, handler = collector()
+    pipeline = Pipeline([
+        Stage("t-decode", lambda item: ("decoded", item)),
+        Stage("t-resolve", handler),
+    ])
+    for i in range(500):
+        pipeline.submit(i)
+    pipeline.start()
+    pipeline.close()
+
+    assert seen == [("decoded", i) for i in range(500)]
+    assert all(s.stats()["queue_depth"] == 0 for s in pipeline.stages)
+
+
+def test_wait_and_service_histograms_are_recorded():
+    def slow(item):
+        time.sleep(0.02)
+        if item == 2:
+            raise ValueError("bad item")
+
+    stage = Stage("t-hist", slow)
+    pipeline = Pipeline([stage])
+    for i in range(5):
+        pipeline.submit(i)
+    pipeline.start()
+    pipeline.close()
+
+    stats = stage.stats()
+    assert (stats["processed"], stats["failures"]) == (5, 1)
+    assert stats["wait_ms"]["count"] == 5
+    assert stats["service_ms"]["count"] == 5
+    assert stats["service_ms"]["p50_ms"] >= 20
+    # Items queued behind the slow handler waited at least one service time
+    assert stats["wait_ms"]["max_ms"] >= 20
+
+# ------------------------------------------------------------------
+# MQTT receive stage
+# ------------------------------------------------------------------
+
+def test_on_message_drops_qos0_and_waits_for_qos1():
+    mqtt = MQTTClient(config={"ingestion": {"pipeline_queue_size": 1}})
+    mqtt.alert_enqueue_timeout = 0.1
+    decode = mqtt.pipeline.stages[0]
+
+    mqtt._on_message(None, None, message("wristbands/1/vitals", b"{}"))
+    mqtt._on_message(None, None, message("wristbands/1/vitals", b"{}"))
+    assert decode.stats()["dropped"] == 1
+
+    # QoS 1 waits up to alert_enqueue_timeout before giving up
+    started = time.monotonic()
+    mqtt._on_message(None, None, message("health/alerts", b"{}", qos=1))
+    assert time.monotonic() - started >= 0.09
+    assert decode.stats()["dropped"] == 2
+
+    # ... and gets in once the decode stage makes room
+    threading.Timer(0.2, mqtt.pipeline.start).start()
+    mqtt.alert_enqueue_timeout = 5
+    mqtt._on_message(None, None, message("health/alerts", b"{}", qos=1))
+    mqtt.pipeline.close()
+
+    stats = decode.stats()
+    assert (stats["received"], stats["processed"], stats["dropped"]) == (2, 2, 2)
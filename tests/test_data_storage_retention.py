@@ -0,0 +1,138 @@
+# tests/test_data_storage_retention.py
+
+import gzip
+import os
+import sys
+import shutil
+import tempfile
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+
+# ------------------------------------------------------------------
+# Make data-storage service importable for tests
+# (on a throw-away copy of data/health.db, shared by the data-storage
+# test modules: the engine is created once per process)
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+DS_DIR = ROOT / "services" / "data-storage" / "src"
+
+if "storage.local" not in sys.modules:
+    DB_COPY = Path(tempfile.mkdtemp()) / "health.db"
+    shutil.copy(ROOT / "data" / "health.db", DB_COPY)
+    os.environ["DB_PATH"] = str(DB_COPY)
+
+    sys.path.insert(0, str(DS_DIR))
+    sys.path.insert(0, str(ROOT))   # shared/ (PYTHONPATH=/app in the images)
+
+    _spec = importlib.util.spec_from_file_location("data_storage_main", DS_DIR / "main.py")
+    ds_main = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(ds_main)
+    ds_main.init_db()
+
+from sqlalchemy import text  # noqa
+from storage.local import LocalStorage, engine  # noqa
+from storage.retention import ARCHIVE_COLUMNS, RetentionManager, VitalArchive, vital_archive  # noqa
+from storage.rollups import rollup_compactor  # noqa
+
+storage = LocalStorage()
+
+# Oldest sample in data/health.db is 2026-01-24: archive 01-24 and 01-25 only
+NOW = datetime(2026, 1, 27, 12)
+RANGE = (datetime(2026, 1, 23), datetime(2026, 2, 3))
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+def busiest_assignment() -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT assignment_id FROM VITAL_MEASUREMENT
+            WHERE measured_at < '2026-01-26'
+            GROUP BY assignment_id
+            ORDER BY COUNT(*) DESC
+            LIMIT 1
+        """)).scalar()
+
+
+def busiest_assignment_archived() -> int:
+    rows = vital_archive.read_rows(range(1, 1000), *RANGE)
+    counts = {}
+    for r in rows:
+        counts[r["assignment_id"]] = counts.get(r["assignment_id"], 0) + 1
+    return max(counts, key=counts.get)
+
+
+def history(assignment_id: int) -> tuple:
+    # 270 s buckets are not rollup-aligned: answered from raw rows
+    buckets = storage.get_history(assignment_id, *RANGE, resolution=270)
+    assert buckets["source"] == "VITAL_MEASUREMENT"
+    lttb = storage.get_history(assignment_id, *RANGE, method="lttb", points=100_000)
+    return buckets["items"], lttb
+
+
+def hot_rows(assignment_id: int, before: str) -> list:
+    with engine.connect() as conn:
+        return [dict(r) for r in conn.execute(
+            text(f"""
+                SELECT {", ".join(ARCHIVE_COLUMNS)} FROM VITAL_MEASUREMENT
+                WHERE assignment_id = :aid AND measured_at < :before
+            """),
+            {"aid": assignment_id, "before": before},
+        ).mappings().all()]
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_history_is_unchanged_across_archival():
+    rollup_compactor.run_once()
+    assignment_id = busiest_assignment()
+    before = history(assignment_id)
+
+    # Crash window: archived but not yet deleted -> counted once
+    day_rows = hot_rows(assignment_id, "2026-01-25")
+    assert day_rows
+    vital_archive.write(datetime(2026, 1, 24).date(), assignment_id, day_rows)
+    assert history(assignment_id) == before
+
+    manager = RetentionManager(vital_archive, retention_days=1, chunk_size=50)
+    moved = manager.run_once(now=NOW)
+    assert moved > 0
+    assert hot_rows(assignment_id, "2026-01-26") == []
+    assert history(assignment_id) == before
+
+
+def test_one_file_per_day_and_assignment():
+    assignment_id = busiest_assignment_archived()
+    for day in (datetime(2026, 1, 24).date(), datetime(2026, 1, 25).date()):
+        names = os.listdir(vital_archive.day_dir(day))
+        assert names
+        assert all(n.startswith("assignment-") and n.endswith(".json.gz") for n in names)
+    assert os.path.exists(vital_archive.path_for(datetime(2026, 1, 25).date(), assignment_id))
+
+
+def test_read_rows_opens_only_wanted_files(monkeypatch, tmp_path):
+    archive = VitalArchive(str(tmp_path))
+    day = datetime(2026, 1, 10).date()
+    for assignment_id in (1, 2, 3):
+        archive.write(day, assignment_id, [{
+            "measurement_id": assignment_id * 10 + i,
+            "assignment_id": assignment_id,
+            "measured_at": f"2026-01-10 00:00:0{i}.000000",
+            "heart_rate": 70 + i, "spo2": 97, "temperature": 36.6,
+            "motion": 0.1, "battery_level": 90,
+        } for i in range(3)])
+
+    opened = []
+    real_open = gzip.open
+    monkeypatch.setattr(gzip, "open", lambda path, *a, **k: opened.append(path) or real_open(path, *a, **k))
+
+    rows = archive.read_rows([2], datetime(2026, 1, 10), datetime(2026, 1, 10, 0, 0, 2))
+    assert [r["measurement_id"] for r in rows] == [20, 21]
+    assert opened == [archive.path_for(day, 2)]
+
+    # Re-archiving merges and de-duplicates
+    assert archive.write(day, 2, [{**rows[0], "heart_rate": 99}]) == 3
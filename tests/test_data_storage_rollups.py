@@ -0,0 +1,165 @@
+# tests/test_data_storage_rollups.py
+
+import os
+import sys
+import shutil
+import tempfile
+import importlib.util
+from datetime import datetime
+from pathlib import Path
+
+# ------------------------------------------------------------------
+# Make data-storage service importable for tests
+# (on a throw-away copy of data/health.db, shared by the data-storage
+# test modules: the engine is created once per process)
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+DS_DIR = ROOT / "services" / "data-storage" / "src"
+
+if "storage.local" not in sys.modules:
+    DB_COPY = Path(tempfile.mkdtemp()) / "health.db"
+    shutil.copy(ROOT / "data" / "health.db", DB_COPY)
+    os.environ["DB_PATH"] = str(DB_COPY)
+
+    sys.path.insert(0, str(DS_DIR))
+    sys.path.insert(0, str(ROOT))   # shared/ (PYTHONPATH=/app in the images)
+
+    _spec = importlib.util.spec_from_file_location("data_storage_main", DS_DIR / "main.py")
+    ds_main = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(ds_main)
+    ds_main.init_db()
+
+from sqlalchemy import text  # noqa
+from storage.downsampling import VITAL_METRICS, BucketAccumulator, to_epoch  # noqa
+from storage.local import LocalStorage, engine  # noqa
+from storage.rollups import get_watermark, rollup_compactor  # noqa
+
+storage = LocalStorage()
+
+# Assignment 3 reports every 5 s from 2026-01-24 to 2026-02-01 17:18 in
+# data/health.db; hour-aligned range (rollups answer whole granules)
+ASSIGNMENT_ID = 3
+START = datetime(2026, 1, 29, 12)
+END = datetime(2026, 2, 1, 21)
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+def vital(measured_at: str, heart_rate, temperature=36.9) -> dict:
+    return {
+        "assignment_id": ASSIGNMENT_ID,
+        "measured_at": measured_at,
+        "heart_rate": heart_rate,
+        "spo2": 95,
+        "temperature": temperature,
+        "motion": 0.5,
+        "battery_level": 80,
+    }
+
+
+def rounded(items: list) -> list:
+    # Sums are added in a different order by SQL and the rollups
+    return [
+        {k: round(v, 2) if k.endswith("_avg") and v is not None else v for k, v in item.items()}
+        for item in items
+    ]
+
+
+def assert_rollups_match_raw() -> None:
+    """
+    Rollup-backed buckets (rollups + raw tail above the watermark) equal
+    buckets aggregated from raw rows only, for both rollup tables.
+    """
+    for resolution, table in ((3600, "VITAL_ROLLUP_1H"), (60, "VITAL_ROLLUP_1M")):
+        via_rollups = storage.get_history(ASSIGNMENT_ID, START, END, resolution=resolution)
+        assert via_rollups["source"] == table
+
+        raw = BucketAccumulator(resolution)
+        storage._aggregate_raw(raw, [ASSIGNMENT_ID], START, END)
+
+        assert rounded(via_rollups["items"]) == rounded(raw.finalize())
+
+
+def raw_lasts() -> dict:
+    """
+    bucket_start -> (last_at epoch, {metric: value}) of the newest raw row
+    per minute.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT measured_at, {", ".join(VITAL_METRICS)}
+            FROM VITAL_MEASUREMENT
+            WHERE assignment_id = :aid AND measured_at >= :start AND measured_at < :end
+        """), {"aid": ASSIGNMENT_ID, "start": str(START), "end": str(END)}).mappings().all()
+
+    lasts = {}
+    for r in rows:
+        epoch = to_epoch(r["measured_at"])
+        bucket = int(epoch // 60) * 60
+        if bucket not in lasts or epoch >= lasts[bucket][0]:
+            lasts[bucket] = (epoch, {m: r[m] for m in VITAL_METRICS})
+    return lasts
+
+
+def rollup_lasts() -> dict:
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"""
+            SELECT bucket_start, last_at, {", ".join(m + "_last" for m in VITAL_METRICS)}
+            FROM VITAL_ROLLUP_1M
+            WHERE assignment_id = :aid AND bucket_start >= :start AND bucket_start < :end
+        """), {
+            "aid": ASSIGNMENT_ID,
+            "start": int(to_epoch(START)),
+            "end": int(to_epoch(END)),
+        }).mappings().all()
+    return {
+        r["bucket_start"]: (to_epoch(r["last_at"]), {m: r[f"{m}_last"] for m in VITAL_METRICS})
+        for r in rows
+    }
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_rollups_match_raw_across_the_watermark(monkeypatch):
+    rollup_compactor.run_once()
+    assert_rollups_match_raw()
+
+    # Uncompacted tail: a late sample inside a compacted minute (older
+    # than its last sample), a new hour, and a sample with a missing metric
+    storage.save_vitals([
+        vital("2026-01-29T14:28:37", 150),
+        vital("2026-02-01T20:00:10", 40),
+        vital("2026-02-01T20:00:20", 45, temperature=None),
+    ])
+    with engine.connect() as conn:
+        watermark = get_watermark(conn)
+    assert_rollups_match_raw()
+
+    # Watermark in the middle of the tail
+    monkeypatch.setattr(rollup_compactor, "chunk_size", 2)
+    assert rollup_compactor._compact_chunk() == 2
+    with engine.connect() as conn:
+        assert get_watermark(conn) > watermark
+    assert_rollups_match_raw()
+
+    # Newest sample of an already rolled-up minute, then compact everything
+    storage.save_vitals([vital("2026-01-29T14:28:59.500000", 30)])
+    assert_rollups_match_raw()
+    rollup_compactor.run_once()
+    assert_rollups_match_raw()
+
+    # The late 14:28:37 sample did not replace the minute's last value
+    minute = int(to_epoch(datetime(2026, 1, 29, 14, 28)))
+    assert rollup_lasts()[minute][1]["heart_rate"] == 30
+
+
+def test_rollup_lasts_match_the_newest_raw_sample():
+    rollup_compactor.run_once()
+    expected, actual = raw_lasts(), rollup_lasts()
+    assert actual.keys() == expected.keys()
+    for bucket, (last_at, values) in expected.items():
+        assert actual[bucket][0] == last_at
+        assert actual[bucket][1] == values
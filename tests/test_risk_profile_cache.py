@@ -0,0 +1,76 @@
+# tests/test_risk_profile_cache.py
+
+import sys
+from pathlib import Path
+
+# ------------------------------------------------------------------
+# Make risk_analysis service importable for tests
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+RISK_DIR = ROOT / "services" / "risk_analysis"
+
+sys.path.insert(0, str(RISK_DIR))
+
+from profile_cache import ProfileCache  # noqa
+
+
+def make_cache(snapshots):
+    """
+    Cache whose fetch_all() returns the given snapshots in order.
+    `before_return` runs while a snapshot is "in flight".
+    """
+    def fetch_one(wristband_id):
+        raise AssertionError("unexpected single lookup")
+
+    def fetch_all():
+        version, profiles, before_return = snapshots.pop(0)
+        if before_return:
+            before_return(cache)
+        return version, profiles
+
+    cache = ProfileCache(fetch_one, fetch_all, default_profile="STANDARD")
+    return cache
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_change_during_preload_is_not_overwritten():
+    def change_in_flight(cache):
+        cache.apply_change({"wristband_id": 1, "active": True,
+                            "threshold_profile": "CARDIAC", "version": 11})
+        cache.apply_change({"wristband_id": 2, "active": False, "version": 12})
+
+    cache = make_cache([
+        (10, {1: "STANDARD", 2: "COPD", 3: "STANDARD"}, change_in_flight),
+    ])
+    assert cache.preload() == 3
+
+    assert cache.get(1) == "CARDIAC"
+    assert cache.get(2) == "STANDARD"     # unassigned -> default, no lookup
+    assert cache.get(3) == "STANDARD"
+    assert cache.stats()["stale_skipped"] == 2
+    assert cache.stats()["snapshot_version"] == 10
+
+
+def test_snapshot_newer_than_change_wins():
+    def change_in_flight(cache):
+        cache.apply_change({"wristband_id": 1, "active": True,
+                            "threshold_profile": "CARDIAC", "version": 4})
+
+    cache = make_cache([(5, {1: "COPD"}, change_in_flight)])
+    cache.preload()
+    assert cache.get(1) == "COPD"
+
+
+def test_version_reset_after_restart():
+    cache = make_cache([
+        (50, {1: "STANDARD"}, None),
+        (3, {1: "COPD"}, None),           # Data Storage restarted
+    ])
+    cache.preload()
+    cache.apply_change({"wristband_id": 1, "active": True,
+                        "threshold_profile": "CARDIAC", "version": 51})
+    cache.preload()
+    assert cache.get(1) == "COPD"
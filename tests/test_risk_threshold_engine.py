@@ -0,0 +1,103 @@
+# tests/test_risk_threshold_engine.py
+
+import sys
+import json
+import random
+import importlib.util
+from pathlib import Path
+
+# ------------------------------------------------------------------
+# Make risk_analysis service importable for tests
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+RISK_DIR = ROOT / "services" / "risk_analysis"
+THRESHOLDS_FILE = ROOT / "services" / "health-catalog" / "config" / "thresholds.json"
+
+sys.path.insert(0, str(RISK_DIR))
+sys.path.insert(0, str(ROOT))   # shared/ (PYTHONPATH=/app in the images)
+
+from threshold_engine import ThresholdEngine  # noqa
+
+_spec = importlib.util.spec_from_file_location("risk_main", RISK_DIR / "main.py")
+risk_main = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(risk_main)
+
+PROFILES = json.loads(THRESHOLDS_FILE.read_text())["profiles"]
+ENGINE = ThresholdEngine(PROFILES)
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+def reference(payload: dict, profile: str):
+    """
+    Per-message evaluation as done before the engine existed.
+    """
+    profile_thresholds = PROFILES[profile]
+    highest, metric_hit, value_hit = "NORMAL", None, None
+    for metric, value in payload.items():
+        if metric not in profile_thresholds or value is None:
+            continue
+        severity = risk_main.resolve_severity(value, profile_thresholds[metric])
+        if severity == "CRITICAL":
+            return "CRITICAL", metric, value
+        if severity == "WARNING":
+            highest, metric_hit, value_hit = "WARNING", metric, value
+    return highest, metric_hit, value_hit
+
+
+def random_payload(rng: random.Random) -> dict:
+    fields = {
+        "hr": rng.choice([None, rng.randint(40, 140)]),
+        "heart_rate": rng.randint(40, 140),
+        "spo2": rng.choice([None, rng.randint(85, 100), 90, 95]),
+        "temperature": rng.choice([round(rng.uniform(35.0, 39.5), 1), 37.5, 38.5]),
+        "battery": rng.choice([rng.randint(0, 100), 20, 50]),
+        "battery_level": rng.randint(0, 100),
+    }
+    keys = [k for k in fields if rng.random() < 0.8]
+    rng.shuffle(keys)
+    payload = {"wristband_id": rng.randint(1, 50)}
+    payload.update({k: fields[k] for k in keys})
+    return payload
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_engine_matches_per_message_evaluation():
+    rng = random.Random(42)
+    names = list(PROFILES)
+    payloads = [random_payload(rng) for _ in range(5000)]
+    profiles = [rng.choice(names) for _ in payloads]
+
+    results = ENGINE.evaluate(payloads, profiles)
+
+    for payload, profile, result in zip(payloads, profiles, results):
+        assert tuple(result) == reference(payload, profile), (payload, profile)
+
+
+def test_boundaries_unbounded_ranges_and_unknown_profile():
+    results = ENGINE.evaluate(
+        [
+            {"spo2": 90},                        # WARNING is [90, 95)
+            {"spo2": 89.9},                      # CRITICAL is [null, 90)
+            {"temperature": float("inf")},       # CRITICAL is [38.5, null)
+            {"spo2": 93, "temperature": 37.6},   # last WARNING wins
+            {"temperature": 39, "spo2": 80},     # first CRITICAL wins
+            {"spo2": "n/a", "hr": None},
+            {"spo2": 80},
+        ],
+        ["STANDARD"] * 6 + ["UNKNOWN"],
+    )
+
+    assert [tuple(r) if r else None for r in results] == [
+        ("WARNING", "spo2", 90),
+        ("CRITICAL", "spo2", 89.9),
+        ("CRITICAL", "temperature", float("inf")),
+        ("WARNING", "temperature", 37.6),
+        ("CRITICAL", "temperature", 39),
+        ("NORMAL", None, None),
+        None,
+    ]
@@ -0,0 +1,101 @@
+# tests/test_risk_window_state.py
+
+import sys
+import random
+import statistics
+from pathlib import Path
+
+# ------------------------------------------------------------------
+# Make risk_analysis service importable for tests
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+RISK_DIR = ROOT / "services" / "risk_analysis"
+
+sys.path.insert(0, str(RISK_DIR))
+
+from window_state import RollingWindow, WindowStore  # noqa
+
+RULES = {
+    "window_size": 12,
+    "rules": [
+        {"type": "persistence", "metric": "spo2", "level": "WARNING",
+         "n": 3, "m": 5, "alert_type": "PERSISTENT_BREACH"},
+        {"type": "rate_of_change", "metric": "spo2", "direction": "down",
+         "per_minute": 1.5, "min_samples": 12, "alert_type": "RAPID_CHANGE"},
+        {"type": "ewma_anomaly", "metric": "heart_rate", "z": 4.0,
+         "min_samples": 20, "alert_type": "VITAL_ANOMALY"},
+    ],
+}
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+
+def sample(wristband_id: int, k: int, **vitals) -> dict:
+    """
+    One payload per 5 seconds, like the simulator.
+    """
+    return {
+        "wristband_id": wristband_id,
+        "measured_at": f"2026-01-01T01:{k * 5 // 60:02d}:{k * 5 % 60:02d}+00:00",
+        **vitals,
+    }
+
+
+def alert_types(store, payloads, levels=None):
+    fired = []
+    for k, payload in enumerate(payloads):
+        level = {"spo2": levels[k]} if levels else {}
+        fired += [(k, f["alert_type"]) for f in store.update(payload, level)]
+    return fired
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_rolling_window_matches_full_recompute():
+    rng = random.Random(7)
+    window = RollingWindow(10)
+    xs = [rng.uniform(50, 150) for _ in range(1000)]
+    for i, x in enumerate(xs):
+        window.push(1_700_000_000 + i * 5.0, x)
+
+    assert abs(window.mean() - statistics.fmean(xs[-10:])) < 1e-9
+    assert abs(window.std() - statistics.pstdev(xs[-10:])) < 1e-6
+
+    ts = [i * 5.0 for i in range(10)]
+    expected_slope = statistics.linear_regression(ts, xs[-10:]).slope
+    assert abs(window.slope() - expected_slope) < 1e-9
+
+
+def test_persistence_fires_once_per_episode():
+    store = WindowStore(RULES)
+    levels = [0, 1, 0, 1, 1, 1, 1, 0, 0, 0, 0, 0, 1, 1, 1]
+    payloads = [sample(1, k, spo2=97) for k in range(len(levels))]
+
+    assert alert_types(store, payloads, levels) == [
+        (4, "PERSISTENT_BREACH"),
+        (14, "PERSISTENT_BREACH"),
+    ]
+
+
+def test_slow_decline_and_anomaly():
+    store = WindowStore(RULES)
+    decline = [sample(2, k, spo2=98 - 0.2 * k) for k in range(12)]
+    assert alert_types(store, decline) == [(11, "RAPID_CHANGE")]
+
+    rng = random.Random(3)
+    steady = [sample(3, k, heart_rate=80 + rng.gauss(0, 2)) for k in range(30)]
+    spike = [sample(3, 30, heart_rate=125)]
+    assert alert_types(store, steady + spike) == [(30, "VITAL_ANOMALY")]
+
+
+def test_memory_is_bounded_per_store():
+    store = WindowStore(RULES, max_wristbands=50)
+    for wristband_id in range(500):
+        store.update(sample(wristband_id, 0, spo2=97, heart_rate=80), {})
+
+    stats = store.stats()
+    assert stats["wristbands"] == 50
+    assert stats["evictions"] == 450
@@ -0,0 +1,103 @@
+# tests/test_shared_codec.py
+
+import sys
+import json
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+# ------------------------------------------------------------------
+# Make shared/ importable for tests
+# ------------------------------------------------------------------
+
+ROOT = Path(__file__).resolve().parents[1]   # iot-health-platform
+
+sys.path.insert(0, str(ROOT))
+
+from shared.codec import (  # noqa
+    ALERT, FORMAT_BINARY, VITALS, CodecError, decode, dumps, encode_vitals,
+)
+
+VITALS_PAYLOAD = {
+    "wristband_id": 3,
+    "measured_at": "2026-01-01T00:00:00+00:00",
+    "heart_rate": 80,
+    "spo2": 97,
+    "temperature": 36.6,
+    "motion": 0.4,
+    "battery_level": 88,
+}
+
+# ------------------------------------------------------------------
+# Tests
+# ------------------------------------------------------------------
+
+def test_round_trip_matches_stdlib():
+    raw = dumps(VITALS_PAYLOAD)
+    assert isinstance(raw, bytes)
+    assert json.loads(raw) == VITALS_PAYLOAD
+    assert decode(raw, VITALS) == VITALS_PAYLOAD
+
+
+@pytest.mark.parametrize("raw", [
+    b"{not json",
+    b"\xff\xfe",
+    b"[1, 2]",
+    b'{"spo2": 97}',                          # wristband_id missing
+    b'{"wristband_id": "3"}',                 # wrong type
+    b'{"wristband_id": true}',                # bool is not an int
+    b'{"wristband_id": 3, "spo2": "97"}',
+])
+def test_invalid_vitals_raise_codec_error(raw):
+    with pytest.raises(CodecError):
+        decode(raw, VITALS)
+
+
+def test_optional_fields_and_unknown_fields():
+    alert = decode(
+        b'{"alert_type": "THRESHOLD_BREACH", "severity": "WARNING", "metric": "spo2",'
+        b' "assignment_id": null, "value": 91.5, "extra": [1]}',
+        ALERT,
+    )
+    assert alert["assignment_id"] is None
+    assert alert["extra"] == [1]
+
+
+def test_binary_vitals_round_trip_and_auto_detect():
+    raw = encode_vitals(VITALS_PAYLOAD, FORMAT_BINARY)
+    assert len(raw) == 25
+    assert len(raw) < len(encode_vitals(VITALS_PAYLOAD)) / 4
+    assert decode(raw, VITALS) == VITALS_PAYLOAD
+
+    partial = {**VITALS_PAYLOAD, "spo2": None, "temperature": 37.25, "measured_at": None}
+    assert decode(encode_vitals(partial, FORMAT_BINARY), VITALS) == partial
+
+
+@pytest.mark.parametrize("raw", [
+    b"\xb7",                          # truncated
+    b"\xb7\x02" + bytes(23),          # unknown version
+    b"\xb7\x01" + bytes(10),
+])
+def test_invalid_binary_vitals_raise_codec_error(raw):
+    with pytest.raises(CodecError):
+        decode(raw, VITALS)
+
+
+def test_binary_is_vitals_only():
+    with pytest.raises(CodecError):
+        decode(encode_vitals(VITALS_PAYLOAD, FORMAT_BINARY), ALERT)
+    with pytest.raises(CodecError):
+        encode_vitals({**VITALS_PAYLOAD, "heart_rate": 10_000}, FORMAT_BINARY)
+
+
+def test_stdlib_fallback(monkeypatch):
+    monkeypatch.setitem(sys.modules, "orjson", None)   # import fails
+    spec = importlib.util.spec_from_file_location("codec_fallback", ROOT / "shared" / "codec.py")
+    fallback = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(fallback)
+
+    assert fallback.BACKEND == "json"
+    assert fallback.decode(fallback.dumps(VITALS_PAYLOAD), fallback.VITALS) == VITALS_PAYLOAD
+    with pytest.raises(fallback.CodecError):
+        fallback.decode(b"{not json")